@@ -1,13 +1,313 @@
-from abc import ABC, abstractmethod
+import os
+import json
+import shutil
+import asyncio
+import zipfile
+import hashlib
+from abc import ABC
+from datetime import datetime
+from backups.chunk_store import ChunkStore, MANIFEST_SUFFIX
+from backups.change_manifest import ChangeManifest, STATE_FILENAME, BACKUP_META_NAME
+from backups.parallel_archive import ParallelArchiveWriter, available_codecs, DEFAULT_CODEC, OPT_IN_CODECS
+from backups.link_snapshot import create_link_point, is_snapshot_point
+from backups.paths import PARTIAL_SUFFIX, BACKUP_TIMESTAMP_FORMAT
+from backups.io_control import BackupProgress
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+BACKUP_MODES = ("zip", "dedup", "link")
+BACKUP_SUFFIXES = (".zip", MANIFEST_SUFFIX)
 
 class BaseBackupHandler(ABC):
-    def __init__(self, name):
+    """備份流程（變更比對 → 依模式寫出 zip / 去重 manifest / 快照目錄 → 記錄狀態）。
+
+    子類別只需設定來源路徑與下面幾個屬性，必要時改寫 prepare_source / archive_members。
+    """
+
+    log_prefix = ""           # log 前綴，如 "[Minecraft]"
+    source_label = "backup"   # 備份檔名中的來源名稱（world / save）
+    skip_errors = True        # zip 模式遇到無法讀取的檔案時略過（False 則整個備份失敗）
+
+    def __init__(self, name, mode="zip", codec=DEFAULT_CODEC, workers=None,
+                 incremental=False, full_every=24, hash_files=False, read_bps=None, write_bps=None,
+                 retention_policy=None):
+        if mode not in BACKUP_MODES:
+            raise ValueError(f"不支援的備份模式：{mode}")
+        if codec not in available_codecs():
+            raise ValueError(f"不支援或未安裝的壓縮格式：{codec}")
+        if codec in OPT_IN_CODECS and mode == "zip":
+            logger.warning(
+                f"⚠️ {name} 使用 {codec} 壓縮：產生的 zip 無法用一般解壓縮工具或標準 zipfile 開啟，"
+                f"只能透過本 bot 的還原指令（backups.restore）還原"
+            )
         self.name = name
+        self.mode = mode
+        self.codec = codec
+        self.workers = workers
+        self.incremental = incremental
+        self.full_every = full_every  # 每條增量鏈最多幾個增量後強制做一次完整備份
+        self.hash_files = hash_files
+        self.chunk_store = None
+        self.change_manifest = None
+        self.last_stats = None
+        # 讀寫進度與頻寬上限；executor 由 BackupManager 指定專用的備份執行緒池
+        self.progress = BackupProgress(name, read_bps=read_bps, write_bps=write_bps)
+        self.executor = None
+        self.compress_executor = None  # ParallelArchiveWriter 用，未指定時每次備份自行建立
+        self.retention_policy = retention_policy  # RetentionPolicy，None 時由 AutoBackupTask 決定
+        self.catalog = None  # BackupManager 註冊時指定，未指定則直接掃描目錄
+        self.last_plan = None
+
+    def _init_storage(self, backup_root):
+        """依 source_path 決定 backup_dir（BACKUP_ROOT/<伺服器資料夾>），並準備變更紀錄與 chunk store。"""
+        self.server_folder = os.path.basename(os.path.dirname(self.source_path.rstrip('/\\')))
+        self.backup_dir = os.path.join(backup_root, self.server_folder)
+        os.makedirs(self.backup_dir, exist_ok=True)
+        self.change_manifest = ChangeManifest(
+            os.path.join(self.backup_dir, STATE_FILENAME), hash_files=self.hash_files
+        )
+        if self.mode == "dedup":
+            self.chunk_store = ChunkStore(os.path.join(backup_root, ".chunkstore"), backup_root)
+
+    async def prepare_source(self):
+        """回傳這次要備份的目錄；子類別可改寫（如 Minecraft 先做快照）。"""
+        return self.source_path
+
+    def archive_members(self, source_path, plan):
+        """zip 模式要打包的 (相對路徑清單, 其他位置的檔案 {名稱: 路徑})；子類別可改寫（如 region delta）。"""
+        return plan["changed"], {}
+
+    def backup_filename(self, timestamp, plan):
+        base = f"{self.server_folder}_{self.source_label}_{timestamp}"
+        if self.mode == "dedup":
+            return base + MANIFEST_SUFFIX
+        if self.mode == "link":
+            return base
+        return base + ("_inc.zip" if plan["parent"] else ".zip")
 
-    @abstractmethod
     async def perform_backup(self):
-        pass
+        """執行一次備份，回傳備份路徑；自上次備份後沒有變更時回傳 None。"""
+        timestamp = datetime.now().strftime(BACKUP_TIMESTAMP_FORMAT)
+
+        try:
+            loop = asyncio.get_running_loop()
+            source_path = await self.prepare_source()
+            plan = await loop.run_in_executor(self.executor, self.plan_backup, source_path)
+            if plan is None:
+                logger.info(f"{self.log_prefix} 自上次備份後沒有變更，略過本次備份")
+                return None
+
+            backup_filename = self.backup_filename(timestamp, plan)
+            backup_path = os.path.join(self.backup_dir, backup_filename)
+            previous = plan["previous_backup"]
+            previous_path = os.path.join(self.backup_dir, previous) if previous else None
+
+            if self.mode == "dedup":
+                self.last_stats = await loop.run_in_executor(
+                    self.executor, self.chunk_store.store_tree,
+                    source_path, backup_path, self.name, self.log_prefix, previous_path, self.progress
+                )
+            elif self.mode == "link":
+                self.last_stats = await loop.run_in_executor(
+                    self.executor, create_link_point,
+                    source_path, backup_path,
+                    previous_path if previous_path and os.path.isdir(previous_path) else None,
+                    self.log_prefix, self.progress
+                )
+            else:
+                await loop.run_in_executor(self.executor, self._zip_backup, backup_path, plan, source_path)
+
+            self.last_plan = plan
+            self.commit_plan(plan, backup_filename)
+            return backup_path
+        except Exception as e:
+            logger.error(f"{self.log_prefix} 備份失敗：{e.__class__.__name__} - {e}")
+            raise
+
+    def _zip_backup(self, zip_path, plan, source_path):
+        rel_paths, extra_files = self.archive_members(source_path, plan)
+        writer = ParallelArchiveWriter(
+            zip_path,
+            codec=self.codec,
+            workers=self.workers,
+            skip_errors=self.skip_errors,
+            log_prefix=self.log_prefix,
+            progress=self.progress,
+            executor=self.compress_executor
+        )
+        self.last_stats = writer.write_files(source_path, rel_paths, self.build_backup_meta(plan), extra_files)
+        if plan["parent"]:
+            logger.info(
+                f"{self.log_prefix} 增量備份：{len(plan['changed'])} 個變更、{len(plan['removed'])} 個刪除，"
+                f"parent = {plan['parent']}"
+            )
 
-    @abstractmethod
     def get_latest_backup_info(self):
-        pass
\ No newline at end of file
+        entries = self.list_backup_entries()
+        if entries:
+            return os.path.join(self.backup_dir, entries[0]["name"])
+        return None
+
+    def list_backup_files(self):
+        """回傳 backup_dir 內所有備份（zip、manifest 或快照目錄）的名稱，新到舊排序。"""
+        return sorted(
+            (
+                f for f in os.listdir(self.backup_dir)
+                if f.endswith(BACKUP_SUFFIXES) or is_snapshot_point(self.backup_dir, f)
+            ),
+            reverse=True
+        )
+
+    def cleanup_partials(self):
+        """移除上次中斷（當機、強制關閉）留下的 .partial 半成品，回傳清除數量。"""
+        removed = 0
+        for name in os.listdir(self.backup_dir):
+            if not name.endswith(PARTIAL_SUFFIX):
+                continue
+            path = os.path.join(self.backup_dir, name)
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+                removed += 1
+            except OSError as e:
+                logger.warning(f"⚠️ 無法清除未完成的備份：{path}（{e}）")
+        if removed:
+            logger.info(f"🧹 [{self.name}] 已清除 {removed} 個未完成的備份")
+        return removed
+
+    def remove_backup(self, name):
+        path = os.path.join(self.backup_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        if self.catalog:
+            self.catalog.remove(self.name, name)
+
+    def list_backup_entries(self):
+        """新到舊的備份紀錄（name / created_at / parent ...）；有索引時走 SQLite，否則掃描目錄。"""
+        if self.catalog:
+            return self.catalog.list(self.name)
+        return [self.describe_backup(name, detailed=False) for name in self.list_backup_files()]
+
+    def describe_backup(self, name, detailed=True):
+        """從磁碟讀取單一備份的資訊，用於重建索引。"""
+        path = os.path.join(self.backup_dir, name)
+        parent = self.get_backup_parent(name)
+        if os.path.isdir(path):
+            kind = "link"
+        elif name.endswith(MANIFEST_SUFFIX):
+            kind = "dedup"
+        else:
+            kind = "zip_inc" if parent else "zip"
+
+        entry = {
+            "handler": self.name,
+            "name": name,
+            "path": path,
+            "kind": kind,
+            "created_at": os.path.getmtime(path),
+            "status": "success",
+            "parent": parent,
+        }
+        if not detailed:
+            return entry
+
+        if kind == "link":
+            sizes = [
+                os.path.getsize(os.path.join(root, f))
+                for root, dirs, files in os.walk(path) for f in files
+            ]
+            entry.update(size=sum(sizes), file_count=len(sizes))
+            return entry
+
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(block)
+        entry.update(size=os.path.getsize(path), checksum=sha256.hexdigest())
+        if kind == "dedup":
+            with open(path, "r", encoding="utf-8") as f:
+                entry["file_count"] = len(json.load(f)["files"])
+        else:
+            with zipfile.ZipFile(path) as zipf:
+                entry["file_count"] = sum(1 for n in zipf.namelist() if n != BACKUP_META_NAME)
+        return entry
+
+    def describe_last_backup(self, final_path):
+        """把剛完成的備份整理成索引紀錄。"""
+        stats = self.last_stats or {}
+        parent = self.last_plan["parent"] if self.last_plan else None
+        if self.mode == "zip":
+            kind = "zip_inc" if parent else "zip"
+        else:
+            kind = self.mode
+        return {
+            "handler": self.name,
+            "name": os.path.basename(final_path),
+            "path": final_path,
+            "kind": kind,
+            "created_at": self.progress.started_at,
+            "size": stats.get("archive_bytes", stats.get("bytes_out")),
+            "file_count": stats.get("files"),
+            "duration": self.progress.elapsed,
+            "checksum": stats.get("checksum"),
+            "status": "success",
+            "parent": parent,
+        }
+
+    def plan_backup(self, source_path):
+        """只做 stat 掃描並與上次狀態比對；沒有任何變更時回傳 None。"""
+        current = self.change_manifest.scan(source_path)
+        previous = self.change_manifest.load()
+        changed, removed = self.change_manifest.diff(previous, current, source_path)
+
+        previous_backup = previous.get("backup") if previous else None
+        previous_exists = bool(previous_backup) and os.path.exists(
+            os.path.join(self.backup_dir, previous_backup)
+        )
+        if previous_exists and not changed and not removed:
+            return None
+
+        chain = previous.get("chain", 0) + 1 if previous_exists else 0
+        incremental = (
+            self.mode == "zip" and self.incremental and previous_exists
+            and previous_backup.endswith(".zip") and chain < self.full_every
+        )
+        return {
+            "files": current,
+            "changed": changed if incremental else sorted(current),
+            "removed": removed if incremental else [],
+            "parent": previous_backup if incremental else None,
+            "chain": chain if incremental else 0,
+            "previous_backup": previous_backup if previous_exists else None,
+        }
+
+    def commit_plan(self, plan, backup_name):
+        self.change_manifest.save(backup_name, plan["files"], plan["chain"])
+
+    def build_backup_meta(self, plan):
+        if not plan["parent"]:
+            return None
+        meta = {
+            "type": "incremental",
+            "parent": plan["parent"],
+            "deleted": plan["removed"],
+            "created": datetime.now().isoformat(timespec="seconds"),
+        }
+        return {BACKUP_META_NAME: json.dumps(meta, ensure_ascii=False).encode("utf-8")}
+
+    def get_backup_parent(self, filename):
+        """增量備份回傳其 parent 的檔名，完整備份回傳 None。"""
+        if not filename.endswith(".zip"):
+            return None
+        try:
+            with zipfile.ZipFile(os.path.join(self.backup_dir, filename)) as zipf:
+                if BACKUP_META_NAME not in zipf.namelist():
+                    return None
+                return json.loads(zipf.read(BACKUP_META_NAME)).get("parent")
+        except Exception:
+            return None
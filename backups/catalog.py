@@ -0,0 +1,156 @@
+import sqlite3
+import threading
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CATALOG_FILENAME = "backup_catalog.sqlite3"
+
+_COLUMNS = (
+    "handler", "name", "path", "kind", "created_at", "size", "file_count",
+    "duration", "checksum", "status", "parent",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    handler TEXT NOT NULL,
+    name TEXT,
+    path TEXT,
+    kind TEXT,
+    created_at REAL NOT NULL,
+    size INTEGER,
+    file_count INTEGER,
+    duration REAL,
+    checksum TEXT,
+    status TEXT NOT NULL,
+    parent TEXT,
+    UNIQUE (handler, name)
+);
+CREATE INDEX IF NOT EXISTS idx_backups_handler_status_created
+    ON backups (handler, status, created_at);
+CREATE TABLE IF NOT EXISTS verifications (
+    handler TEXT NOT NULL,
+    name TEXT NOT NULL,
+    verified_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    entries INTEGER,
+    bytes INTEGER,
+    duration REAL,
+    error TEXT,
+    PRIMARY KEY (handler, name)
+);
+"""
+
+_VERIFY_COLUMNS = ("handler", "name", "verified_at", "status", "entries", "bytes", "duration", "error")
+
+
+class BackupCatalog:
+    """BACKUP_ROOT 下的 SQLite 備份索引：最新備份查詢、列表與保留策略都走索引查詢。"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(_SCHEMA)
+
+    def record(self, **fields):
+        row = {column: fields.get(column) for column in _COLUMNS}
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        with self.lock, self.conn:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO backups ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+                [row[column] for column in _COLUMNS]
+            )
+
+    def latest(self, handler, status="success"):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM backups WHERE handler = ? AND status = ? ORDER BY created_at DESC LIMIT 1",
+                (handler, status)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def list(self, handler, status="success", limit=None):
+        """新到舊列出 handler 的備份紀錄。"""
+        query = "SELECT * FROM backups WHERE handler = ? AND status = ? ORDER BY created_at DESC"
+        params = [handler, status]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(query, params)]
+
+    def get(self, handler, name):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM backups WHERE handler = ? AND name = ?", (handler, name)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def count(self, handler):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM backups WHERE handler = ?", (handler,)
+            ).fetchone()[0]
+
+    def remove(self, handler, name):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM backups WHERE handler = ? AND name = ?", (handler, name))
+            self.conn.execute("DELETE FROM verifications WHERE handler = ? AND name = ?", (handler, name))
+
+    def record_verification(self, **fields):
+        with self.lock, self.conn:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO verifications ({', '.join(_VERIFY_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in _VERIFY_COLUMNS)})",
+                [fields.get(column) for column in _VERIFY_COLUMNS]
+            )
+
+    def last_verification(self, handler, status=None):
+        """最近一次驗證的紀錄；status 為 None 時不論結果。"""
+        query = "SELECT * FROM verifications WHERE handler = ?"
+        params = [handler]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        with self.lock:
+            row = self.conn.execute(query + " ORDER BY verified_at DESC LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+
+    def unverified(self, handler, limit=None):
+        """尚未驗證的成功備份名稱，新到舊。"""
+        query = (
+            "SELECT b.name FROM backups b LEFT JOIN verifications v ON v.handler = b.handler AND v.name = b.name "
+            "WHERE b.handler = ? AND b.status = 'success' AND v.name IS NULL ORDER BY b.created_at DESC"
+        )
+        params = [handler]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            return [row[0] for row in self.conn.execute(query, params)]
+
+    def rebuild(self, handler):
+        """從磁碟上的備份重建某個 handler 的成功紀錄（保留失敗紀錄）。"""
+        rows = []
+        for name in handler.list_backup_files():
+            try:
+                rows.append(handler.describe_backup(name))
+            except Exception as e:
+                logger.warning(f"⚠️ 重建索引時無法讀取備份：{name}（{e}）")
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM backups WHERE handler = ? AND status = 'success'", (handler.name,)
+            )
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO backups ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                [[row.get(column) for column in _COLUMNS] for row in rows]
+            )
+        logger.info(f"📇 已重建 {handler.name} 備份索引：{len(rows)} 筆")
+        return len(rows)
@@ -0,0 +1,86 @@
+import os
+import json
+import hashlib
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+STATE_FILENAME = ".last_backup_state.json"
+BACKUP_META_NAME = ".backup_meta.json"
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ChangeManifest:
+    """記錄上次成功備份時每個檔案的 size / mtime（可選 hash），用只做 stat 的掃描判斷變更。"""
+
+    def __init__(self, state_path, hash_files=False):
+        self.state_path = state_path
+        self.hash_files = hash_files
+
+    def scan(self, source_path):
+        files = {}
+        for root, dirs, filenames in os.walk(source_path):
+            for file in filenames:
+                full_path = os.path.join(root, file)
+                rel_path = os.path.relpath(full_path, source_path).replace(os.sep, "/")
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    continue
+                files[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        return files
+
+    def load(self):
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ 無法讀取備份狀態檔，將視為首次備份：{self.state_path}（{e}）")
+            return None
+
+    def diff(self, previous, current, source_path):
+        """回傳 (變更或新增的檔案, 已刪除的檔案)，並把舊 hash 帶到 current。"""
+        previous_files = previous["files"] if previous else {}
+        changed = []
+        for rel_path, entry in current.items():
+            old = previous_files.get(rel_path)
+            if old and old["size"] == entry["size"] and old["mtime_ns"] == entry["mtime_ns"]:
+                if "hash" in old:
+                    entry["hash"] = old["hash"]
+                continue
+
+            if self.hash_files:
+                full_path = os.path.join(source_path, *rel_path.split("/"))
+                try:
+                    entry["hash"] = file_hash(full_path)
+                except OSError:
+                    changed.append(rel_path)
+                    continue
+                # 只有 mtime 變了但內容相同（例如被 touch）就不算變更
+                if old and old.get("hash") == entry["hash"] and old["size"] == entry["size"]:
+                    continue
+            changed.append(rel_path)
+
+        removed = [rel_path for rel_path in previous_files if rel_path not in current]
+        return changed, removed
+
+    def save(self, backup_name, files, chain):
+        state = {"backup": backup_name, "chain": chain, "files": files}
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def reset(self):
+        """清除狀態，下一次備份會是完整備份。"""
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
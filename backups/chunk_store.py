@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import threading
+from datetime import datetime
+from backups.paths import PARTIAL_SUFFIX
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_SUFFIX = ".manifest.json"
+CHUNK_SIZE = 1024 * 1024  # region 檔以 4 KiB sector 原地改寫，固定切塊即可對齊大部分變動
+GC_GRACE_SECONDS = 3600   # 剛寫入 / 剛被引用的 chunk 不回收，避免與進行中的備份互相干擾
+
+_RAW = b"R"
+_ZLIB = b"Z"
+
+
+class ChunkStore:
+    """以 SHA-256 內容定址的共用 chunk 倉庫，每個備份只是一份 manifest。"""
+
+    def __init__(self, store_dir, manifest_root):
+        self.store_dir = store_dir
+        self.manifest_root = manifest_root
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def chunk_path(self, digest):
+        return os.path.join(self.store_dir, digest[:2], digest)
+
+    def has_chunk(self, digest):
+        return os.path.exists(self.chunk_path(digest))
+
+    def put_chunk(self, data):
+        """寫入單一 chunk，回傳 (digest, 新寫入的位元組數)。已存在則只更新 mtime。"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(digest)
+        if os.path.exists(path):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return digest, 0
+
+        packed = zlib.compress(data, 6)
+        payload = _ZLIB + packed if len(packed) < len(data) * 0.95 else _RAW + data
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return digest, len(payload)
+
+    def get_chunk(self, digest):
+        with open(self.chunk_path(digest), "rb") as f:
+            payload = f.read()
+        data = zlib.decompress(payload[1:]) if payload[:1] == _ZLIB else payload[1:]
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"chunk 內容校驗失敗：{digest}")
+        return data
+
+    def store_tree(self, source_path, manifest_path, handler_name, log_prefix,
+                   previous_manifest_path=None, progress=None):
+        """把整個目錄切塊寫入倉庫，並在 manifest_path 產生 manifest，回傳統計資料。
+
+        若提供上一份 manifest，size / mtime 未變的檔案直接沿用其 chunk 清單，不重新讀取。
+        """
+        files = []
+        new_bytes = 0
+        total_bytes = 0
+        reused = 0
+
+        previous = {}
+        if previous_manifest_path and os.path.exists(previous_manifest_path):
+            try:
+                previous = {e["path"]: e for e in load_manifest(previous_manifest_path)["files"]}
+            except Exception as e:
+                logger.warning(f"{log_prefix} 無法讀取上一份 manifest，改為完整切塊：{e}")
+
+        for root, dirs, filenames in os.walk(source_path):
+            for file in filenames:
+                full_path = os.path.join(root, file)
+                rel_path = os.path.relpath(full_path, source_path).replace(os.sep, "/")
+                try:
+                    stat = os.stat(full_path)
+                    old = previous.get(rel_path)
+                    if old and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime:
+                        files.append(old)
+                        total_bytes += stat.st_size
+                        reused += 1
+                        continue
+
+                    chunks = []
+                    with open(full_path, "rb") as f:
+                        while True:
+                            data = f.read(CHUNK_SIZE)
+                            if not data:
+                                break
+                            digest, written = self.put_chunk(data)
+                            if progress:
+                                progress.add_read(len(data))
+                                progress.add_written(written)
+                            chunks.append(digest)
+                            new_bytes += written
+                            total_bytes += len(data)
+                except PermissionError as e:
+                    logger.warning(f"{log_prefix} 跳過被鎖定檔案：{full_path}（{e}）")
+                    continue
+                except Exception as e:
+                    logger.warning(f"{log_prefix} 切塊檔案失敗：{full_path}（{e}）")
+                    continue
+
+                files.append({
+                    "path": rel_path,
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "chunks": chunks,
+                })
+
+        manifest = {
+            "version": 1,
+            "handler": handler_name,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "chunk_size": CHUNK_SIZE,
+            "total_bytes": total_bytes,
+            "files": files,
+        }
+        payload = json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+        partial_path = manifest_path + PARTIAL_SUFFIX
+        try:
+            with open(partial_path, "wb") as f:
+                f.write(payload)
+            os.replace(partial_path, manifest_path)
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+        logger.info(
+            f"{log_prefix} 去重備份完成：{len(files)} 檔案（{reused} 個未變更沿用），"
+            f"原始 {total_bytes / 1048576:.1f} MiB，新增 chunk {new_bytes / 1048576:.1f} MiB"
+        )
+        return {
+            "files": len(files),
+            "reused": reused,
+            "bytes_in": total_bytes,
+            "bytes_out": new_bytes + len(payload),
+            "checksum": hashlib.sha256(payload).hexdigest(),
+        }
+
+    def restore(self, manifest_path, target_dir):
+        manifest = load_manifest(manifest_path)
+        for entry in manifest["files"]:
+            dest = os.path.join(target_dir, *entry["path"].split("/"))
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with open(dest, "wb") as f:
+                for digest in entry["chunks"]:
+                    f.write(self.get_chunk(digest))
+            os.utime(dest, (entry["mtime"], entry["mtime"]))
+        return manifest
+
+    def _iter_manifests(self):
+        # manifest 只會放在 BACKUP_ROOT/<伺服器資料夾>/ 底下，不往更深（快照目錄、.staging）走訪
+        for entry in os.scandir(self.manifest_root):
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            for file in os.listdir(entry.path):
+                if file.endswith(MANIFEST_SUFFIX):
+                    yield os.path.join(entry.path, file)
+
+    def collect_garbage(self):
+        """刪除沒有任何 manifest 參照的 chunk，回傳 (刪除數量, 釋放位元組)。"""
+        referenced = set()
+        for path in self._iter_manifests():
+            try:
+                for entry in load_manifest(path)["files"]:
+                    referenced.update(entry["chunks"])
+            except Exception as e:
+                # 讀不到的 manifest 無法判斷參照，整輪放棄以免誤刪
+                logger.warning(f"⚠️ 無法讀取 manifest，略過本輪 chunk 回收：{path}（{e}）")
+                return 0, 0
+
+        cutoff = time.time() - GC_GRACE_SECONDS
+        removed = 0
+        freed = 0
+        for root, dirs, files in os.walk(self.store_dir):
+            for file in files:
+                if file in referenced:
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                    if stat.st_mtime > cutoff:
+                        continue
+                    os.remove(path)
+                    removed += 1
+                    freed += stat.st_size
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    logger.warning(f"⚠️ 刪除 chunk 失敗：{path}（{e}）")
+
+        if removed:
+            logger.info(f"🧹 已回收 {removed} 個未參照 chunk，釋放 {freed / 1048576:.1f} MiB")
+        return removed, freed
+
+
+def load_manifest(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
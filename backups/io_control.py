@@ -0,0 +1,113 @@
+import os
+import time
+import threading
+import psutil
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+
+class TokenBucket:
+    """簡單的 token bucket 限速器（bytes/秒），可在多個執行緒間共用。"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        """先扣除額度並回傳需要等待的秒數；asyncio 端可自行 await asyncio.sleep，不佔住執行緒。"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0
+
+    def consume(self, amount):
+        # 超過容量的大檔案拆成多次等待，整體平均速率仍維持在上限內
+        while amount > 0:
+            take = min(amount, self.capacity)
+            wait = self.reserve(take)
+            if wait:
+                time.sleep(wait)
+            amount -= take
+
+
+class BackupProgress:
+    """單一 handler 的備份進度；讀寫量透過這裡回報，同時套用該 handler 的頻寬上限。"""
+
+    def __init__(self, name, read_bps=None, write_bps=None):
+        self.name = name
+        self.read_limiter = TokenBucket(read_bps) if read_bps else None
+        self.write_limiter = TokenBucket(write_bps) if write_bps else None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.status = "idle"
+            self.bytes_read = 0
+            self.bytes_written = 0
+            self.started_at = None
+            self.finished_at = None
+
+    def start(self):
+        self.reset()
+        with self.lock:
+            self.status = "running"
+            self.started_at = time.time()
+
+    def finish(self, status):
+        with self.lock:
+            self.status = status
+            self.finished_at = time.time()
+
+    def add_read(self, amount, throttle=True):
+        if throttle and self.read_limiter:
+            self.read_limiter.consume(amount)
+        with self.lock:
+            self.bytes_read += amount
+
+    def add_written(self, amount, throttle=True):
+        if throttle and self.write_limiter:
+            self.write_limiter.consume(amount)
+        with self.lock:
+            self.bytes_written += amount
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "name": self.name,
+                "status": self.status,
+                "bytes_read": self.bytes_read,
+                "bytes_written": self.bytes_written,
+                "elapsed": self.elapsed,
+            }
+
+
+def lower_thread_priority():
+    """把目前執行緒降為背景優先權（CPU 與 I/O），給 ThreadPoolExecutor 的 initializer 使用。"""
+    try:
+        if os.name == "nt":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            # THREAD_MODE_BACKGROUND_BEGIN 同時降低該執行緒的 CPU、磁碟 I/O 與記憶體優先權
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN)
+        else:
+            # Linux 上每個執行緒都有自己的 tid，nice / ionice 可以只套用在這個執行緒
+            tid = threading.get_native_id()
+            os.setpriority(os.PRIO_PROCESS, tid, 19)
+            psutil.Process(tid).ionice(psutil.IOPRIO_CLASS_IDLE)
+    except Exception as e:
+        logger.debug(f"無法降低執行緒優先權：{e}")
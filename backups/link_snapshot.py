@@ -0,0 +1,85 @@
+import os
+import time
+import shutil
+from backups.snapshot import clone_file
+from backups.paths import PARTIAL_SUFFIX, TIMESTAMP_SUFFIX_PATTERN
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+
+def is_snapshot_point(backup_dir, name):
+    """判斷 backup_dir 下的 name 是否為完成的快照目錄（排除 .partial 與內部目錄）。"""
+    return (
+        not name.startswith(".")
+        and TIMESTAMP_SUFFIX_PATTERN.search(name) is not None
+        and os.path.isdir(os.path.join(backup_dir, name))
+    )
+
+
+def _same_file(src_stat, previous_path):
+    try:
+        prev_stat = os.stat(previous_path)
+    except FileNotFoundError:
+        return False
+    return prev_stat.st_size == src_stat.st_size and prev_stat.st_mtime_ns == src_stat.st_mtime_ns
+
+
+def create_link_point(source_path, point_dir, previous_point_dir=None, log_prefix="", progress=None):
+    """rsnapshot 式快照：未變更的檔案 hardlink 到上一個快照點，變更的檔案才實際複製。
+
+    先寫到 point_dir + ".partial"，完成後 rename，避免留下不完整的快照點。
+    """
+    started = time.perf_counter()
+    partial_dir = point_dir + PARTIAL_SUFFIX
+    if os.path.exists(partial_dir):
+        shutil.rmtree(partial_dir)
+
+    stats = {"files": 0, "linked": 0, "copied": 0, "skipped": 0, "bytes_copied": 0}
+    try:
+        for root, dirs, files in os.walk(source_path):
+            rel_root = os.path.relpath(root, source_path)
+            os.makedirs(os.path.join(partial_dir, rel_root), exist_ok=True)
+            for file in files:
+                src = os.path.join(root, file)
+                rel_path = os.path.join(rel_root, file)
+                dst = os.path.join(partial_dir, rel_path)
+                try:
+                    src_stat = os.stat(src)
+                    previous = os.path.join(previous_point_dir, rel_path) if previous_point_dir else None
+                    if previous and _same_file(src_stat, previous):
+                        try:
+                            os.link(previous, dst)
+                            stats["linked"] += 1
+                            stats["files"] += 1
+                            continue
+                        except OSError:
+                            pass  # 檔案系統不支援 hardlink 時退回複製
+                    if progress:
+                        progress.add_read(src_stat.st_size)
+                    clone_file(src, dst)
+                    if progress:
+                        progress.add_written(src_stat.st_size)
+                    stats["copied"] += 1
+                    stats["files"] += 1
+                    stats["bytes_copied"] += src_stat.st_size
+                except PermissionError as e:
+                    logger.warning(f"{log_prefix} 跳過被鎖定檔案：{src}（{e}）")
+                    stats["skipped"] += 1
+                except Exception as e:
+                    logger.warning(f"{log_prefix} 快照檔案失敗：{src}（{e}）")
+                    stats["skipped"] += 1
+
+        os.rename(partial_dir, point_dir)
+    except Exception:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        raise
+
+    stats["elapsed"] = time.perf_counter() - started
+    stats["bytes_out"] = stats["bytes_copied"]
+    logger.info(
+        f"{log_prefix} 🔗 快照點完成：{stats['files']} 檔案（hardlink {stats['linked']}，"
+        f"複製 {stats['copied']} / {stats['bytes_copied'] / 1048576:.1f} MiB），耗時 {stats['elapsed']:.1f}s"
+    )
+    return stats
@@ -1,23 +1,154 @@
 import os
 import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from backups.minecraft_backup import MinecraftBackupHandler
 from backups.seven_days_backup import SevenDaysBackupHandler
+from backups.catalog import BackupCatalog, CATALOG_FILENAME
+from backups.restore import open_backup, extract_files, restore_full
 from config import BACKUP_ROOT  # 設定備份根目錄
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+HANDLER_ALIASES = {"mc": "Minecraft", "minecraft": "Minecraft", "7d": "7 Days to Die", "7dtd": "7 Days to Die"}
 
 class BackupManager:
-    def __init__(self):
+    def __init__(self, max_concurrency=2, backup_root=BACKUP_ROOT):
         self.handlers = []
+        os.makedirs(backup_root, exist_ok=True)
+        self.catalog = BackupCatalog(os.path.join(backup_root, CATALOG_FILENAME))
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # 備份專用執行緒池，不佔用 bot 其他功能共用的 default executor
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency * 2, thread_name_prefix="backup")
+        # 所有 handler 共用的壓縮執行緒池（zlib / zstd 壓縮時會釋放 GIL），不必每次備份重新建立
+        self.compress_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="compress")
+        self.handler_locks = {}
+        self.backup_root = backup_root
+        self.restore_dir = os.path.join(backup_root, ".restore")
 
     def register_handler(self, handler):
+        handler.executor = self.executor
+        handler.compress_executor = self.compress_executor
+        handler.catalog = self.catalog
         self.handlers.append(handler)
+        self.handler_locks[handler.name] = asyncio.Lock()
+
+    async def backup_handler(self, handler):
+        """執行單一 handler 的備份，回傳 (狀態, 訊息, 最終路徑)。"""
+        # 同一個 handler 不會同時跑兩份備份；不同 handler 之間最多 max_concurrency 個並行
+        async with self.handler_locks[handler.name], self.semaphore:
+            handler.progress.start()
+            try:
+                # 備份直接寫進 backup_dir（.partial 暫存名稱 + 原子 rename），先清掉上次中斷的殘留
+                await asyncio.get_running_loop().run_in_executor(self.executor, handler.cleanup_partials)
+                final_path = await handler.perform_backup()
+                if final_path is None:
+                    handler.progress.finish("skipped")
+                    return "skipped", "⏭️ 自上次備份後無變更，略過備份", None
+
+                handler.progress.finish("success")
+                self.catalog.record(**handler.describe_last_backup(final_path))
+                return "success", f"✅ 備份成功：{os.path.basename(final_path)}", final_path
+            except Exception as e:
+                handler.progress.finish("failed")
+                self.catalog.record(
+                    handler=handler.name, created_at=handler.progress.started_at or time.time(),
+                    duration=handler.progress.elapsed, status="failed"
+                )
+                return "failed", f"❌ 備份失敗：{e.__class__.__name__} - {e}", None
+
+    async def backup_all(self, on_success=None):
+        """並行備份所有 handler；on_success(handler, final_path) 會在各自成功後立即執行。"""
+        async def run(handler):
+            status, message, final_path = await self.backup_handler(handler)
+            if status == "success" and on_success:
+                await on_success(handler, final_path)
+            return handler.name, message
+
+        return list(await asyncio.gather(*(run(handler) for handler in self.handlers)))
 
-    async def backup_all(self):
-        results = []
+    async def rebuild_catalog(self, only_missing=False):
+        """從磁碟重建備份索引；only_missing 時只處理索引中完全沒有紀錄的 handler。"""
+        loop = asyncio.get_running_loop()
         for handler in self.handlers:
+            if only_missing and self.catalog.count(handler.name):
+                continue
             try:
-                path = await handler.perform_backup()
-                results.append((handler.name, f"✅ 備份成功：{os.path.basename(path)}"))
+                await loop.run_in_executor(self.executor, self.catalog.rebuild, handler)
             except Exception as e:
-                results.append((handler.name, f"❌ 備份失敗：{e}"))
-        return results
+                logger.warning(f"⚠️ 重建備份索引失敗（{handler.name}）：{e}")
+
+    def get_progress(self):
+        """各 handler 的 {status, bytes_read, bytes_written, elapsed}。"""
+        return {handler.name: handler.progress.snapshot() for handler in self.handlers}
+
+    def get_handler(self, key):
+        """以名稱或別名（mc / 7d）取得 handler。"""
+        name = HANDLER_ALIASES.get(key.lower(), key)
+        for handler in self.handlers:
+            if handler.name.lower() == name.lower():
+                return handler
+        return None
+
+    def resolve_backup(self, handler, backup):
+        if backup == "latest":
+            entries = handler.list_backup_entries()
+            if not entries:
+                raise FileNotFoundError(f"{handler.name} 尚無任何備份")
+            return entries[0]["name"]
+        return backup
+
+    async def list_backup_contents(self, handler, backup):
+        backup = self.resolve_backup(handler, backup)
+
+        def run():
+            with open_backup(handler, backup) as reader:
+                return reader.list_files()
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, run)
+
+    async def extract_from_backup(self, handler, backup, names):
+        """從備份隨機取出指定檔案到 BACKUP_ROOT/.restore/<備份名稱>/，不解壓整個備份。"""
+        backup = self.resolve_backup(handler, backup)
+        target_dir = os.path.join(self.restore_dir, backup)
+
+        def run():
+            with open_backup(handler, backup) as reader:
+                contents = reader.list_files()
+                missing = [name for name in names if name not in contents]
+                if missing:
+                    raise FileNotFoundError(f"備份中找不到：{', '.join(missing)}")
+                return extract_files(reader, names, target_dir)
+
+        # 與備份、保留策略清理（AutoBackupTask._after_backup）共用 handler 鎖，取出途中來源備份不會被刪掉
+        async with self.handler_locks[handler.name]:
+            stats = await asyncio.get_running_loop().run_in_executor(self.executor, run)
+        stats["target_dir"] = target_dir
+        logger.info(
+            f"📂 已從 {backup} 取出 {stats['files']} 個檔案（{stats['bytes'] / 1048576:.1f} MiB，"
+            f"{stats['elapsed']:.2f}s）→ {target_dir}"
+        )
+        return stats
+
+    async def restore_handler(self, handler, backup):
+        """完整還原到 handler.source_path；呼叫前必須先停止伺服器。"""
+        backup = self.resolve_backup(handler, backup)
+
+        def run():
+            with open_backup(handler, backup) as reader:
+                return restore_full(reader, handler.source_path)
 
+        # 同上：持有 handler 鎖期間保留策略不會刪除正在還原的備份（增量鏈的父備份也一樣）
+        async with self.handler_locks[handler.name]:
+            stats = await asyncio.get_running_loop().run_in_executor(self.executor, run)
+            # 還原後世界內容已回到舊版本，下次備份需從完整備份重新開始增量鏈
+            if handler.change_manifest:
+                handler.change_manifest.reset()
+        stats["backup"] = backup
+        logger.info(
+            f"♻️ {handler.name} 已從 {backup} 完整還原：{stats['files']} 個檔案、"
+            f"{stats['bytes'] / 1048576:.1f} MiB，耗時 {stats['elapsed']:.2f}s"
+        )
+        return stats
@@ -1,60 +1,101 @@
 import os
-import zipfile
+import time
+import shutil
 import asyncio
-import tempfile
-from datetime import datetime
 from backups.base_handler import BaseBackupHandler
+from backups.parallel_archive import DEFAULT_CODEC
+from backups.paths import PARTIAL_SUFFIX
+from backups.region_delta import RegionState, is_region_file, prepare_region_deltas
+from backups.snapshot import stage_tree, STAGE_WORKERS
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 class MinecraftBackupHandler(BaseBackupHandler):
-    def __init__(self, world_path, backup_root):
-        super().__init__(name="Minecraft")
+    log_prefix = "[Minecraft]"
+    source_label = "world"
+    skip_errors = True  # 執行中的伺服器可能鎖住 session.lock 等檔案
+
+    def __init__(self, world_path, backup_root, mode="zip",
+                 codec=DEFAULT_CODEC, workers=None, incremental=False, full_every=24, hash_files=False,
+                 read_bps=None, write_bps=None, retention_policy=None,
+                 snapshot=False, rcon=None, region_delta=False):
+        super().__init__(
+            name="Minecraft", mode=mode, codec=codec, workers=workers,
+            incremental=incremental, full_every=full_every, hash_files=hash_files,
+            read_bps=read_bps, write_bps=write_bps, retention_policy=retention_policy
+        )
         self.world_path = world_path
-        self.server_folder = os.path.basename(os.path.dirname(self.world_path.rstrip('/\\')))
-        self.backup_dir = os.path.join(backup_root, self.server_folder)
-        os.makedirs(self.backup_dir, exist_ok=True)
+        self.source_path = world_path  # 還原目標
+        self._init_storage(backup_root)
+        # snapshot 模式：save-off 後把世界同步到 staging，再從 staging 壓縮，避免讀到寫到一半的 region
+        self.snapshot = snapshot
+        self.rcon = rcon  # async callable(command) -> str
+        self.staging_dir = os.path.join(backup_root, ".staging", self.server_folder)
+        self.last_pause_ms = None
+        # region delta：增量備份中的 .mca 只存 timestamp 有變動的 chunk（僅 zip 模式）
+        self.region_delta = region_delta and self.mode == "zip"
+        self.region_state = RegionState(os.path.join(self.backup_dir, ".region_state"))
+        self.region_scratch_dir = os.path.join(self.backup_dir, ".region_delta" + PARTIAL_SUFFIX)
 
-    async def perform_backup(self, temp_dir=None):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-        zip_filename = f"{self.server_folder}_world_{timestamp}.zip"
+    async def prepare_source(self):
+        return await self._take_snapshot() if self.snapshot else self.world_path
+
+    async def _take_snapshot(self):
+        """save-off → save-all flush → 同步到 staging → save-on，回傳 staging 路徑並記錄暫停毫秒數。"""
+        loop = asyncio.get_event_loop()
+        paused = False
+        pause_started = time.perf_counter()
+        flush_ms = 0.0
+        try:
+            if self.rcon:
+                try:
+                    await self.rcon("save-off")
+                    paused = True
+                    await self.rcon("save-all flush")
+                    flush_ms = (time.perf_counter() - pause_started) * 1000
+                except Exception as e:
+                    logger.info(f"[Minecraft] RCON 無法使用（伺服器可能未啟動），直接複製世界：{e}")
+            stats = await loop.run_in_executor(
+                self.executor, stage_tree, self.world_path, self.staging_dir, "[Minecraft]",
+                STAGE_WORKERS, self.progress
+            )
+        finally:
+            if paused:
+                try:
+                    await self.rcon("save-on")
+                except Exception as e:
+                    logger.error(f"[Minecraft] ⚠️ save-on 失敗，請手動確認伺服器存檔狀態：{e}")
 
-        if not temp_dir:
-            temp_dir = tempfile.mkdtemp()
+        pause_ms = (time.perf_counter() - pause_started) * 1000
+        self.last_pause_ms = pause_ms if paused else 0.0
+        logger.info(
+            f"[Minecraft] 📸 快照完成：寫入暫停 {self.last_pause_ms:.0f} ms"
+            f"（flush {flush_ms:.0f} ms，複製 {stats['copied']} 檔 / {stats['bytes'] / 1048576:.1f} MiB，"
+            f"{stats['unchanged']} 檔未變更）"
+        )
+        return self.staging_dir
 
-        temp_zip_path = os.path.join(temp_dir, zip_filename)
+    def archive_members(self, source_path, plan):
+        if not self.region_delta:
+            return super().archive_members(source_path, plan)
+        rel_paths, delta_files, plan["region_updates"] = prepare_region_deltas(
+            source_path, plan["changed"], self.region_state, self.region_scratch_dir,
+            bool(plan["parent"]), self.log_prefix, self.progress
+        )
+        return rel_paths, delta_files
 
+    def _zip_backup(self, zip_path, plan, source_path):
         try:
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self._zip_world, temp_zip_path)
-            return temp_zip_path
-        except Exception as e:
-            logger.error(f"[Minecraft] 備份失敗：{e.__class__.__name__} - {e}")
-            raise
-
-    def _zip_world(self, zip_path):
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(self.world_path):
-                for file in files:
-                    full_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(full_path, self.world_path)
-                    try:
-                        zipf.write(full_path, arcname=rel_path)
-                    except PermissionError as e:
-                        logger.warning(f"[Minecraft] 跳過被鎖定檔案：{full_path}（{e}）")
-                    except Exception as e:
-                        logger.warning(f"[Minecraft] 壓縮檔案失敗：{full_path}（{e}）")
-
-
-    def get_final_path(self, zip_path):
-        return os.path.join(self.backup_dir, os.path.basename(zip_path))
-
-    def get_latest_backup_info(self):
-        backups = sorted(
-            (f for f in os.listdir(self.backup_dir) if f.endswith(".zip")),
-            reverse=True
-        )
-        if backups:
-            return os.path.join(self.backup_dir, backups[0])
-        return None
+            super()._zip_backup(zip_path, plan, source_path)
+        finally:
+            shutil.rmtree(self.region_scratch_dir, ignore_errors=True)
+
+    def commit_plan(self, plan, backup_name):
+        super().commit_plan(plan, backup_name)
+        if "region_updates" in plan:
+            self.region_state.save(
+                plan["region_updates"],
+                [rel_path for rel_path in plan["removed"] if is_region_file(rel_path)],
+                replace_all=not plan["parent"]
+            )
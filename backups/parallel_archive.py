@@ -0,0 +1,417 @@
+import os
+import math
+import time
+import zlib
+import struct
+import hashlib
+import zipfile
+import contextlib
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from backups.paths import PARTIAL_SUFFIX
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # zstd 為選用套件
+    zstandard = None
+
+# 各編碼在 zip 規格中的 method 代號
+CODEC_METHODS = {
+    "store": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "lzma": zipfile.ZIP_LZMA,
+    "zstd": 93,
+}
+DEFAULT_CODEC = "deflate"
+# 需明確指定才會使用的編碼：zstd（method 93）的 zip 無法用標準 zipfile 與大多數解壓縮工具開啟，
+# 只有 backups.restore 的讀取器能還原，所以不會被當成預設值，也不會由 entropy 判斷自動選用
+OPT_IN_CODECS = ("zstd",)
+
+ENTROPY_THRESHOLD = 7.5     # bits/byte，超過視為已壓縮資料（如 .mca region）直接 store
+ENTROPY_SAMPLE_SIZE = 16 * 1024
+ENTROPY_SAMPLES = 4
+MIN_COMPRESS_SIZE = 256     # 太小的檔案壓縮沒有意義
+STREAM_THRESHOLD = 8 * 1024 * 1024  # 超過此大小的檔案不整個讀進記憶體，改由主執行緒分段壓縮寫入
+STREAM_CHUNK = 1024 * 1024
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP64_MARKER = 0xFFFFFFFF
+_ZIP_COUNT_MARKER = 0xFFFF
+_ZIP_FILECOUNT_LIMIT = 0xFFFF
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_LZMA_EOS = 0x02
+_FLAG_UTF8 = 0x800
+
+
+def available_codecs():
+    codecs = ["store", "deflate", "lzma"]
+    if zstandard is not None:
+        codecs.append("zstd")
+    return codecs
+
+
+def estimate_entropy(data):
+    """從資料中平均取幾段樣本估算 Shannon entropy（bits/byte）。"""
+    if not data:
+        return 0.0
+    counts = Counter()
+    step = max(len(data) // ENTROPY_SAMPLES, ENTROPY_SAMPLE_SIZE)
+    for offset in range(0, len(data), step):
+        counts.update(data[offset:offset + ENTROPY_SAMPLE_SIZE])
+    sampled = sum(counts.values())
+    return -sum(c / sampled * math.log2(c / sampled) for c in counts.values())
+
+
+def _compressor(codec, level):
+    """分段壓縮用的 compressobj（compress / flush）；store 回傳 None。"""
+    if codec == "deflate":
+        return zlib.compressobj(level, zlib.DEFLATED, -15)
+    if codec == "lzma":
+        return zipfile.LZMACompressor()
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    return None
+
+
+def _compress(data, codec, level):
+    if codec == "deflate":
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        return compressor.compress(data) + compressor.flush()
+    if codec == "lzma":
+        compressor = zipfile.LZMACompressor()
+        return compressor.compress(data) + compressor.flush()
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return data
+
+
+def compress_member(full_path, codec, level, entropy_threshold):
+    """在壓縮執行緒內讀取並壓縮單一檔案，失敗時回傳錯誤資訊而不是丟例外。"""
+    try:
+        stat = os.stat(full_path)
+        with open(full_path, "rb") as f:
+            data = f.read()
+    except Exception as e:
+        return {"error": e.__class__.__name__, "message": str(e)}
+
+    crc = zlib.crc32(data)
+    # entropy 判斷只會把檔案降為 store，不會換成其他編碼
+    if codec != "store" and len(data) >= MIN_COMPRESS_SIZE:
+        if estimate_entropy(data) >= entropy_threshold:
+            codec = "store"
+    else:
+        codec = "store"
+
+    payload = _compress(data, codec, level)
+    if codec != "store" and len(payload) >= len(data):
+        codec, payload = "store", data
+
+    return {
+        "codec": codec,
+        "crc": crc,
+        "size": len(data),
+        "csize": len(payload),
+        "mtime": stat.st_mtime,
+        "payload": payload,
+    }
+
+
+class _HashingWriter:
+    """寫入檔案的同時計算 SHA-256，讓索引不必再讀一次整個 zip 取得校驗碼。"""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.fileobj.write(data)
+        self.sha256.update(data)
+        self.bytes_written += len(data)
+
+
+def _dos_datetime(mtime):
+    t = time.localtime(max(mtime, 315532800))  # zip 最早只能表示 1980 年
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    return dos_time, dos_date
+
+
+class ParallelArchiveWriter:
+    """用執行緒池平行壓縮各檔案，再依序組成標準 zip（含 ZIP64）。
+
+    zlib / lzma / zstd 壓縮時會釋放 GIL，用執行緒即可平行；executor 由 BackupManager 共用，
+    未指定時（如 benchmark）每次寫入自行建立。超過 STREAM_THRESHOLD 的檔案分段讀取壓縮，
+    不會整個留在記憶體中。
+    """
+
+    def __init__(self, zip_path, codec=DEFAULT_CODEC, workers=None, level=6,
+                 entropy_threshold=ENTROPY_THRESHOLD, skip_errors=True, log_prefix="", progress=None,
+                 executor=None):
+        if codec not in CODEC_METHODS:
+            raise ValueError(f"不支援的壓縮格式：{codec}")
+        if codec == "zstd" and zstandard is None:
+            raise RuntimeError("未安裝 zstandard 套件，無法使用 zstd 壓縮")
+        self.zip_path = zip_path
+        self.codec = codec
+        self.workers = workers or os.cpu_count() or 1
+        self.level = 3 if codec == "zstd" and level == 6 else level
+        self.entropy_threshold = entropy_threshold
+        self.skip_errors = skip_errors
+        self.log_prefix = log_prefix
+        self.progress = progress
+        self.executor = executor
+        self._entries = []
+        self._offset = 0
+
+    def write_tree(self, source_path):
+        rel_paths = []
+        for root, dirs, files in os.walk(source_path):
+            for file in files:
+                full_path = os.path.join(root, file)
+                rel_paths.append(os.path.relpath(full_path, source_path).replace(os.sep, "/"))
+        return self.write_files(source_path, rel_paths)
+
+    def write_files(self, source_path, rel_paths, extra_entries=None, extra_files=None):
+        """只打包 rel_paths 指定的檔案；extra_entries 為額外寫入的 {名稱: bytes}（如增量備份的描述檔），
+        extra_files 為來自其他位置的 {名稱: 檔案路徑}（如 region delta）。"""
+        started = time.perf_counter()
+        members = [(os.path.join(source_path, *rel_path.split("/")), rel_path) for rel_path in rel_paths]
+        members += [(full_path, arcname) for arcname, full_path in (extra_files or {}).items()]
+
+        stats = {"files": 0, "skipped": 0, "stored": 0, "bytes_in": 0, "bytes_out": 0}
+        # 直接寫在最終目錄的暫存名稱，完成後原子 rename；失敗時一定清掉半成品
+        partial_path = self.zip_path + PARTIAL_SUFFIX
+        try:
+            with open(partial_path, "wb") as raw_out, self._pool() as pool:
+                out = _HashingWriter(raw_out)
+                pending = deque()
+                members_iter = iter(members)
+                window = self.workers * 2  # 限制同時在記憶體中的壓縮結果數量
+
+                def submit_next():
+                    member = next(members_iter, None)
+                    if member is None:
+                        return False
+                    try:
+                        size = os.path.getsize(member[0])
+                    except OSError:
+                        size = 0  # 交給 compress_member 回報錯誤
+                    if size > STREAM_THRESHOLD:
+                        pending.append((member, None))
+                        return True
+                    if self.progress:
+                        # 讀取由壓縮執行緒執行，在送出前依檔案大小取得讀取額度來限速
+                        self.progress.add_read(size)
+                    future = pool.submit(
+                        compress_member, member[0], self.codec, self.level, self.entropy_threshold
+                    )
+                    pending.append((member, future))
+                    return True
+
+                for _ in range(window):
+                    if not submit_next():
+                        break
+
+                while pending:
+                    (full_path, rel_path), future = pending.popleft()
+                    submit_next()
+                    if future is None:
+                        result = self._write_streamed(out, full_path, rel_path)
+                    else:
+                        result = future.result()
+
+                    if "error" in result:
+                        if result["error"] == "PermissionError":
+                            message = f"{self.log_prefix} 跳過被鎖定檔案：{full_path}（{result['message']}）"
+                        else:
+                            message = f"{self.log_prefix} 壓縮檔案失敗：{full_path}（{result['message']}）"
+                        if not self.skip_errors:
+                            raise OSError(message)
+                        logger.warning(message)
+                        stats["skipped"] += 1
+                        continue
+
+                    if future is not None:
+                        self._write_member(out, rel_path, result)
+                    stats["files"] += 1
+                    stats["bytes_in"] += result["size"]
+                    stats["bytes_out"] += result["csize"]
+                    if result["codec"] == "store" and self.codec != "store":
+                        stats["stored"] += 1
+
+                for arcname, data in (extra_entries or {}).items():
+                    payload = _compress(data, "deflate", self.level)
+                    self._write_member(out, arcname, {
+                        "codec": "deflate", "crc": zlib.crc32(data), "size": len(data),
+                        "csize": len(payload), "mtime": time.time(), "payload": payload,
+                    })
+
+                self._write_central_directory(out)
+                stats["archive_bytes"] = out.bytes_written
+                stats["checksum"] = out.sha256.hexdigest()
+            os.replace(partial_path, self.zip_path)
+        except BaseException:
+            try:
+                os.remove(partial_path)
+            except OSError:
+                pass
+            raise
+
+        stats["elapsed"] = time.perf_counter() - started
+        logger.info(
+            f"{self.log_prefix} 平行壓縮完成（{self.codec}，{self.workers} 執行緒）："
+            f"{stats['files']} 檔案，{stats['bytes_in'] / 1048576:.1f} → {stats['bytes_out'] / 1048576:.1f} MiB，"
+            f"{stats['stored']} 個高 entropy 檔案改為 store，耗時 {stats['elapsed']:.1f}s"
+        )
+        return stats
+
+    def _pool(self):
+        if self.executor is not None:
+            return contextlib.nullcontext(self.executor)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="compress")
+
+    def _write_member(self, out, arcname, result):
+        header = self._local_header(arcname, result["codec"], result["mtime"], 0, result["crc"],
+                                    result["size"], result["csize"])
+        out.write(header)
+        out.write(result["payload"])
+        if self.progress:
+            self.progress.add_written(len(header) + result["csize"])
+        self._offset += len(header) + result["csize"]
+
+    def _write_streamed(self, out, full_path, arcname):
+        """大檔案：分段讀取、壓縮並直接寫出，CRC 與大小寫在資料後面的 data descriptor。
+
+        壓縮前無法知道壓縮後的大小，所以不像 compress_member 會在壓縮結果反而變大時改回 store，
+        只依 entropy 決定是否 store。
+        """
+        try:
+            stat = os.stat(full_path)
+            f = open(full_path, "rb")
+        except Exception as e:
+            return {"error": e.__class__.__name__, "message": str(e)}
+
+        with f:
+            codec = self.codec
+            if codec != "store" and self._sample_entropy(f, stat.st_size) >= self.entropy_threshold:
+                codec = "store"
+            compressor = _compressor(codec, self.level)
+            # 讀取途中檔案可能變大，預留一半空間，超過才需要 ZIP64
+            zip64 = stat.st_size >= _ZIP64_LIMIT // 2
+            header = self._local_header(arcname, codec, stat.st_mtime, _FLAG_DATA_DESCRIPTOR, 0, 0, 0, zip64)
+            out.write(header)
+            crc = size = csize = 0
+
+            def emit(data):
+                nonlocal csize
+                if data:
+                    out.write(data)
+                    csize += len(data)
+                    if self.progress:
+                        self.progress.add_written(len(data))
+
+            while True:
+                block = f.read(STREAM_CHUNK)
+                if not block:
+                    break
+                if self.progress:
+                    self.progress.add_read(len(block))
+                crc = zlib.crc32(block, crc)
+                size += len(block)
+                emit(compressor.compress(block) if compressor else block)
+            if compressor:
+                emit(compressor.flush())
+
+        if not zip64 and max(size, csize) >= _ZIP64_LIMIT:
+            raise OSError(f"{self.log_prefix} 檔案在壓縮途中超過 4 GiB：{full_path}")
+        descriptor = struct.pack("<IIQQ" if zip64 else "<IIII", 0x08074B50, crc, csize, size)
+        out.write(descriptor)
+        self._offset += len(header) + csize + len(descriptor)
+        self._entries[-1].update(crc=crc, size=size, csize=csize)
+        return {"codec": codec, "crc": crc, "size": size, "csize": csize}
+
+    @staticmethod
+    def _sample_entropy(f, size):
+        samples = []
+        step = max(size // ENTROPY_SAMPLES, ENTROPY_SAMPLE_SIZE)
+        for offset in range(0, size, step):
+            f.seek(offset)
+            samples.append(f.read(ENTROPY_SAMPLE_SIZE))
+        f.seek(0)
+        return estimate_entropy(b"".join(samples))
+
+    def _local_header(self, arcname, codec, mtime, flags, crc, size, csize, zip64=None):
+        """組出 local file header，並把這個項目記到 central directory 清單（offset 為目前位置）。"""
+        name = arcname.encode("utf-8")
+        method = CODEC_METHODS[codec]
+        flags |= _FLAG_UTF8 if not arcname.isascii() else 0
+        if codec == "lzma":
+            flags |= _FLAG_LZMA_EOS
+        dos_time, dos_date = _dos_datetime(mtime)
+
+        if zip64 is None:
+            zip64 = size >= _ZIP64_LIMIT or csize >= _ZIP64_LIMIT
+        # data descriptor 模式的 crc / 大小寫在資料後面，這裡都是 0
+        extra = struct.pack("<HHQQ", 0x0001, 16, size, csize) if zip64 else b""
+        version = 63 if method in (zipfile.ZIP_LZMA, 93) else (45 if zip64 else 20)
+
+        header = struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, version, flags, method, dos_time, dos_date,
+            crc, _ZIP64_MARKER if zip64 else csize, _ZIP64_MARKER if zip64 else size,
+            len(name), len(extra)
+        )
+        self._entries.append({
+            "name": name, "method": method, "flags": flags, "version": version,
+            "time": dos_time, "date": dos_date, "crc": crc,
+            "size": size, "csize": csize, "offset": self._offset,
+        })
+        return header + name + extra
+
+    def _write_central_directory(self, out):
+        cd_offset = self._offset
+        cd_size = 0
+        for e in self._entries:
+            zip64_fields = []
+            size, csize, offset = e["size"], e["csize"], e["offset"]
+            if size >= _ZIP64_LIMIT:
+                zip64_fields.append(size)
+                size = _ZIP64_MARKER
+            if csize >= _ZIP64_LIMIT:
+                zip64_fields.append(csize)
+                csize = _ZIP64_MARKER
+            if offset >= _ZIP64_LIMIT:
+                zip64_fields.append(offset)
+                offset = _ZIP64_MARKER
+            extra = b""
+            version = e["version"]
+            if zip64_fields:
+                extra = struct.pack(f"<HH{len(zip64_fields)}Q", 0x0001, 8 * len(zip64_fields), *zip64_fields)
+                version = max(version, 45)
+
+            record = struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, version, version, e["flags"], e["method"],
+                e["time"], e["date"], e["crc"], csize, size,
+                len(e["name"]), len(extra), 0, 0, 0, 0, offset
+            ) + e["name"] + extra
+            out.write(record)
+            cd_size += len(record)
+
+        count = len(self._entries)
+        if count >= _ZIP_FILECOUNT_LIMIT or cd_offset >= _ZIP64_LIMIT or cd_size >= _ZIP64_LIMIT:
+            zip64_end_offset = cd_offset + cd_size
+            out.write(struct.pack(
+                "<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset
+            ))
+            out.write(struct.pack("<IIQI", 0x07064B50, 0, zip64_end_offset, 1))
+            out.write(struct.pack(
+                "<IHHHHIIH", 0x06054B50, 0, 0, _ZIP_COUNT_MARKER, _ZIP_COUNT_MARKER,
+                _ZIP64_MARKER, _ZIP64_MARKER, 0
+            ))
+        else:
+            out.write(struct.pack(
+                "<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0
+            ))
@@ -0,0 +1,14 @@
+# 備份目錄內共用的命名規則
+
+import re
+
+# 備份名稱的時間戳記：<伺服器資料夾>_<world|save>_YYYYmmdd_HHMMSS[_inc].zip / .manifest.json / 快照目錄。
+# 精確到秒，同一分鐘內的兩次備份（手動 + 排程、benchmark 連續執行）才不會撞名；
+# 舊版為 YYYYmmdd_HHMM（沒有秒數）；不同分鐘的新舊名稱依字串排序仍是舊到新，清單照常運作
+BACKUP_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+# 名稱結尾的時間戳記（新舊兩種格式），用來辨識快照目錄
+TIMESTAMP_SUFFIX_PATTERN = re.compile(r"_\d{8}_\d{4}(\d{2})?$")
+
+# 寫入中的備份（zip、manifest、快照目錄、暫存資料夾）都先用這個後綴，完成後才原子 rename；
+# 帶有此後綴的項目一律視為未完成，下次備份前由 cleanup_partials 清除
+PARTIAL_SUFFIX = ".partial"
@@ -0,0 +1,205 @@
+import os
+import time
+import struct
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SECTOR_SIZE = 4096
+HEADER_SIZE = 2 * SECTOR_SIZE  # location table + timestamp table
+CHUNKS_PER_REGION = 1024
+REGION_SUFFIX = ".mca"
+REGION_DELTA_SUFFIX = ".mcadelta"
+DELTA_MAX_RATIO = 0.5  # 超過一半 chunk 變更時直接存完整 region，也順便縮短還原時要套用的鏈
+
+_DELTA_MAGIC = b"MCAD"
+_DELTA_VERSION = 1
+_TIMESTAMPS = struct.Struct(">1024I")
+_DELTA_HEADER = struct.Struct(">4sB")
+_DELTA_CHUNK = struct.Struct(">HI")
+
+
+def is_region_file(rel_path):
+    return rel_path.endswith(REGION_SUFFIX)
+
+
+def parse_region(data):
+    """解析 .mca，回傳 (timestamp 表, {chunk index: 含長度前綴的 chunk 紀錄})；空檔或損毀的 chunk 會略過。"""
+    if len(data) < HEADER_SIZE:
+        return bytes(SECTOR_SIZE), {}
+    chunks = {}
+    for index in range(CHUNKS_PER_REGION):
+        offset = int.from_bytes(data[index * 4:index * 4 + 3], "big")
+        if offset == 0 or data[index * 4 + 3] == 0:
+            continue
+        start = offset * SECTOR_SIZE
+        length = int.from_bytes(data[start:start + 4], "big")
+        end = start + 4 + length
+        if length == 0 or end > len(data):
+            continue
+        chunks[index] = data[start:end]
+    return data[SECTOR_SIZE:HEADER_SIZE], chunks
+
+
+def read_timestamps(path):
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    return header[SECTOR_SIZE:HEADER_SIZE] if len(header) == HEADER_SIZE else bytes(SECTOR_SIZE)
+
+
+def build_region(timestamps, chunks):
+    """依 chunk index 順序重新排列 sector，組出合法的 region 檔（內容等價，sector 配置可能與原檔不同）。"""
+    locations = bytearray(SECTOR_SIZE)
+    body = bytearray()
+    sector = 2
+    for index in sorted(chunks):
+        record = chunks[index]
+        count = -(-len(record) // SECTOR_SIZE)
+        if count > 255:
+            raise ValueError(f"chunk {index} 超過 255 個 sector，無法寫入 region 表頭")
+        locations[index * 4:index * 4 + 4] = sector.to_bytes(3, "big") + bytes([count])
+        body += record + bytes(count * SECTOR_SIZE - len(record))
+        sector += count
+    return bytes(locations) + timestamps + bytes(body)
+
+
+def diff_region(data, previous_timestamps, captured_at):
+    """與上次備份時的 timestamp 表比對，回傳 (delta bytes 或 None, 新 timestamp 表)。
+
+    同一秒內被再次寫入的 chunk timestamp 不會變，所以上次擷取時間前後一秒內的 chunk 一律視為變更。
+    回傳 None 表示變更太多，應直接存完整檔案。
+    """
+    timestamps, chunks = parse_region(data)
+    new_ts = _TIMESTAMPS.unpack(timestamps)
+    old_ts = _TIMESTAMPS.unpack(previous_timestamps)
+    cutoff = int(captured_at) - 1
+    changed = [i for i in sorted(chunks) if new_ts[i] != old_ts[i] or new_ts[i] >= cutoff]
+    if chunks and len(changed) > len(chunks) * DELTA_MAX_RATIO:
+        return None, timestamps
+
+    present = bytearray(CHUNKS_PER_REGION // 8)
+    for index in chunks:
+        present[index >> 3] |= 1 << (index & 7)
+    parts = [_DELTA_HEADER.pack(_DELTA_MAGIC, _DELTA_VERSION), timestamps, bytes(present),
+             len(changed).to_bytes(2, "big")]
+    for index in changed:
+        parts.append(_DELTA_CHUNK.pack(index, len(chunks[index])))
+        parts.append(chunks[index])
+    return b"".join(parts), timestamps
+
+
+def apply_region_delta(base_data, delta):
+    """以上一版的 region 檔加上 delta 重建完整 region 檔。"""
+    magic, version = _DELTA_HEADER.unpack_from(delta)
+    if magic != _DELTA_MAGIC or version != _DELTA_VERSION:
+        raise ValueError("不是有效的 region delta")
+    pos = _DELTA_HEADER.size
+    timestamps = delta[pos:pos + SECTOR_SIZE]
+    pos += SECTOR_SIZE
+    present = delta[pos:pos + CHUNKS_PER_REGION // 8]
+    pos += CHUNKS_PER_REGION // 8
+    count = int.from_bytes(delta[pos:pos + 2], "big")
+    pos += 2
+    changed = {}
+    for _ in range(count):
+        index, length = _DELTA_CHUNK.unpack_from(delta, pos)
+        pos += _DELTA_CHUNK.size
+        changed[index] = delta[pos:pos + length]
+        pos += length
+
+    _, base_chunks = parse_region(base_data)
+    chunks = {}
+    for index in range(CHUNKS_PER_REGION):
+        if not present[index >> 3] & (1 << (index & 7)):
+            continue
+        record = changed.get(index, base_chunks.get(index))
+        if record is None:
+            raise ValueError(f"region delta 缺少 chunk {index} 的基底資料")
+        chunks[index] = record
+    return build_region(timestamps, chunks)
+
+
+class RegionState:
+    """每個 region 上次備份時的 chunk timestamp 表，存在 backup_dir/.region_state 下（每個 region 一個小檔）。"""
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+
+    def _path(self, rel_path):
+        return os.path.join(self.state_dir, *rel_path.split("/")) + ".ts"
+
+    def load(self, rel_path):
+        """回傳 (timestamp 表, 擷取時間)，沒有紀錄時回傳 None。"""
+        try:
+            with open(self._path(rel_path), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) != SECTOR_SIZE + 8:
+            return None
+        return data[:SECTOR_SIZE], struct.unpack(">d", data[SECTOR_SIZE:])[0]
+
+    def save(self, updates, removed=(), replace_all=False):
+        """updates 為 {rel_path: (timestamp 表, 擷取時間)}；replace_all 時先清空（完整備份）。"""
+        if replace_all and os.path.isdir(self.state_dir):
+            for root, dirs, files in os.walk(self.state_dir):
+                for file in files:
+                    os.remove(os.path.join(root, file))
+        for rel_path in removed:
+            try:
+                os.remove(self._path(rel_path))
+            except FileNotFoundError:
+                pass
+        for rel_path, (timestamps, captured_at) in updates.items():
+            path = self._path(rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(timestamps + struct.pack(">d", captured_at))
+            os.replace(path + ".tmp", path)
+
+
+def prepare_region_deltas(source_path, rel_paths, state, scratch_dir, incremental, log_prefix="", progress=None):
+    """把要備份的 region 檔換成 delta（增量時），回傳 (仍需完整打包的檔案, {delta 名稱: 檔案路徑}, 狀態更新)。"""
+    full_paths = []
+    delta_files = {}
+    updates = {}
+    delta_bytes = 0
+    for rel_path in rel_paths:
+        if not is_region_file(rel_path):
+            full_paths.append(rel_path)
+            continue
+        full_path = os.path.join(source_path, *rel_path.split("/"))
+        previous = state.load(rel_path) if incremental else None
+        try:
+            captured_at = time.time()
+            if previous is None:
+                # 沒有基準的 region 存完整檔案，只先讀表頭記錄 timestamp
+                updates[rel_path] = (read_timestamps(full_path), captured_at)
+                full_paths.append(rel_path)
+                continue
+            with open(full_path, "rb") as f:
+                data = f.read()
+            if progress:
+                progress.add_read(len(data))
+        except OSError:
+            full_paths.append(rel_path)  # 讓壓縮階段照原本的規則處理讀不到的檔案
+            continue
+
+        delta, timestamps = diff_region(data, previous[0], previous[1])
+        updates[rel_path] = (timestamps, captured_at)
+        if delta is None:
+            full_paths.append(rel_path)
+            continue
+        delta_path = os.path.join(scratch_dir, *rel_path.split("/")) + REGION_DELTA_SUFFIX
+        os.makedirs(os.path.dirname(delta_path), exist_ok=True)
+        with open(delta_path, "wb") as f:
+            f.write(delta)
+        delta_files[rel_path + REGION_DELTA_SUFFIX] = delta_path
+        delta_bytes += len(delta)
+
+    if delta_files:
+        logger.info(
+            f"{log_prefix} 🧩 region delta：{len(delta_files)} 個 region 只存變更 chunk，"
+            f"共 {delta_bytes / 1048576:.1f} MiB"
+        )
+    return full_paths, delta_files, updates
@@ -0,0 +1,379 @@
+import os
+import json
+import hmac
+import time
+import uuid
+import shutil
+import asyncio
+import hashlib
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit, parse_qsl
+import aiohttp
+from yarl import URL
+from backups.chunk_store import MANIFEST_SUFFIX, load_manifest
+from backups.io_control import TokenBucket
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PART_SIZE = 16 * 1024 * 1024
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 規定除了最後一塊，每個 part 至少 5 MiB
+HASH_INLINE_LIMIT = 64 * 1024  # 超過此大小的 payload 在 executor 計算 SHA-256，不卡住 event loop
+STATE_FILENAME = ".replication_state.json"
+CHUNK_LOG_FILENAME = ".replicated_chunks"
+_UNRESERVED = "-_.~"
+
+
+class ReplicationError(Exception):
+    pass
+
+
+def _hmac(key, message):
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+
+def sign_v4(method, url, headers, payload_hash, access_key, secret_key, region, service="s3", now=None):
+    """AWS Signature Version 4，回傳加上 x-amz-* 與 Authorization 的 headers。url 的 path / query 需已編碼。"""
+    now = now or datetime.now(timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date = amz_date[:8]
+    parts = urlsplit(url)
+
+    headers = {k.lower(): str(v).strip() for k, v in headers.items()}
+    headers.update({"host": parts.netloc, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash})
+    query = sorted(parse_qsl(parts.query, keep_blank_values=True))
+    canonical_query = "&".join(f"{quote(k, safe=_UNRESERVED)}={quote(v, safe=_UNRESERVED)}" for k, v in query)
+    signed_headers = ";".join(sorted(headers))
+    canonical_request = "\n".join([
+        method,
+        parts.path or "/",
+        canonical_query,
+        "".join(f"{k}:{headers[k]}\n" for k in sorted(headers)),
+        signed_headers,
+        payload_hash,
+    ])
+
+    scope = f"{date}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+    ])
+    key = _hmac(("AWS4" + secret_key).encode("utf-8"), date)
+    for part in (region, service, "aws4_request"):
+        key = _hmac(key, part)
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    headers["authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+    return headers
+
+
+def _sha256_hex(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _xml_text(body, tag):
+    element = ET.fromstring(body).find(f".//{{*}}{tag}")
+    return element.text if element is not None else None
+
+
+class S3Target:
+    """S3 相容物件儲存（AWS S3、MinIO、R2 ...），使用 path-style URL 與 SigV4 簽章。"""
+
+    def __init__(self, endpoint, bucket, access_key, secret_key, region="us-east-1", timeout=600):
+        self.endpoint = endpoint.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session = None
+
+    async def _request(self, method, key, query="", data=b"", expected=(200,)):
+        url = f"{self.endpoint}/{self.bucket}/{quote(key, safe='/' + _UNRESERVED)}"
+        if query:
+            url += "?" + query
+        if len(data) > HASH_INLINE_LIMIT:
+            payload_hash = await asyncio.get_running_loop().run_in_executor(None, _sha256_hex, data)
+        else:
+            payload_hash = _sha256_hex(data)
+        headers = sign_v4(method, url, {}, payload_hash, self.access_key, self.secret_key, self.region)
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=self.timeout)
+        async with self.session.request(method, URL(url, encoded=True), data=data, headers=headers) as resp:
+            body = await resp.read()
+            if resp.status not in expected:
+                raise ReplicationError(f"S3 {method} {key} 回傳 {resp.status}：{body[:200].decode('utf-8', 'ignore')}")
+            return resp.status, resp.headers, body
+
+    async def head_object(self, key):
+        status, headers, _ = await self._request("HEAD", key, expected=(200, 404))
+        return int(headers.get("Content-Length", 0)) if status == 200 else None
+
+    async def put_object(self, key, data):
+        await self._request("PUT", key, data=data)
+
+    async def create_multipart_upload(self, key):
+        _, _, body = await self._request("POST", key, "uploads")
+        return _xml_text(body, "UploadId")
+
+    async def upload_part(self, key, upload_id, part_number, data):
+        _, headers, _ = await self._request(
+            "PUT", key, f"partNumber={part_number}&uploadId={quote(upload_id, safe=_UNRESERVED)}", data
+        )
+        return headers["ETag"]
+
+    async def list_parts(self, key, upload_id):
+        """已上傳的 {part 編號: ETag}；upload 已不存在（被 abort 或過期）時回傳 None。"""
+        parts = {}
+        marker = 0
+        while True:
+            query = f"part-number-marker={marker}&uploadId={quote(upload_id, safe=_UNRESERVED)}"
+            status, _, body = await self._request("GET", key, query, expected=(200, 404))
+            if status == 404:
+                return None
+            root = ET.fromstring(body)
+            for part in root.findall("{*}Part"):
+                parts[int(part.find("{*}PartNumber").text)] = part.find("{*}ETag").text
+            if _xml_text(body, "IsTruncated") != "true":
+                return parts
+            marker = int(_xml_text(body, "NextPartNumberMarker"))
+
+    async def complete_multipart_upload(self, key, upload_id, parts):
+        body = "<CompleteMultipartUpload>" + "".join(
+            f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>" for number, etag in parts
+        ) + "</CompleteMultipartUpload>"
+        _, _, response = await self._request(
+            "POST", key, f"uploadId={quote(upload_id, safe=_UNRESERVED)}", body.encode("utf-8")
+        )
+        # S3 即使 200 也可能在 body 回傳錯誤
+        if b"<Error>" in response:
+            raise ReplicationError(f"CompleteMultipartUpload 失敗：{response[:200].decode('utf-8', 'ignore')}")
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+
+class LocalTarget:
+    """把物件寫到本機資料夾的 S3 替身（測試或外接硬碟用），介面與 S3Target 相同。"""
+
+    def __init__(self, root):
+        self.root = root
+        self.upload_dir = os.path.join(root, ".multipart")
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def head_object(self, key):
+        path = self._path(key)
+        return os.path.getsize(path) if os.path.isfile(path) else None
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    async def put_object(self, key, data):
+        await self._run(self._write, self._path(key), data)
+
+    async def create_multipart_upload(self, key):
+        upload_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.upload_dir, upload_id), exist_ok=True)
+        return upload_id
+
+    async def upload_part(self, key, upload_id, part_number, data):
+        def write():
+            self._write(os.path.join(self.upload_dir, upload_id, f"{part_number:05d}"), data)
+            return f'"{hashlib.md5(data).hexdigest()}"'
+
+        return await self._run(write)
+
+    def _list_parts(self, upload_id):
+        part_dir = os.path.join(self.upload_dir, upload_id)
+        if not os.path.isdir(part_dir):
+            return None
+        parts = {}
+        for name in os.listdir(part_dir):
+            if name.isdigit():
+                with open(os.path.join(part_dir, name), "rb") as f:
+                    parts[int(name)] = f'"{hashlib.md5(f.read()).hexdigest()}"'
+        return parts
+
+    async def list_parts(self, key, upload_id):
+        return await self._run(self._list_parts, upload_id)
+
+    def _complete(self, key, upload_id, parts):
+        part_dir = os.path.join(self.upload_dir, upload_id)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as out:
+            for number, _ in parts:
+                with open(os.path.join(part_dir, f"{number:05d}"), "rb") as f:
+                    shutil.copyfileobj(f, out)
+        os.replace(path + ".tmp", path)
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+    async def complete_multipart_upload(self, key, upload_id, parts):
+        await self._run(self._complete, key, upload_id, parts)
+
+    async def close(self):
+        pass
+
+
+def _read_range(path, offset, size):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+class Replicator:
+    """把備份上傳到異地物件儲存：大檔平行 multipart，進度寫入狀態檔，中斷後從已完成的 part 繼續。"""
+
+    def __init__(self, target, backup_root, prefix="", part_size=PART_SIZE, concurrency=4, bandwidth_bps=None):
+        self.target = target
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.concurrency = concurrency
+        self.limiter = TokenBucket(bandwidth_bps) if bandwidth_bps else None
+        self.state_path = os.path.join(backup_root, STATE_FILENAME)
+        self.chunk_log_path = os.path.join(backup_root, CHUNK_LOG_FILENAME)
+        self.state = self._load_state()
+        self.uploaded_chunks = self._load_chunk_log()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = {}
+        except Exception as e:
+            logger.warning(f"⚠️ 無法讀取異地備份狀態檔，將重新上傳：{e}")
+            state = {}
+        state.setdefault("uploads", {})
+        state.setdefault("pending", [])
+        return state
+
+    def save_state(self):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def _load_chunk_log(self):
+        if not os.path.exists(self.chunk_log_path):
+            return set()
+        with open(self.chunk_log_path, "r", encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+
+    async def _throttle(self, amount):
+        if self.limiter:
+            wait = self.limiter.reserve(amount)
+            if wait:
+                await asyncio.sleep(wait)
+
+    async def replicate(self, handler, name):
+        """上傳單一備份（zip / 快照目錄 / 去重 manifest 與其 chunk），回傳 {files, bytes, uploaded, elapsed}。"""
+        started = time.perf_counter()
+        path = os.path.join(handler.backup_dir, name)
+        base_key = f"{self.prefix}{os.path.basename(handler.backup_dir)}/{name}"
+        stats = {"files": 0, "bytes": 0, "uploaded": 0}
+
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                for file in files:
+                    full_path = os.path.join(root, file)
+                    rel_path = os.path.relpath(full_path, path).replace(os.sep, "/")
+                    await self._upload_file(full_path, f"{base_key}/{rel_path}", stats)
+        elif name.endswith(MANIFEST_SUFFIX):
+            await self._upload_chunks(handler, path, stats)
+            await self._upload_file(path, base_key, stats)
+        else:
+            await self._upload_file(path, base_key, stats)
+
+        stats["elapsed"] = time.perf_counter() - started
+        return stats
+
+    async def _upload_chunks(self, handler, manifest_path, stats):
+        if handler.chunk_store is None:
+            raise ReplicationError("此備份為去重備份，但目前的 handler 沒有啟用 chunk store")
+        # chunk 在異地同樣以內容定址共用，已上傳過的不再重傳
+        digests = {digest for entry in load_manifest(manifest_path)["files"] for digest in entry["chunks"]}
+        new_digests = sorted(digests - self.uploaded_chunks)
+        with open(self.chunk_log_path, "a", encoding="utf-8") as log:
+            for digest in new_digests:
+                chunk_path = handler.chunk_store.chunk_path(digest)
+                await self._upload_file(chunk_path, f"{self.prefix}.chunkstore/{digest[:2]}/{digest}", stats)
+                self.uploaded_chunks.add(digest)
+                log.write(digest + "\n")
+
+    async def _upload_file(self, path, key, stats):
+        size = os.path.getsize(path)
+        stats["files"] += 1
+        stats["bytes"] += size
+        # 備份檔寫完後不再變動，遠端已有同大小的物件就視為上傳過（重試 / 重啟後略過）
+        if key not in self.state["uploads"] and await self.target.head_object(key) == size:
+            return
+        if size <= self.part_size:
+            data = await asyncio.get_running_loop().run_in_executor(None, _read_range, path, 0, size)
+            await self._throttle(len(data))
+            await self.target.put_object(key, data)
+            stats["uploaded"] += len(data)
+            return
+        await self._upload_multipart(path, key, size, stats)
+
+    async def _upload_multipart(self, path, key, size, stats):
+        loop = asyncio.get_running_loop()
+        mtime_ns = os.stat(path).st_mtime_ns
+        entry = self.state["uploads"].get(key)
+        parts = {}
+        if entry and (entry["size"], entry["mtime_ns"], entry["part_size"]) == (size, mtime_ns, self.part_size):
+            remote = await self.target.list_parts(key, entry["upload_id"])
+            if remote is not None:
+                # 以遠端實際存在的 part 為準，狀態檔只用來找回 upload_id
+                parts = remote
+                logger.info(f"☁️ 繼續上傳 {key}：已完成 {len(parts)} 個 part")
+            else:
+                entry = None
+        else:
+            entry = None
+
+        if entry is None:
+            entry = {
+                "upload_id": await self.target.create_multipart_upload(key),
+                "size": size, "mtime_ns": mtime_ns, "part_size": self.part_size,
+            }
+            self.state["uploads"][key] = entry
+            self.save_state()
+
+        part_count = -(-size // self.part_size)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(number):
+            async with semaphore:
+                offset = (number - 1) * self.part_size
+                data = await loop.run_in_executor(None, _read_range, path, offset, self.part_size)
+                await self._throttle(len(data))
+                parts[number] = await self.target.upload_part(key, entry["upload_id"], number, data)
+                stats["uploaded"] += len(data)
+
+        tasks = [asyncio.ensure_future(send(n)) for n in range(1, part_count + 1) if n not in parts]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # 一個 part 失敗就停掉其他還在上傳的 part，避免重試排程後舊的上傳仍在背景佔用頻寬
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        await self.target.complete_multipart_upload(key, entry["upload_id"], sorted(parts.items()))
+        del self.state["uploads"][key]
+        self.save_state()
+
+    async def close(self):
+        await self.target.close()
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import shutil
+import struct
+import zipfile
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from backups.chunk_store import MANIFEST_SUFFIX, load_manifest
+from backups.change_manifest import BACKUP_META_NAME
+from backups.parallel_archive import zstandard
+from backups.region_delta import REGION_DELTA_SUFFIX, apply_region_delta
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+RESTORE_WORKERS = 8
+_ZIP_METHOD_ZSTD = 93
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+
+
+class _BackupReader:
+    """各種讀取器共用的 with 介面；用完要 close，Windows 上開著的 handle 會讓保留策略無法刪除備份。"""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ZipBackupReader(_BackupReader):
+    """以 central directory 隨機存取 zip 內的單一檔案，不需要解壓整個備份。"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._handles = []
+        self._handles_lock = threading.Lock()
+        with zipfile.ZipFile(path) as zipf:
+            self.infos = {info.filename: info for info in zipf.infolist() if not info.is_dir()}
+        self.meta = {}
+        if BACKUP_META_NAME in self.infos:
+            self.meta = json.loads(self.read(BACKUP_META_NAME))
+            del self.infos[BACKUP_META_NAME]
+
+    def _zipfile(self):
+        # zipfile.ZipFile 不是 thread-safe，每個執行緒各自開一個 handle
+        zipf = getattr(self._local, "zipf", None)
+        if zipf is None:
+            zipf = self._local.zipf = zipfile.ZipFile(self.path)
+            with self._handles_lock:
+                self._handles.append(zipf)
+        return zipf
+
+    def close(self):
+        """關閉所有執行緒開過的 handle；之後再讀取會重新開啟。"""
+        with self._handles_lock:
+            handles, self._handles = self._handles, []
+        for zipf in handles:
+            zipf.close()
+        self._local = threading.local()
+
+    def list_files(self):
+        return {name: info.file_size for name, info in self.infos.items()}
+
+    def read(self, name):
+        info = self.infos.get(name) or self._zipfile().getinfo(name)
+        if info.compress_type != _ZIP_METHOD_ZSTD:
+            return self._zipfile().read(info)
+
+        # 舊版 zipfile 不支援 zstd，直接讀取原始壓縮資料後自行解壓
+        if zstandard is None:
+            raise RuntimeError("此備份使用 zstd 壓縮，需要安裝 zstandard 套件")
+        with open(self.path, "rb") as f:
+            f.seek(info.header_offset)
+            header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            f.seek(header[9] + header[10], os.SEEK_CUR)
+            data = zstandard.ZstdDecompressor().decompress(f.read(info.compress_size), info.file_size)
+        if zipfile.crc32(data) != info.CRC:
+            raise zipfile.BadZipFile(f"CRC 校驗失敗：{name}")
+        return data
+
+
+class ManifestBackupReader(_BackupReader):
+    def __init__(self, path, chunk_store):
+        self.chunk_store = chunk_store
+        self.entries = {entry["path"]: entry for entry in load_manifest(path)["files"]}
+        self.meta = {}
+
+    def list_files(self):
+        return {name: entry["size"] for name, entry in self.entries.items()}
+
+    def read(self, name):
+        return b"".join(self.chunk_store.get_chunk(digest) for digest in self.entries[name]["chunks"])
+
+
+class DirectoryBackupReader(_BackupReader):
+    def __init__(self, path):
+        self.path = path
+        self.meta = {}
+
+    def list_files(self):
+        files = {}
+        for root, dirs, filenames in os.walk(self.path):
+            for file in filenames:
+                full_path = os.path.join(root, file)
+                rel_path = os.path.relpath(full_path, self.path).replace(os.sep, "/")
+                files[rel_path] = os.path.getsize(full_path)
+        return files
+
+    def read(self, name):
+        with open(os.path.join(self.path, *name.split("/")), "rb") as f:
+            return f.read()
+
+
+class ChainBackupReader(_BackupReader):
+    """增量備份鏈：新的一層覆蓋舊的一層，並套用每層記錄的刪除清單；region delta 會往舊的層找基底重建。"""
+
+    def __init__(self, layers):
+        self.layers = layers  # 新到舊
+        self.meta = layers[0].meta
+        self._contents = [layer.list_files() for layer in layers]
+        self._owners = {}
+        deleted = set()
+        for index, files in enumerate(self._contents):
+            for stored_name, size in files.items():
+                name = stored_name
+                if name.endswith(REGION_DELTA_SUFFIX):
+                    name = name[:-len(REGION_DELTA_SUFFIX)]
+                if name not in self._owners and name not in deleted:
+                    self._owners[name] = (index, size)
+            deleted.update(layers[index].meta.get("deleted", []))
+
+    def list_files(self):
+        return {name: size for name, (index, size) in self._owners.items()}
+
+    def close(self):
+        for layer in self.layers:
+            layer.close()
+
+    def read(self, name):
+        return self._read(name, self._owners[name][0])
+
+    def _read(self, name, start):
+        for index in range(start, len(self.layers)):
+            if name in self._contents[index]:
+                return self.layers[index].read(name)
+            if name + REGION_DELTA_SUFFIX in self._contents[index]:
+                delta = self.layers[index].read(name + REGION_DELTA_SUFFIX)
+                return apply_region_delta(self._read(name, index + 1), delta)
+        raise FileNotFoundError(f"增量備份鏈中找不到 region 基底：{name}")
+
+
+def open_backup(handler, name):
+    path = os.path.join(handler.backup_dir, name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"找不到備份：{name}")
+    if os.path.isdir(path):
+        return DirectoryBackupReader(path)
+    if name.endswith(MANIFEST_SUFFIX):
+        if handler.chunk_store is None:
+            raise RuntimeError("此備份為去重備份，但目前的 handler 沒有啟用 chunk store")
+        return ManifestBackupReader(path, handler.chunk_store)
+
+    layers = [ZipBackupReader(path)]
+    try:
+        while layers[-1].meta.get("parent"):
+            parent_path = os.path.join(handler.backup_dir, layers[-1].meta["parent"])
+            if not os.path.exists(parent_path):
+                raise FileNotFoundError(f"增量備份鏈中斷，缺少 parent：{layers[-1].meta['parent']}")
+            layers.append(ZipBackupReader(parent_path))
+    except BaseException:
+        for layer in layers:
+            layer.close()
+        raise
+    return layers[0] if len(layers) == 1 else ChainBackupReader(layers)
+
+
+def region_path(region_x, region_z, dimension="overworld"):
+    prefix = {"overworld": "", "nether": "DIM-1/", "end": "DIM1/"}[dimension]
+    return f"{prefix}region/r.{region_x}.{region_z}.mca"
+
+
+def extract_files(reader, names, target_dir, workers=RESTORE_WORKERS):
+    """平行取出指定檔案到 target_dir，回傳 {files, bytes, elapsed}。"""
+    started = time.perf_counter()
+
+    def extract(name):
+        data = reader.read(name)
+        dest = os.path.join(target_dir, *name.split("/"))
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(dest, "wb") as f:
+            f.write(data)
+        return len(data)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        written = sum(pool.map(extract, names))
+    return {"files": len(names), "bytes": written, "elapsed": time.perf_counter() - started}
+
+
+def restore_full(reader, target_dir, workers=RESTORE_WORKERS):
+    """先完整解到暫存目錄，成功後才把現有資料夾改名保留、換上還原結果。"""
+    target_dir = target_dir.rstrip("/\\")
+    staging_dir = target_dir + ".restoring"
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+    try:
+        stats = extract_files(reader, list(reader.list_files()), staging_dir, workers)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    previous_dir = None
+    if os.path.exists(target_dir):
+        previous_dir = f"{target_dir}.pre_restore_{datetime.now():%Y%m%d_%H%M%S}"
+        os.rename(target_dir, previous_dir)
+    os.rename(staging_dir, target_dir)
+    stats["previous_dir"] = previous_dir
+    return stats
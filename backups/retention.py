@@ -0,0 +1,111 @@
+import re
+import time
+from datetime import datetime
+
+_SPEC_PATTERN = re.compile(r"^(\d+)([hdw])$")
+
+
+class RetentionPolicy:
+    """祖父-父-子（GFS）保留策略：近期全留，之後每天留一份、每週留一份，並可設定容量上限。"""
+
+    def __init__(self, hourly_hours=24, daily_days=14, weekly_weeks=8, max_bytes=None):
+        self.hourly_hours = hourly_hours
+        self.daily_days = daily_days
+        self.weekly_weeks = weekly_weeks
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def parse(cls, spec, max_bytes=None):
+        """解析像 "24h,14d,8w" 的設定字串，未列出的層級視為 0。"""
+        tiers = {"h": 0, "d": 0, "w": 0}
+        for part in filter(None, (p.strip() for p in spec.split(","))):
+            match = _SPEC_PATTERN.match(part)
+            if not match:
+                raise ValueError(f"無法解析保留策略：{part}（格式如 24h,14d,8w）")
+            tiers[match.group(2)] = int(match.group(1))
+        return cls(tiers["h"], tiers["d"], tiers["w"], max_bytes=max_bytes)
+
+    def describe(self):
+        text = f"{self.hourly_hours}h / {self.daily_days}d / {self.weekly_weeks}w"
+        if self.max_bytes:
+            text += f"，上限 {self.max_bytes / 1073741824:.1f} GiB"
+        return text
+
+    def select(self, entries, now=None):
+        """entries 為新到舊的備份紀錄（需有 name / created_at / parent / size），回傳要刪除的名稱清單。"""
+        now = now or time.time()
+        hourly_cutoff = now - self.hourly_hours * 3600
+        daily_cutoff = now - self.daily_days * 86400
+        weekly_cutoff = now - self.weekly_weeks * 7 * 86400
+
+        keep = set()
+        seen_days = set()
+        seen_weeks = set()
+        # 新到舊掃一次：落在某層區間內的備份只由該層決定去留，每個日 / 週桶保留遇到的第一份（即該桶最新的一份）；
+        # 任何保留下來的備份都佔掉它所在的日與週，較舊的層級不會在同一天 / 同一週再多留一份
+        for entry in entries:
+            created = entry["created_at"]
+            moment = datetime.fromtimestamp(created)
+            day = moment.date()
+            week = moment.isocalendar()[:2]
+            if created >= hourly_cutoff:
+                taken = False
+            elif created >= daily_cutoff:
+                taken = day in seen_days
+            elif created >= weekly_cutoff:
+                taken = week in seen_weeks
+            else:
+                continue
+            if taken:
+                continue
+            keep.add(entry["name"])
+            seen_days.add(day)
+            seen_weeks.add(week)
+
+        parents = {entry["name"]: entry.get("parent") for entry in entries}
+        self._keep_parent_chains(entries, keep, parents)
+
+        if self.max_bytes:
+            self._apply_budget(entries, keep, parents)
+
+        return [entry["name"] for entry in entries if entry["name"] not in keep]
+
+    @staticmethod
+    def _keep_parent_chains(entries, keep, parents):
+        # 保留下來的增量備份需要整條 parent 鏈才能還原
+        for entry in entries:
+            if entry["name"] not in keep:
+                continue
+            parent = entry.get("parent")
+            while parent and parent not in keep and parent in parents:
+                keep.add(parent)
+                parent = parents[parent]
+
+    def _apply_budget(self, entries, keep, parents):
+        sizes = {entry["name"]: entry.get("size") or 0 for entry in entries}
+        total = sum(sizes[name] for name in keep)
+        if total <= self.max_bytes:
+            return
+
+        children = {}
+        for name in keep:
+            parent = parents.get(name)
+            if parent:
+                children[parent] = children.get(parent, 0) + 1
+
+        newest = entries[0]["name"]
+        oldest_first = [entry["name"] for entry in reversed(entries)]
+        # 每次刪除目前最舊、可刪的一份；最新一份永遠保留，仍被增量備份依賴的 parent 不能刪
+        while total > self.max_bytes:
+            candidate = next(
+                (name for name in oldest_first
+                 if name in keep and name != newest and not children.get(name)),
+                None
+            )
+            if candidate is None:
+                break
+            keep.discard(candidate)
+            total -= sizes[candidate]
+            parent = parents.get(candidate)
+            if parent:
+                children[parent] -= 1
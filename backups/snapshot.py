@@ -0,0 +1,91 @@
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl，直接走一般複製
+    fcntl = None
+
+FICLONE = 0x40049409  # Linux ioctl：btrfs / xfs 等支援 reflink 的檔案系統可 O(1) 複製
+STAGE_WORKERS = 8
+
+
+def clone_file(src, dst):
+    """盡量以 reflink 複製檔案，不支援時退回 shutil.copy2；兩者都保留 mtime。
+
+    注意不能用 hardlink：伺服器 save-on 後會原地改寫 region 檔，hardlink 會讓暫存副本跟著被改。
+    """
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def _sync_file(src, dst):
+    try:
+        src_stat = os.stat(src)
+        try:
+            dst_stat = os.stat(dst)
+            if dst_stat.st_size == src_stat.st_size and dst_stat.st_mtime_ns == src_stat.st_mtime_ns:
+                return "unchanged", 0
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        clone_file(src, dst)
+        return "copied", src_stat.st_size
+    except PermissionError as e:
+        return "locked", str(e)
+    except Exception as e:
+        return "failed", str(e)
+
+
+def stage_tree(source_path, staging_dir, log_prefix="", workers=STAGE_WORKERS, progress=None):
+    """把 source_path 同步到常駐的 staging_dir：只複製 size / mtime 不同的檔案，並移除來源已刪除的檔案。"""
+    started = time.perf_counter()
+    pairs = []
+    wanted = set()
+    for root, dirs, files in os.walk(source_path):
+        for file in files:
+            src = os.path.join(root, file)
+            rel_path = os.path.relpath(src, source_path)
+            wanted.add(rel_path)
+            pairs.append((src, os.path.join(staging_dir, rel_path)))
+
+    stats = {"copied": 0, "unchanged": 0, "skipped": 0, "removed": 0, "bytes": 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (src, dst), (status, detail) in zip(pairs, pool.map(lambda p: _sync_file(*p), pairs)):
+            if status == "copied":
+                stats["copied"] += 1
+                stats["bytes"] += detail
+                if progress:
+                    # 伺服器暫停寫入期間只記錄進度不限速，避免拉長 save-off 時間
+                    progress.add_read(detail, throttle=False)
+                    progress.add_written(detail, throttle=False)
+            elif status == "unchanged":
+                stats["unchanged"] += 1
+            else:
+                stats["skipped"] += 1
+                if status == "locked":
+                    logger.warning(f"{log_prefix} 跳過被鎖定檔案：{src}（{detail}）")
+                else:
+                    logger.warning(f"{log_prefix} 複製檔案失敗：{src}（{detail}）")
+
+    for root, dirs, files in os.walk(staging_dir):
+        for file in files:
+            dst = os.path.join(root, file)
+            if os.path.relpath(dst, staging_dir) not in wanted:
+                os.remove(dst)
+                stats["removed"] += 1
+
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,330 @@
+"""備份效能基準測試。
+
+以合成的 Minecraft / 7 Days to Die 存檔跑過每種 handler 與備份模式，量測完整備份、無變更掃描與增量備份的
+耗時、吞吐量、壓縮率與記憶體峰值，結果寫成 JSON 並與上一次的結果比較：
+
+    python -m benchmarks.backup_bench --files 300 --mean-kb 512 --incompressible 0.6
+    python -m benchmarks.backup_bench --worlds minecraft --variants zip,zip-inc-delta --codecs deflate,zstd
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import psutil
+from benchmarks.synthetic_world import SyntheticWorld, SIZE_DISTRIBUTIONS, WORLD_KINDS
+from backups.minecraft_backup import MinecraftBackupHandler
+from backups.seven_days_backup import SevenDaysBackupHandler
+from backups.parallel_archive import available_codecs
+from backups.retention import RetentionPolicy
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+MEMORY_SAMPLE_INTERVAL = 0.01
+
+# 名稱 -> handler 參數；codec 只對 zip 系列有意義
+VARIANTS = {
+    "zip": {"mode": "zip"},
+    "zip-inc": {"mode": "zip", "incremental": True},
+    "zip-inc-delta": {"mode": "zip", "incremental": True, "region_delta": True},
+    "dedup": {"mode": "dedup"},
+    "link": {"mode": "link"},
+}
+COMPARED_METRICS = ("seconds", "mib_per_s", "ratio", "peak_rss_mib")
+
+
+class PeakMemory:
+    """背景執行緒取樣 RSS，記錄區間內相對於開始時的最大增量（含 C 擴充配置的記憶體）。"""
+
+    def __init__(self):
+        self.process = psutil.Process()
+        self.baseline = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.baseline = self.peak = self.process.memory_info().rss
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(MEMORY_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+    @property
+    def peak_delta_mib(self):
+        return (self.peak - self.baseline) / 1048576
+
+
+def disk_usage(root):
+    """root 底下實際佔用的位元組；hardlink 只算一次，才能反映 link 模式真正新增的空間。"""
+    seen = set()
+    total = 0
+    for dirpath, dirs, files in os.walk(root):
+        for name in files:
+            st = os.stat(os.path.join(dirpath, name))
+            if (st.st_dev, st.st_ino) in seen:
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            total += st.st_size
+    return total
+
+
+def source_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, dirs, files in os.walk(path) for f in files)
+
+
+def build_handler(world, backup_root, variant, codec, workers):
+    options = dict(VARIANTS[variant])
+    region_delta = options.pop("region_delta", False)
+    common = dict(backup_root=backup_root, codec=codec, workers=workers, **options)
+    if world.kind == "minecraft":
+        return MinecraftBackupHandler(world_path=world.source_path, region_delta=region_delta, **common)
+    return SevenDaysBackupHandler(save_path=world.source_path, **common)
+
+
+async def run_backup(handler):
+    """與 BackupManager.backup_handler 相同的流程，但不需要設定檔與索引。"""
+    handler.progress.start()
+    try:
+        await asyncio.get_running_loop().run_in_executor(handler.executor, handler.cleanup_partials)
+        final_path = await handler.perform_backup()
+        handler.progress.finish("success" if final_path else "skipped")
+        return final_path
+    except Exception:
+        handler.progress.finish("failed")
+        raise
+
+
+async def measure(handler, backup_root, total_bytes):
+    before = disk_usage(backup_root)
+    with PeakMemory() as memory:
+        started = time.perf_counter()
+        final_path = await run_backup(handler)
+        elapsed = time.perf_counter() - started
+    written = disk_usage(backup_root) - before
+    return {
+        "backup": os.path.basename(final_path) if final_path else None,
+        "seconds": round(elapsed, 4),
+        "mib_per_s": round(total_bytes / 1048576 / elapsed, 2) if elapsed else None,
+        "bytes_written": written,
+        "ratio": round(written / total_bytes, 4) if total_bytes else None,
+        "peak_rss_mib": round(memory.peak_delta_mib, 1),
+    }
+
+
+def wait_next_second():
+    # 備份檔名精確到秒，同一秒內的兩次備份會撞名
+    time.sleep(1 - time.time() % 1 + 0.01)
+
+
+async def bench_variant(template, world, variant, codec, args):
+    work_dir = tempfile.mkdtemp(prefix="backup_bench_", dir=args.work_dir)
+    try:
+        world_copy = SyntheticWorld(
+            work_dir, world.kind, world.file_count, world.size_dist,
+            world.mean_bytes / 1024, world.incompressible, seed=args.seed
+        )
+        shutil.copytree(template, world_copy.source_path, copy_function=shutil.copy2)
+        backup_root = os.path.join(work_dir, "backups")
+        os.makedirs(backup_root)
+        handler = build_handler(world_copy, backup_root, variant, codec, args.workers)
+        handler.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bench")
+
+        full_bytes = source_bytes(world_copy.source_path)
+        full = await measure(handler, backup_root, full_bytes)
+        wait_next_second()
+        noop = await measure(handler, backup_root, full_bytes)
+        mutation = world_copy.mutate(args.change_fraction, seed=args.seed + 1)
+        wait_next_second()
+        incremental = await measure(handler, backup_root, source_bytes(world_copy.source_path))
+        incremental["vs_full_bytes"] = (
+            round(incremental["bytes_written"] / full["bytes_written"], 4) if full["bytes_written"] else None
+        )
+        incremental["vs_full_seconds"] = round(incremental["seconds"] / full["seconds"], 4) if full["seconds"] else None
+        handler.executor.shutdown()
+        return {
+            "world": world.kind,
+            "variant": variant,
+            "codec": codec if handler.mode == "zip" else None,
+            "source_bytes": full_bytes,
+            "full": full,
+            "noop_scan": {"seconds": noop["seconds"], "skipped": noop["backup"] is None},
+            "mutation": mutation,
+            "incremental": incremental,
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_retention(entry_count=24 * 365):
+    """以一年份的每小時備份量測 RetentionPolicy.select（每次自動備份後都會執行）。"""
+    now = time.time()
+    entries = [
+        {"name": f"bench_{i:06d}.zip", "created_at": now - i * 3600, "parent": None, "size": 1 << 20}
+        for i in range(entry_count)
+    ]
+    policy = RetentionPolicy(hourly_hours=36, daily_days=14, weekly_weeks=8, max_bytes=200 << 20)
+    started = time.perf_counter()
+    removed = policy.select(entries, now=now)
+    return {"entries": entry_count, "removed": len(removed), "seconds": round(time.perf_counter() - started, 4)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(RESULTS_DIR), timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def result_key(result):
+    return result["world"], result["variant"], result["codec"]
+
+
+def latest_result_file(exclude=None):
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    files = sorted(
+        os.path.join(RESULTS_DIR, f) for f in os.listdir(RESULTS_DIR)
+        if f.startswith("backup_") and f.endswith(".json")
+    )
+    files = [f for f in files if f != exclude]
+    return files[-1] if files else None
+
+
+def format_delta(current, previous):
+    if current is None or not previous:
+        return ""
+    return f" ({(current - previous) / previous * 100:+.0f}%)"
+
+
+def print_report(report, previous=None):
+    baseline = {result_key(r): r for r in previous["results"]} if previous else {}
+    if previous:
+        print(f"與 {previous['meta']['started']}（{previous['meta'].get('revision') or '?'}）比較：")
+    header = f"{'world':<10}{'variant':<15}{'codec':<9}{'phase':<13}" + "".join(f"{m:>22}" for m in COMPARED_METRICS)
+    print(header)
+    print("-" * len(header))
+    for result in report["results"]:
+        old = baseline.get(result_key(result), {})
+        for phase in ("full", "incremental"):
+            row = f"{result['world']:<10}{result['variant']:<15}{result['codec'] or '-':<9}{phase:<13}"
+            for metric in COMPARED_METRICS:
+                value = result[phase][metric]
+                text = "-" if value is None else f"{value}"
+                text += format_delta(value, old.get(phase, {}).get(metric))
+                row += f"{text:>22}"
+            print(row)
+        print(f"{'':<47}no-op 掃描 {result['noop_scan']['seconds']}s，增量寫入為完整備份的 "
+              f"{result['incremental']['vs_full_bytes']}")
+    retention = report["retention"]
+    print(f"\nRetentionPolicy.select：{retention['entries']} 筆 → {retention['seconds']}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="備份效能基準測試")
+    parser.add_argument("--worlds", default=",".join(WORLD_KINDS), help="要測的世界類型（逗號分隔）")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="備份模式（逗號分隔）")
+    parser.add_argument("--codecs", default="deflate", help="zip 系列使用的壓縮格式（逗號分隔）")
+    parser.add_argument("--files", type=int, default=200, help="每個世界的檔案數")
+    parser.add_argument("--size-dist", choices=SIZE_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--mean-kb", type=float, default=256, help="平均檔案大小（KiB）")
+    parser.add_argument("--incompressible", type=float, default=0.5, help="不可壓縮資料比例 0~1")
+    parser.add_argument("--change-fraction", type=float, default=0.05, help="增量前修改的檔案比例")
+    parser.add_argument("--workers", type=int, default=None, help="壓縮執行緒數（預設同 handler）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--work-dir", default=None, help="產生世界與備份的暫存位置（預設系統暫存目錄）")
+    parser.add_argument("--output", default=None, help="結果 JSON 路徑（預設 benchmarks/results/）")
+    parser.add_argument("--compare", default=None, help="要比較的舊結果 JSON（預設為上一次的結果）")
+    parser.add_argument("-v", "--verbose", action="store_true", help="顯示 handler 的備份日誌")
+    return parser.parse_args(argv)
+
+
+async def run(args):
+    codecs = [c for c in args.codecs.split(",") if c]
+    missing = [c for c in codecs if c not in available_codecs()]
+    if missing:
+        raise SystemExit(f"不支援或未安裝的壓縮格式：{', '.join(missing)}")
+
+    report = {
+        "meta": {
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {
+                "files": args.files, "size_dist": args.size_dist, "mean_kb": args.mean_kb,
+                "incompressible": args.incompressible, "change_fraction": args.change_fraction,
+                "workers": args.workers, "seed": args.seed,
+            },
+        },
+        "results": [],
+    }
+    template_root = tempfile.mkdtemp(prefix="backup_bench_world_", dir=args.work_dir)
+    try:
+        for kind in args.worlds.split(","):
+            world = SyntheticWorld(
+                template_root, kind, args.files, args.size_dist, args.mean_kb, args.incompressible, args.seed
+            )
+            generated = world.generate()
+            print(f"🌍 {kind}：{generated['files']} 個檔案，{generated['bytes'] / 1048576:.1f} MiB")
+            for variant in args.variants.split(","):
+                if variant not in VARIANTS:
+                    raise SystemExit(f"未知的備份模式：{variant}")
+                if VARIANTS[variant].get("region_delta") and kind != "minecraft":
+                    continue
+                for codec in codecs if VARIANTS[variant]["mode"] == "zip" else codecs[:1]:
+                    print(f"⏱️ {kind} / {variant} / {codec if VARIANTS[variant]['mode'] == 'zip' else '-'}")
+                    report["results"].append(await bench_variant(world.source_path, world, variant, codec, args))
+    finally:
+        shutil.rmtree(template_root, ignore_errors=True)
+    report["retention"] = bench_retention()
+    return report
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.verbose:
+        logging.getLogger("backups").setLevel(logging.WARNING)
+
+    report = asyncio.run(run(args))
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"backup_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    previous_path = args.compare or latest_result_file(exclude=output)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    previous = None
+    if previous_path:
+        with open(previous_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous["meta"]["params"] != report["meta"]["params"]:
+            print(f"⚠️ {previous_path} 的測試參數不同，比較結果僅供參考")
+    print()
+    print_report(report, previous)
+    print(f"\n📄 結果已寫入 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import math
+import time
+import random
+import struct
+from backups.region_delta import SECTOR_SIZE, HEADER_SIZE, CHUNKS_PER_REGION
+
+BLOCK_SIZE = 4096
+SIZE_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+WORLD_KINDS = ("minecraft", "7dtd")
+CHUNK_TARGET_SIZE = 8 * 1024  # 合成 region 中每個 chunk 的平均大小
+
+_WORDS = (
+    b"minecraft:stone", b"minecraft:dirt", b"minecraft:grass_block", b"minecraft:air", b"Sections",
+    b"BlockStates", b"Palette", b"Biomes", b"Heightmaps", b"xPos", b"zPos", b"Status", b"full",
+    b"Inventory", b"Health", b"Pos", b"Motion", b"Rotation", b"zombie", b"ironOre", b"terrDirt",
+)
+
+
+class SyntheticWorld:
+    """產生近似 Minecraft / 7 Days to Die 存檔結構的測試資料，並能模擬遊戲執行中的部分變更。
+
+    incompressible 為不可壓縮（隨機）資料所佔比例；Minecraft region 檔會寫出合法的表頭與 chunk 紀錄，
+    讓 region delta 也能正常運作。
+    """
+
+    def __init__(self, root, kind="minecraft", file_count=200, size_dist="lognormal",
+                 mean_kb=256, incompressible=0.5, seed=1):
+        if kind not in WORLD_KINDS:
+            raise ValueError(f"不支援的世界類型：{kind}")
+        if size_dist not in SIZE_DISTRIBUTIONS:
+            raise ValueError(f"不支援的大小分布：{size_dist}")
+        self.root = root
+        self.kind = kind
+        self.file_count = file_count
+        self.size_dist = size_dist
+        self.mean_bytes = int(mean_kb * 1024)
+        self.incompressible = incompressible
+        self.rng = random.Random(seed)
+        self.pattern = self._build_pattern()
+        # handler 以 source 的上一層資料夾名稱作為備份資料夾名稱
+        if kind == "minecraft":
+            self.source_path = os.path.join(root, "mc_server", "world")
+        else:
+            self.source_path = os.path.join(root, "7d_server", "Saves")
+
+    def _build_pattern(self):
+        words = [self.rng.choice(_WORDS) + str(self.rng.randrange(4096)).encode() for _ in range(8192)]
+        return b" ".join(words)[:256 * 1024]
+
+    def _sample_size(self):
+        if self.size_dist == "fixed":
+            size = self.mean_bytes
+        elif self.size_dist == "uniform":
+            size = self.rng.uniform(0, 2 * self.mean_bytes)
+        else:
+            sigma = 1.0
+            size = self.rng.lognormvariate(math.log(self.mean_bytes) - sigma ** 2 / 2, sigma)
+        return max(int(size), 64)
+
+    def payload(self, size):
+        """以 4 KiB 為單位混合隨機資料與重複性高的結構化資料。"""
+        out = bytearray()
+        while len(out) < size:
+            n = min(BLOCK_SIZE, size - len(out))
+            if self.rng.random() < self.incompressible:
+                out += self.rng.randbytes(n)
+            else:
+                offset = self.rng.randrange(len(self.pattern) - n)
+                out += self.pattern[offset:offset + n]
+        return bytes(out)
+
+    def layout(self):
+        """回傳 [(相對路徑, 目標大小)]；約六成檔案是 region / chunk 資料，其餘為小型設定與玩家檔。"""
+        files = []
+        region_count = max(1, int(self.file_count * 0.6))
+        if self.kind == "minecraft":
+            dims = ("region", "DIM-1/region", "DIM1/region", "entities", "poi")
+            for i in range(region_count):
+                x, z = i % 16 - 8, i // 16 - 8
+                files.append((f"{dims[i % len(dims)]}/r.{x}.{z}.mca", self._sample_size()))
+            files.append(("level.dat", 4096))
+            for i in range(self.file_count - region_count - 1):
+                if i % 3 == 0:
+                    files.append((f"data/map_{i}.dat", self._sample_size() // 8 + 64))
+                else:
+                    files.append((f"playerdata/{self.rng.randbytes(16).hex()}.dat", 8192))
+        else:
+            for i in range(region_count):
+                files.append((f"World/Game/Region/r.{i % 16 - 8}.{i // 16 - 8}.7rg", self._sample_size()))
+            files.append(("World/Game/main.ttw", 64 * 1024))
+            for i in range(self.file_count - region_count - 1):
+                if i % 2 == 0:
+                    files.append((f"World/Game/Player/{76561190000000000 + i}.ttp", self._sample_size() // 4 + 64))
+                else:
+                    files.append((f"World/Game/decoration_{i}.7dt", self._sample_size() // 16 + 64))
+        return files
+
+    def generate(self):
+        """寫出整個存檔，回傳 {files, bytes}。"""
+        total = 0
+        layout = self.layout()
+        for rel_path, size in layout:
+            path = os.path.join(self.source_path, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = self._region(size) if rel_path.endswith(".mca") else self.payload(size)
+            with open(path, "wb") as f:
+                f.write(data)
+            total += len(data)
+        return {"files": len(layout), "bytes": total}
+
+    def _region(self, size):
+        chunk_count = max(1, min(CHUNKS_PER_REGION, size // CHUNK_TARGET_SIZE))
+        indexes = sorted(self.rng.sample(range(CHUNKS_PER_REGION), chunk_count))
+        # chunk timestamp 設在過去，之後的變更才能被 region delta 正確辨識
+        base_ts = int(time.time()) - 86400
+        locations = bytearray(SECTOR_SIZE)
+        timestamps = bytearray(SECTOR_SIZE)
+        body = bytearray()
+        sector = HEADER_SIZE // SECTOR_SIZE
+        for index in indexes:
+            record = self._chunk_record(max(size // chunk_count - 5, 16))
+            count = -(-len(record) // SECTOR_SIZE)
+            locations[index * 4:index * 4 + 4] = sector.to_bytes(3, "big") + bytes([count])
+            struct.pack_into(">I", timestamps, index * 4, base_ts - self.rng.randrange(86400))
+            body += record + bytes(count * SECTOR_SIZE - len(record))
+            sector += count
+        return bytes(locations) + bytes(timestamps) + bytes(body)
+
+    def _chunk_record(self, size):
+        size = min(size, 255 * SECTOR_SIZE - 5)
+        return (size + 1).to_bytes(4, "big") + b"\x02" + self.payload(size)
+
+    def mutate(self, fraction=0.05, seed=2):
+        """模擬一段遊玩：修改 fraction 比例的檔案（region 只改其中少數 chunk）、新增與刪除各一個檔案。"""
+        rng = random.Random(seed)
+        paths = sorted(
+            os.path.relpath(os.path.join(root, f), self.source_path).replace(os.sep, "/")
+            for root, dirs, files in os.walk(self.source_path) for f in files
+        )
+        changed = rng.sample(paths, max(1, int(len(paths) * fraction)))
+        for rel_path in changed:
+            path = os.path.join(self.source_path, *rel_path.split("/"))
+            if rel_path.endswith(".mca"):
+                self._touch_chunks(path, rng)
+            else:
+                with open(path, "wb") as f:
+                    f.write(self.payload(max(os.path.getsize(path), 64)))
+
+        removed = rng.choice([p for p in paths if p not in changed])
+        os.remove(os.path.join(self.source_path, *removed.split("/")))
+        added = "data/synthetic_added.dat" if self.kind == "minecraft" else "World/Game/synthetic_added.7dt"
+        added_path = os.path.join(self.source_path, *added.split("/"))
+        os.makedirs(os.path.dirname(added_path), exist_ok=True)
+        with open(added_path, "wb") as f:
+            f.write(self.payload(self.mean_bytes // 4))
+        return {"changed": len(changed), "removed": 1, "added": 1}
+
+    def _touch_chunks(self, path, rng):
+        with open(path, "r+b") as f:
+            header = f.read(HEADER_SIZE)
+            present = [
+                i for i in range(CHUNKS_PER_REGION)
+                if int.from_bytes(header[i * 4:i * 4 + 3], "big")
+            ]
+            now = int(time.time())
+            for index in rng.sample(present, max(1, len(present) // 20)):
+                offset = int.from_bytes(header[index * 4:index * 4 + 3], "big") * SECTOR_SIZE
+                f.seek(offset)
+                length = int.from_bytes(f.read(4), "big")
+                f.seek(offset + 5)
+                f.write(self.payload(length - 1))
+                f.seek(SECTOR_SIZE + index * 4)
+                f.write(struct.pack(">I", now))
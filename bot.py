@@ -7,15 +7,37 @@ import discord
 import asyncio
 from discord.ext import commands
 from config import BOT_TOKEN
+from config import MINECRAFT_STATUS_THREAD_ID, SEVENDAY_STATUS_THREAD_ID
+from config import LOG_LAG_ALERT_THRESHOLD, LOG_LAG_ALERT_WINDOW_MINUTES, LOG_ALERT_COOLDOWN_MINUTES
+from config import TELEMETRY_INTERVAL_SECONDS
+from config import MINECRAFT_TPS_INTERVAL_SECONDS, MINECRAFT_TPS_ALERT_THRESHOLD, MINECRAFT_TPS_ALERT_MINUTES, MINECRAFT_TPS_COMMAND
 from config import CONTROL_THREAD_ID
 from commands.commandspanel import ServerControlPanelView, get_combined_status_embed
 from backups.manager import BackupManager
 from backups.minecraft_backup import MinecraftBackupHandler
 from backups.seven_days_backup import SevenDaysBackupHandler
-from config import MINECRAFT_BASE_PATH, SEVENDAY_SAVE_PATH, BACKUP_ROOT
+from backups.retention import RetentionPolicy
+from config import MINECRAFT_BASE_PATH, SEVENDAY_SAVE_PATH, BACKUP_ROOT, BACKUP_MODE, BACKUP_WORKERS
+from config import MINECRAFT_BACKUP_CODEC, SEVENDAY_BACKUP_CODEC
+from config import BACKUP_INCREMENTAL, BACKUP_FULL_EVERY, BACKUP_HASH_FILES, MINECRAFT_BACKUP_SNAPSHOT
+from config import MINECRAFT_REGION_DELTA, BACKUP_VERIFY, BACKUP_VERIFY_READ_LIMIT_MBPS
+from config import MINECRAFT_BACKUP_INTERVAL_MINUTES, SEVENDAY_BACKUP_INTERVAL_MINUTES
+from config import BACKUP_FALLBACK_INTERVAL_MINUTES, BACKUP_POLL_SECONDS
+from config import BACKUP_MAX_CONCURRENCY, BACKUP_READ_LIMIT_MBPS, BACKUP_WRITE_LIMIT_MBPS
+from config import BACKUP_REPLICA_ENDPOINT, BACKUP_REPLICA_BUCKET, BACKUP_REPLICA_ACCESS_KEY, BACKUP_REPLICA_SECRET_KEY
+from config import BACKUP_REPLICA_REGION, BACKUP_REPLICA_PREFIX, BACKUP_REPLICA_PART_MB
+from config import BACKUP_REPLICA_CONCURRENCY, BACKUP_REPLICA_LIMIT_MBPS
+from config import MINECRAFT_RETENTION, MINECRAFT_BACKUP_BUDGET_GB, SEVENDAY_RETENTION, SEVENDAY_BACKUP_BUDGET_GB
 from utils.logger import get_logger
 from tasks.auto_backup_task import AutoBackupTask
 from tasks.log_compressor import LogCompressor
+from tasks.backup_verify_task import BackupVerifyTask
+from tasks.log_event_monitor import LogEventMonitor
+from tasks.panel_updater import PanelUpdater
+from tasks.telemetry_sampler import TelemetrySampler
+from tasks.tps_monitor import TpsMonitor
+from tasks.backup_replication_task import BackupReplicationTask
+from backups.replication import Replicator, S3Target, LocalTarget
 
 logger = get_logger(__name__)
 intents = discord.Intents.all()
@@ -25,6 +47,8 @@ intents.guilds = True
 
 bot = commands.Bot(command_prefix="!", intents=intents)
 
+PANEL_CLEANUP_LIMIT = 100  # 沒有上次的面板可參考時，啟動清理只看最近幾則訊息
+
 # 要啟用的功能模組 (cogs)
 initial_extensions = [
     "commands.forwarder",
@@ -32,6 +56,9 @@ initial_extensions = [
     "commands.minecraftserver",
     "commands.sevendayserver",
     "commands.commandspanel",
+    "commands.backuprestore",
+    "commands.serverlog",
+    "commands.perf",
     "commands.riotnews",
     "commands.admin",
     "commands.lol",
@@ -42,57 +69,178 @@ initial_extensions = [
 @bot.event
 async def on_ready():
     logger.info(f"✅ Bot 已上線：{bot.user}")
+    # gateway 重新連線後 on_ready 會再觸發；面板、備份與各種排程每個進程只初始化一次
+    if getattr(bot, "initialized", False):
+        logger.info("🔁 重新連線，略過初始化")
+        return
+    bot.initialized = True
+
+    bot.telemetry = TelemetrySampler(interval=TELEMETRY_INTERVAL_SECONDS)
+    bot.telemetry.start()
+    bot.tps_monitor = TpsMonitor(
+        bot, MINECRAFT_STATUS_THREAD_ID, interval=MINECRAFT_TPS_INTERVAL_SECONDS,
+        threshold=MINECRAFT_TPS_ALERT_THRESHOLD, sustain_minutes=MINECRAFT_TPS_ALERT_MINUTES,
+        command=MINECRAFT_TPS_COMMAND
+    )
+    bot.tps_monitor.start()
     asyncio.create_task(initialize_panel(bot))
+    bot.log_events = LogEventMonitor(
+        bot, lag_threshold=LOG_LAG_ALERT_THRESHOLD, window_minutes=LOG_LAG_ALERT_WINDOW_MINUTES,
+        cooldown_minutes=LOG_ALERT_COOLDOWN_MINUTES
+    )
+    bot.log_events.watch("Minecraft", "minecraft", MINECRAFT_STATUS_THREAD_ID)
+    bot.log_events.watch("7 Days to Die", "7dtd", SEVENDAY_STATUS_THREAD_ID)
     await asyncio.sleep(5)
 
-    backup_manager = BackupManager()
-    backup_manager.register_handler(
-        MinecraftBackupHandler(
-            world_path=os.path.join(MINECRAFT_BASE_PATH, "world"),
-            backup_root=BACKUP_ROOT
-        )
+    backup_manager = BackupManager(max_concurrency=BACKUP_MAX_CONCURRENCY)
+    read_bps = int(BACKUP_READ_LIMIT_MBPS * 1024 * 1024) or None
+    write_bps = int(BACKUP_WRITE_LIMIT_MBPS * 1024 * 1024) or None
+    minecraft_handler = MinecraftBackupHandler(
+        world_path=os.path.join(MINECRAFT_BASE_PATH, "world"),
+        backup_root=BACKUP_ROOT,
+        mode=BACKUP_MODE,
+        codec=MINECRAFT_BACKUP_CODEC,
+        workers=BACKUP_WORKERS,
+        incremental=BACKUP_INCREMENTAL,
+        full_every=BACKUP_FULL_EVERY,
+        hash_files=BACKUP_HASH_FILES,
+        read_bps=read_bps,
+        write_bps=write_bps,
+        retention_policy=build_retention_policy(MINECRAFT_RETENTION, MINECRAFT_BACKUP_BUDGET_GB),
+        snapshot=MINECRAFT_BACKUP_SNAPSHOT,
+        rcon=minecraft_rcon,
+        region_delta=MINECRAFT_REGION_DELTA
     )
-    backup_manager.register_handler(
-        SevenDaysBackupHandler(
-            save_path=SEVENDAY_SAVE_PATH,
-            backup_root=BACKUP_ROOT
-        )
+    seven_days_handler = SevenDaysBackupHandler(
+        save_path=SEVENDAY_SAVE_PATH,
+        backup_root=BACKUP_ROOT,
+        mode=BACKUP_MODE,
+        codec=SEVENDAY_BACKUP_CODEC,
+        workers=BACKUP_WORKERS,
+        incremental=BACKUP_INCREMENTAL,
+        full_every=BACKUP_FULL_EVERY,
+        hash_files=BACKUP_HASH_FILES,
+        read_bps=read_bps,
+        write_bps=write_bps,
+        retention_policy=build_retention_policy(SEVENDAY_RETENTION, SEVENDAY_BACKUP_BUDGET_GB)
     )
+    backup_manager.register_handler(minecraft_handler)
+    backup_manager.register_handler(seven_days_handler)
     bot.backup_manager = backup_manager
-    # 初始化備份任務
+    if BACKUP_VERIFY:
+        bot.backup_verifier = BackupVerifyTask(bot, read_bps=int(BACKUP_VERIFY_READ_LIMIT_MBPS * 1024 * 1024) or None)
+    if BACKUP_REPLICA_ENDPOINT:
+        bot.backup_replicator = BackupReplicationTask(bot, build_replicator())
+        bot.backup_replicator.resume_pending()
+    asyncio.create_task(prepare_backup_catalog(backup_manager))
+    # 初始化備份排程：每個伺服器各自依玩家在線狀況決定備份頻率
     bot.backup_task = AutoBackupTask(bot)
+    bot.backup_task.add_schedule(
+        minecraft_handler, probe=lambda: server_player_count("MinecraftServerControl"),
+        interval_minutes=MINECRAFT_BACKUP_INTERVAL_MINUTES,
+        fallback_minutes=BACKUP_FALLBACK_INTERVAL_MINUTES, poll_seconds=BACKUP_POLL_SECONDS
+    )
+    bot.backup_task.add_schedule(
+        seven_days_handler, probe=lambda: server_player_count("SevenDayServerControl"),
+        interval_minutes=SEVENDAY_BACKUP_INTERVAL_MINUTES,
+        fallback_minutes=BACKUP_FALLBACK_INTERVAL_MINUTES, poll_seconds=BACKUP_POLL_SECONDS
+    )
+    bot.backup_task.start()
     LogCompressor(bot)
     logger.info("📦 自動備份任務已註冊")
 
+async def prepare_backup_catalog(backup_manager):
+    # 第一次啟用索引時從既有備份檔重建，再把還沒驗證過的備份排入驗證
+    await backup_manager.rebuild_catalog(only_missing=True)
+    if hasattr(bot, "backup_verifier"):
+        bot.backup_verifier.submit_unverified()
+
+def build_retention_policy(spec, budget_gb):
+    if not spec and not budget_gb:
+        return None
+    max_bytes = int(budget_gb * 1024 ** 3) or None
+    if not spec:
+        return RetentionPolicy(hourly_hours=36, daily_days=0, weekly_weeks=0, max_bytes=max_bytes)
+    return RetentionPolicy.parse(spec, max_bytes=max_bytes)
+
+def build_replicator():
+    if BACKUP_REPLICA_ENDPOINT.startswith(("http://", "https://")):
+        target = S3Target(
+            BACKUP_REPLICA_ENDPOINT, BACKUP_REPLICA_BUCKET,
+            BACKUP_REPLICA_ACCESS_KEY, BACKUP_REPLICA_SECRET_KEY, region=BACKUP_REPLICA_REGION
+        )
+    else:
+        # file:// 或本機路徑：以資料夾模擬物件儲存（測試 / NAS 用）
+        target = LocalTarget(BACKUP_REPLICA_ENDPOINT.removeprefix("file://"))
+    return Replicator(
+        target, BACKUP_ROOT, prefix=BACKUP_REPLICA_PREFIX,
+        part_size=BACKUP_REPLICA_PART_MB * 1024 * 1024,
+        concurrency=BACKUP_REPLICA_CONCURRENCY,
+        bandwidth_bps=int(BACKUP_REPLICA_LIMIT_MBPS * 1024 * 1024) or None
+    )
+
+async def server_player_count(cog_name):
+    cog = bot.get_cog(cog_name)
+    return await cog.get_player_count() if cog else None
+
+async def minecraft_rcon(command):
+    cog = bot.get_cog("MinecraftServerControl")
+    if cog is None:
+        raise RuntimeError("MinecraftServerControl 未載入")
+    # save-all flush 在大型世界可能要數十秒
+    return await cog.rcon_command(command, timeout=60)
+
 async def initialize_panel(bot):
+    """沿用上次的面板訊息（還在的話），只清掉它之後機器人發的訊息；找不到才重新發送。"""
+    updater = bot.panel_updater = PanelUpdater(bot)
+
     try:
         channel = await bot.fetch_channel(CONTROL_THREAD_ID)
-        async for msg in channel.history(limit=None, oldest_first=True):
-            if msg.author == bot.user:
-                try:
-                    await msg.delete()
-                    await asyncio.sleep(0.3)
-                except Exception as e:
-                    logger.warning(f"⚠️ 刪除訊息失敗：{e}")
-        logger.info("🧹 已刪除所有機器人歷史訊息")
+    except Exception as e:
+        logger.error(f"❌ 無法取得控制面板頻道：{e}")
+        channel = None
+    if channel is None:
+        updater.start()
+        return
+
+    panel = None
+    if updater.message_id:
+        try:
+            panel = await channel.fetch_message(updater.message_id)
+        except discord.NotFound:
+            logger.info("📭 上次的控制面板訊息已不存在，將重新發送")
+        except Exception as e:
+            logger.warning(f"⚠️ 讀取上次的控制面板訊息失敗：{e}")
+
+    try:
+        # 面板還在時只清面板之後的訊息；不然只看最近 PANEL_CLEANUP_LIMIT 則。14 天內的訊息會批次刪除
+        deleted = await channel.purge(
+            limit=None if panel else PANEL_CLEANUP_LIMIT,
+            after=panel,
+            check=lambda m: m.author == bot.user,
+            bulk=True
+        )
+        if deleted:
+            logger.info(f"🧹 已刪除 {len(deleted)} 則機器人舊訊息")
     except Exception as e:
         logger.warning(f"⚠️ 無法清除舊訊息：{e}")
 
     try:
         embed = await get_combined_status_embed(bot)
         view = ServerControlPanelView(bot)
-        msg = await channel.send(embed=embed, view=view)
         bot.add_view(view)
-        logger.info(f"📤 已發送新的控制面板訊息 ID: {msg.id}")
+        if panel:
+            await panel.edit(embed=embed, view=view)
+            logger.info(f"♻️ 沿用控制面板訊息 ID: {panel.id}")
+        else:
+            panel = await channel.send(embed=embed, view=view)
+            logger.info(f"📤 已發送新的控制面板訊息 ID: {panel.id}")
+        updater.track(panel.id, embed)
     except Exception as e:
         logger.error(f"❌ 發送新控制面板失敗：{e}")
 
-    try:
-        from tasks.panel_updater import setup_panel_auto_updater
-        setup_panel_auto_updater(bot)
-        logger.info("🛠️ 面板狀態更新排程已啟動")
-    except Exception as e:
-        logger.error(f"❌ 啟動面板自動更新任務失敗：{e}")
+    updater.start()
+    logger.info("🛠️ 面板狀態更新排程已啟動")
 
 @bot.event
 async def on_command_error(ctx, error):
@@ -0,0 +1,131 @@
+import asyncio
+from discord.ext import commands
+from backups.restore import region_path
+from core.process_registry import process_registry
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SERVER_COGS = {"Minecraft": "MinecraftServerControl", "7 Days to Die": "SevenDayServerControl"}
+LIST_LIMIT = 30
+
+
+def format_size(size):
+    return f"{size / 1048576:.1f} MiB" if size >= 1048576 else f"{size / 1024:.1f} KiB"
+
+
+class BackupRestore(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def get_handler(self, ctx, server):
+        manager = getattr(self.bot, "backup_manager", None)
+        if manager is None:
+            await ctx.send("⚠️ 備份系統尚未初始化")
+            return None, None
+        handler = manager.get_handler(server)
+        if handler is None:
+            await ctx.send(f"❌ 找不到伺服器：`{server}`（可用：mc / 7d）")
+        return manager, handler
+
+    @commands.command(name="backups")
+    async def list_backups(self, ctx, server: str, limit: int = 10):
+        """📦 列出伺服器最近的備份"""
+        manager, handler = await self.get_handler(ctx, server)
+        if handler is None:
+            return
+        entries = handler.list_backup_entries()[:limit]
+        if not entries:
+            await ctx.send(f"📭 {handler.name} 尚無任何備份")
+            return
+        lines = [f"{entry['name']}  {format_size(entry.get('size') or 0)}" for entry in entries]
+        await ctx.send(f"📦 {handler.name} 最近 {len(entries)} 份備份：\n```\n" + "\n".join(lines) + "\n```")
+
+    @commands.command(name="backupls")
+    async def list_contents(self, ctx, server: str, backup: str = "latest", keyword: str = ""):
+        """📂 列出備份內的檔案，可用關鍵字過濾"""
+        manager, handler = await self.get_handler(ctx, server)
+        if handler is None:
+            return
+        try:
+            contents = await manager.list_backup_contents(handler, backup)
+        except Exception as e:
+            await ctx.send(f"❌ 無法讀取備份：{e}")
+            return
+        names = sorted(name for name in contents if keyword in name)
+        lines = [f"{name}  {format_size(contents[name])}" for name in names[:LIST_LIMIT]]
+        if len(names) > LIST_LIMIT:
+            lines.append(f"...（另有 {len(names) - LIST_LIMIT} 個檔案）")
+        await ctx.send(f"📂 共 {len(names)} 個檔案：\n```\n" + ("\n".join(lines) or "（無）") + "\n```")
+
+    @commands.command(name="restorefile")
+    async def restore_file(self, ctx, server: str, backup: str, path: str):
+        """📄 從備份取出單一檔案到 .restore 資料夾"""
+        await self._extract(ctx, server, backup, [path])
+
+    @commands.command(name="restoreregion")
+    async def restore_region(self, ctx, server: str, backup: str, region_x: int, region_z: int,
+                             dimension: str = "overworld"):
+        """🗺️ 從備份取出單一 Minecraft region（r.X.Z.mca，dimension 可為 overworld / nether / end）"""
+        if dimension not in ("overworld", "nether", "end"):
+            await ctx.send("❌ dimension 只能是 overworld / nether / end")
+            return
+        await self._extract(ctx, server, backup, [region_path(region_x, region_z, dimension)])
+
+    async def _extract(self, ctx, server, backup, names):
+        manager, handler = await self.get_handler(ctx, server)
+        if handler is None:
+            return
+        try:
+            stats = await manager.extract_from_backup(handler, backup, names)
+        except Exception as e:
+            logger.error(f"❌ 取出備份檔案失敗：{e}")
+            await ctx.send(f"❌ 取出失敗：{e}")
+            return
+        await ctx.send(
+            f"✅ 已取出 {stats['files']} 個檔案（{format_size(stats['bytes'])}，{stats['elapsed']:.2f}s）\n"
+            f"📁 位置：`{stats['target_dir']}`"
+        )
+
+    @commands.command(name="restoreall")
+    async def restore_all(self, ctx, server: str, backup: str = "latest", confirm: str = ""):
+        """♻️ 停止伺服器、完整還原備份後重新啟動（需加上 confirm）"""
+        manager, handler = await self.get_handler(ctx, server)
+        if handler is None:
+            return
+        if confirm != "confirm":
+            await ctx.send(f"⚠️ 完整還原會覆蓋目前的存檔，請輸入 `!restoreall {server} {backup} confirm` 確認")
+            return
+
+        cog = self.bot.get_cog(SERVER_COGS[handler.name])
+        was_running = cog is not None and await process_registry.is_running_async(handler.name)
+        if was_running:
+            await ctx.send(f"🛑 正在關閉 {handler.name} 以進行還原...")
+            await cog.stop_server(ctx)
+            for _ in range(30):
+                if not await process_registry.is_running_async(handler.name):
+                    break
+                await asyncio.sleep(2)
+            else:
+                await ctx.send("❌ 伺服器未能關閉，已取消還原")
+                return
+
+        try:
+            await ctx.send(f"♻️ 開始還原 {handler.name}（{backup}）...")
+            stats = await manager.restore_handler(handler, backup)
+            await ctx.send(
+                f"✅ 已從 `{stats['backup']}` 還原 {stats['files']} 個檔案，"
+                f"寫入 {format_size(stats['bytes'])}，耗時 {stats['elapsed']:.1f}s\n"
+                f"🗂️ 原存檔保留於：`{stats['previous_dir']}`"
+            )
+        except Exception as e:
+            logger.error(f"❌ {handler.name} 還原失敗：{e.__class__.__name__} - {e}")
+            await ctx.send(f"❌ 還原失敗，現有存檔未被更動：{e}")
+
+        if was_running:
+            await ctx.send(f"🚀 重新啟動 {handler.name}...")
+            await cog.start_server(ctx)
+
+
+async def setup(bot):
+    await bot.add_cog(BackupRestore(bot))
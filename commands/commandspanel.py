@@ -1,11 +1,10 @@
 import discord
 from discord.ext import commands
 import asyncio
-import psutil
 from discord import Embed, Color
-from mcstatus import JavaServer
 from datetime import datetime
-from config import CONTROL_THREAD_ID
+from config import CONTROL_THREAD_ID, STATUS_CACHE_TTL, STATUS_PROBE_TIMEOUT
+from core.status_service import StatusService
 from pytz import timezone
 
 class ServerControlPanelView(discord.ui.View):
@@ -22,9 +21,16 @@ class ServerControlPanelView(discord.ui.View):
             pass
 
     async def schedule_status_update(self, interaction: discord.Interaction, delay_seconds: int = 60):
+        get_status_service(self.bot).invalidate()
+        updater = getattr(self.bot, "panel_updater", None)
+        if updater and updater.message_id == interaction.message.id:
+            # 自動更新器在啟動 / 關閉期間會加快更新，不用另外排程
+            updater.boost()
+            return
+
         async def delayed_status_update():
             await asyncio.sleep(delay_seconds)
-            embed = await get_combined_status_embed(self.bot)
+            embed = await get_combined_status_embed(self.bot, fresh=True)
             try:
                 await interaction.message.edit(embed=embed)
                 print("✅ 延遲狀態面板更新成功")
@@ -95,6 +101,10 @@ class ServerControlPanelView(discord.ui.View):
     @discord.ui.button(label="查詢狀態", style=discord.ButtonStyle.blurple, custom_id="status")
     async def check_status(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
+        updater = getattr(self.bot, "panel_updater", None)
+        if updater and updater.message_id == interaction.message.id:
+            await updater.update(force=True)
+            return
         embed = await get_combined_status_embed(self.bot)
         await interaction.message.edit(embed=embed)
 
@@ -107,14 +117,30 @@ class CommandPanel(commands.Cog):
     async def send_control_panel(self, ctx):
         thread = await self.bot.fetch_channel(CONTROL_THREAD_ID)
         embed = await get_combined_status_embed(self.bot)
-        await thread.send(embed=embed, view=ServerControlPanelView(self.bot))
+        msg = await thread.send(embed=embed, view=ServerControlPanelView(self.bot))
+        if getattr(self.bot, "panel_updater", None):
+            self.bot.panel_updater.track(msg.id, embed)
+
+
+def get_status_service(bot) -> StatusService:
+    """所有面板更新共用同一份狀態快取。"""
+    if getattr(bot, "status_service", None) is None:
+        bot.status_service = StatusService(bot, ttl=STATUS_CACHE_TTL, probe_timeout=STATUS_PROBE_TIMEOUT)
+    return bot.status_service
 
 
-async def safe_process_iter():
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, lambda: list(psutil.process_iter(['name', 'cmdline'])))
+def resource_line(bot, name) -> str:
+    """最近 1 分鐘的平均 CPU / RAM；用平均並取整，避免面板因為瞬間波動一直重新編輯。"""
+    telemetry = getattr(bot, "telemetry", None)
+    cpu = telemetry.average(name, "cpu") if telemetry else None
+    rss = telemetry.average(name, "rss") if telemetry else None
+    if cpu is None or rss is None:
+        return ""
+    return f"\n資源：CPU {cpu:.0f}%｜RAM {rss / 1024:.1f} GB"
 
-async def get_combined_status_embed(bot) -> discord.Embed:
+
+async def get_combined_status_embed(bot, fresh: bool = False) -> discord.Embed:
+    snapshot = await get_status_service(bot).get(fresh=fresh)
     embed = discord.Embed(
         title="📊 伺服器狀態總覽",
         description="目前的伺服器執行狀況如下：",
@@ -122,54 +148,67 @@ async def get_combined_status_embed(bot) -> discord.Embed:
     )
 
     # ✅ Minecraft 狀態
-    try:
-        mc = JavaServer("127.0.0.1", 25565)
-        status = await mc.async_status()
-
+    status = snapshot["minecraft"]
+    if status:
         mc_cog = bot.get_cog("MinecraftServerControl")
         last_start = getattr(mc_cog, "last_started", None)
         last_backup = getattr(mc_cog, "last_backup", None)
 
-        mc_info = f"狀態：🟢 在線中\n玩家：{status.players.online} / {status.players.max}\nMOTD：{status.description}"
+        mc_info = f"狀態：🟢 在線中\n玩家：{status['players']} / {status['max']}\nMOTD：{status['motd']}"
+        tick = bot.tps_monitor.current() if getattr(bot, "tps_monitor", None) else None
+        if tick:
+            mc_info += f"\nTPS：{tick['tps']:.1f}"
+            if tick["mspt"] is not None:
+                mc_info += f"｜MSPT：{tick['mspt']:.0f} ms"
+        mc_info += resource_line(bot, "Minecraft")
         if last_start:
             mc_info += f"\n啟動時間：{last_start.strftime('%Y-%m-%d %H:%M:%S')}"
         if last_backup:
             mc_info += f"\n最後備份：{last_backup.strftime('%Y-%m-%d %H:%M:%S')}"
 
         embed.add_field(name="🟢 Minecraft", value=mc_info, inline=False)
-
-    except Exception:
+    else:
         embed.add_field(name="🔴 Minecraft", value="伺服器未執行或無法連線。", inline=False)
 
     # ✅ 7 Days to Die 狀態
-    try:
+    seven = snapshot["sevenday"]
+    if "error" in seven:
+        embed.add_field(name="⚠️ 7 Days 狀態錯誤", value=seven["error"], inline=False)
+    elif seven["running"]:
         seven_cog = bot.get_cog("SevenDayServerControl")
         last_start = getattr(seven_cog, "last_started", None)
         last_backup = getattr(seven_cog, "last_backup", None)
 
-
-        running = False
-        processes = await safe_process_iter()
-        for proc in processes:
-            try:
-                if proc.info['name'] and "7DaysToDieServer" in proc.info['name']:
-                    running = True
-                    break
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-
-        if running:
-            info = "狀態：🟢 在線中"
-            if last_start:
-                info += f"\n啟動時間：{last_start.strftime('%Y-%m-%d %H:%M:%S')}"
-            if last_backup:
-                info += f"\n最後備份：{last_backup.strftime('%Y-%m-%d %H:%M:%S')}"
-            embed.add_field(name="🟢 7 Days to Die", value=info, inline=False)
-        else:
-            embed.add_field(name="🔴 7 Days to Die", value="伺服器未執行。", inline=False)
-
-    except Exception as e:
-        embed.add_field(name="⚠️ 7 Days 狀態錯誤", value=str(e), inline=False)
+        info = "狀態：🟢 在線中"
+        stats = seven["stats"]
+        if stats:
+            info += f"\n玩家：{stats['players']}\n遊戲時間：第 {stats['day']} 天 {stats['hour']:02d}:{stats['minute']:02d}"
+            if "fps" in stats:
+                info += f"\nFPS：{stats['fps']:.1f}｜Heap：{stats.get('heap', 0):.0f} / {stats.get('max', 0):.0f} MB"
+        info += resource_line(bot, "7 Days to Die")
+        if last_start:
+            info += f"\n啟動時間：{last_start.strftime('%Y-%m-%d %H:%M:%S')}"
+        if last_backup:
+            info += f"\n最後備份：{last_backup.strftime('%Y-%m-%d %H:%M:%S')}"
+        embed.add_field(name="🟢 7 Days to Die", value=info, inline=False)
+    else:
+        embed.add_field(name="🔴 7 Days to Die", value="伺服器未執行。", inline=False)
+
+    # ✅ 備份驗證
+    manager = getattr(bot, "backup_manager", None)
+    verifier = getattr(bot, "backup_verifier", None)
+    if manager and verifier:
+        lines = []
+        for handler in manager.handlers:
+            verified, latest = verifier.last_results(handler.name)
+            if verified:
+                verified_at = datetime.fromtimestamp(verified["verified_at"]).strftime("%m-%d %H:%M")
+                lines.append(f"{handler.name}：✅ `{verified['name']}`（{verified_at}）")
+            else:
+                lines.append(f"{handler.name}：尚未驗證")
+            if latest and latest["status"] != "ok":
+                lines.append(f"⚠️ 最近一次驗證失敗：`{latest['name']}`")
+        embed.add_field(name="🛡️ 最後驗證備份", value="\n".join(lines) or "無", inline=False)
 
     # ✅ 額外資訊
     embed.add_field(
@@ -183,10 +222,10 @@ async def get_combined_status_embed(bot) -> discord.Embed:
         inline=False
     )
 
-    # ✅ 最後更新時間
+    # ✅ 最後更新時間（狀態快照的探測時間）
     tz = timezone("Asia/Taipei")
-    now = datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S")
-    embed.set_footer(text=f"🕒 最後更新時間：{now}")
+    taken_at = datetime.fromtimestamp(snapshot["taken_at"], tz)
+    embed.set_footer(text=f"🕒 最後更新時間：{taken_at.strftime('%Y-%m-%d %H:%M:%S')}")
 
     return embed
 
@@ -1,22 +1,26 @@
 import os
 import subprocess
-import psutil
 import asyncio
 from datetime import datetime
 from discord.ext import commands
-from mcrcon import MCRcon
 from mcstatus import JavaServer
+from core.process_registry import process_registry
+from core.rcon_client import RconClient, RconError
+from core.server_manager import ServerManager
 from utils.logger import get_logger
 from config import (
     MINECRAFT_JAR_KEYWORD,
     MINECRAFT_BASE_PATH,
     MINECRAFT_RCON_PORT,
     MINECRAFT_RCON_PASSWORD,
-    MINECRAFT_START_BAT
+    MINECRAFT_START_BAT,
+    SERVER_LOG_BUFFER_LINES
 )
 
 logger = get_logger(__name__)
 
+PROCESS_KEY = "Minecraft"
+
 class MinecraftServerControl(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -24,10 +28,21 @@ class MinecraftServerControl(commands.Cog):
         self.rcon_host = "127.0.0.1"
         self.rcon_port = MINECRAFT_RCON_PORT
         self.rcon_password = MINECRAFT_RCON_PASSWORD
-        self.start_bat = os.path.join(self.server_base_path, MINECRAFT_START_BAT)
         self.pid_file = os.path.join(self.server_base_path, "server.pid")
         self.last_started = None
         self.delete_delay = 10  # 所有訊息預設刪除秒數
+        # 整個 bot 共用一條 RCON 連線（啟動 / 關閉、備份快照、遊戲內指令）
+        self.rcon = RconClient(self.rcon_host, self.rcon_port, self.rcon_password)
+        # 啟動、進程追蹤與輸出收集（!serverlog）
+        self.server = ServerManager(
+            PROCESS_KEY, MINECRAFT_START_BAT, self.server_base_path, keyword=MINECRAFT_JAR_KEYWORD,
+            creationflags=getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0),  # Windows only
+            log_buffer_lines=SERVER_LOG_BUFFER_LINES
+        )
+        pid = self.get_pid()
+        if pid:
+            # bot 重啟後沿用 PID 檔，省去第一次查詢時的進程表掃描
+            process_registry.track(PROCESS_KEY, pid)
 
     def get_pid(self):
         if os.path.exists(self.pid_file):
@@ -39,26 +54,40 @@ class MinecraftServerControl(commands.Cog):
         return None
 
     def is_process_running(self):
-        pid = self.get_pid()
-        return pid is not None and psutil.pid_exists(pid)
+        return process_registry.is_running(PROCESS_KEY)
+
+    async def cog_unload(self):
+        await self.rcon.close()
+
+    async def rcon_command(self, command, timeout=None):
+        return await self.rcon.command(command, timeout=timeout)
+
+    async def get_player_count(self):
+        """線上玩家數；伺服器未執行回傳 0，執行中但查詢失敗回傳 None。"""
+        if not await process_registry.is_running_async(PROCESS_KEY):
+            return 0
+        try:
+            status = await JavaServer("127.0.0.1", 25565).async_status()
+            return status.players.online
+        except Exception as e:
+            logger.debug(f"查詢 Minecraft 玩家數失敗：{e}")
+            return None
 
     async def send_msg(self, ctx, content):
         return await ctx.send(content, delete_after=self.delete_delay)
 
     @commands.command(name="startmc")
     async def start_server(self, ctx):
-        if self.is_process_running():
+        if await process_registry.is_running_async(PROCESS_KEY):
             logger.warning("⚠️ Minecraft 已在執行中")
             await self.send_msg(ctx, "⚠️ Minecraft 已在執行中")
             return
 
         try:
-            proc = subprocess.Popen(
-                self.start_bat,
-                cwd=self.server_base_path,
-                shell=True,
-                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP  # Windows only
-            )
+            proc = await self.server.start_server()
+            if proc is None:
+                await self.send_msg(ctx, "❌ 找不到 Minecraft 啟動檔")
+                return
             self.last_started = datetime.now()
             logger.info(f"🚀 啟動 Minecraft 中，PID: {proc.pid}")
             await self.send_msg(ctx, "🚀 Minecraft 啟動中...")
@@ -66,16 +95,15 @@ class MinecraftServerControl(commands.Cog):
             server = JavaServer("127.0.0.1", 25565)
             for i in range(18):  # 最多等 90 秒
                 try:
-                    status = server.status()
-                    with MCRcon(self.rcon_host, self.rcon_password, self.rcon_port) as mcr:
-                        players = mcr.command("list")
+                    await asyncio.wait_for(server.async_status(), 5)
+                    await self.rcon.command("list")
                     logger.info("✅ Minecraft 啟動完成（已連線 RCON）")
                     with open(self.pid_file, "w") as f:
                         f.write(str(proc.pid))
                     await self.send_msg(ctx, "✅ Minecraft 啟動完成")
 
                     if self.bot and hasattr(self.bot, "backup_task"):
-                        self.bot.backup_task.start()
+                        self.bot.backup_task.wake("Minecraft")
 
                     return
                 except Exception as e:
@@ -92,47 +120,49 @@ class MinecraftServerControl(commands.Cog):
     @commands.command(name="stopmc")
     async def stop_server(self, ctx):
         logger.info("🚦 stopmc 指令收到")
-        pid = self.get_pid()
-        if not pid or not psutil.pid_exists(pid):
+        proc = await asyncio.get_running_loop().run_in_executor(None, process_registry.get_process, PROCESS_KEY)
+        if proc is None:
             logger.warning("⚠️ Minecraft 尚未啟動")
             await self.send_msg(ctx, "⚠️ Minecraft 尚未啟動")
             return
 
         try:
-            with MCRcon(self.rcon_host, self.rcon_password, self.rcon_port) as mcr:
-                mcr.command("say [Discord] 即將關閉伺服器")
-                mcr.command("save-all")
-                mcr.command("stop")
+            await self.rcon.pipeline(["say [Discord] 即將關閉伺服器", "save-all"], timeout=30)
+            try:
+                await self.rcon.command("stop")
+            except RconError:
+                pass  # 伺服器關閉時可能直接斷線，不等回應
             logger.info("📴 RCON stop 指令已送出")
             await self.send_msg(ctx, "📴 已發送關閉指令給 Minecraft 伺服器")
 
             for _ in range(12):
-                if not psutil.pid_exists(pid):
+                if not proc.is_running():
                     await asyncio.sleep(1)
-                    if not psutil.pid_exists(pid):
+                    if not proc.is_running():
                         logger.info("🛑 Minecraft 已成功關閉")
                         await self.send_msg(ctx, "🛑 Minecraft 已成功關閉")
                         if os.path.exists(self.pid_file):
                             os.remove(self.pid_file)
+                        process_registry.forget(PROCESS_KEY)
 
                         if self.bot and hasattr(self.bot, "backup_task"):
-                            asyncio.create_task(self._stop_backup_after_delay())
+                            self.bot.backup_task.wake("Minecraft")
 
                         return
                 await asyncio.sleep(5)
 
             logger.warning("⚠️ stop 指令送出後仍未關閉，準備強制終止")
             try:
-                proc = psutil.Process(pid)
                 proc.terminate()
-                proc.wait(timeout=10)
+                await asyncio.get_running_loop().run_in_executor(None, proc.wait, 10)
                 logger.info("⚠️ Minecraft 強制終止")
                 await self.send_msg(ctx, "⚠️ 已強制關閉 Minecraft 伺服器")
                 if os.path.exists(self.pid_file):
                     os.remove(self.pid_file)
+                process_registry.forget(PROCESS_KEY)
 
                 if self.bot and hasattr(self.bot, "backup_task"):
-                    asyncio.create_task(self._stop_backup_after_delay())
+                    self.bot.backup_task.wake("Minecraft")
 
                 return
             except Exception as e:
@@ -144,11 +174,5 @@ class MinecraftServerControl(commands.Cog):
             logger.error(f"❌ Minecraft 關閉失敗：{e.__class__.__name__} - {e}")
             await self.send_msg(ctx, f"❌ Minecraft 關閉失敗：{e}")
 
-    async def _stop_backup_after_delay(self):
-        await asyncio.sleep(300)
-        if hasattr(self.bot, "backup_task"):
-            self.bot.backup_task.stop()
-            logger.info("📦 自動備份任務已關閉")
-
 async def setup(bot):
     await bot.add_cog(MinecraftServerControl(bot))
\ No newline at end of file
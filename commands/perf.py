@@ -0,0 +1,91 @@
+import re
+from discord.ext import commands
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+TARGETS = {
+    "mc": "Minecraft", "minecraft": "Minecraft",
+    "7d": "7 Days to Die", "7dtd": "7 Days to Die",
+    "host": "host", "主機": "host",
+}
+SERVER_METRICS = (
+    ("cpu", "CPU %"), ("rss", "RAM MB"), ("threads", "執行緒"), ("disk_read", "讀取 MB/s"), ("disk_write", "寫入 MB/s"),
+    ("tps", "TPS"), ("mspt", "MSPT ms"),  # 只有 Minecraft 有（TpsMonitor）
+)
+HOST_METRICS = (("cpu", "CPU %"), ("mem", "RAM %"), ("disk_read", "讀取 MB/s"), ("disk_write", "寫入 MB/s"))
+RANGE_PATTERN = re.compile(r"^(\d+)([mhd])$")
+RANGE_UNITS = {"m": 60, "h": 3600, "d": 86400}
+DEFAULT_RANGE = "1h"
+SPARK_WIDTH = 30
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def parse_range(text):
+    """15m / 6h / 7d -> 秒數；格式不對回傳 None。"""
+    match = RANGE_PATTERN.match(text.lower())
+    return int(match.group(1)) * RANGE_UNITS[match.group(2)] if match and int(match.group(1)) > 0 else None
+
+
+def sparkline(values, width=SPARK_WIDTH):
+    """把數值壓成最多 width 格的走勢圖，每格取區間平均。"""
+    if not values:
+        return ""
+    if len(values) > width:
+        step = len(values) / width
+        values = [
+            sum(chunk) / len(chunk)
+            for chunk in (values[int(i * step):int((i + 1) * step)] for i in range(width))
+            if chunk
+        ]
+    low, high = min(values), max(values)
+    if high - low < 1e-9:
+        return SPARK_CHARS[0] * len(values)
+    scale = (len(SPARK_CHARS) - 1) / (high - low)
+    return "".join(SPARK_CHARS[round((v - low) * scale)] for v in values)
+
+
+def format_resolution(seconds):
+    return f"{seconds // 3600} 小時" if seconds >= 3600 else f"{seconds // 60} 分鐘" if seconds >= 60 else f"{seconds} 秒"
+
+
+class Perf(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command(name="perf")
+    async def perf(self, ctx, target: str, range_text: str = DEFAULT_RANGE):
+        """📈 顯示資源用量統計與走勢：!perf <mc|7d|host> [15m|1h|24h|7d]"""
+        name = TARGETS.get(target.lower())
+        if name is None:
+            await ctx.send(f"❌ 找不到目標：`{target}`（可用：mc / 7d / host）")
+            return
+        seconds = parse_range(range_text)
+        if seconds is None:
+            await ctx.send(f"❌ 時間範圍格式錯誤：`{range_text}`（例如 15m、1h、24h、7d）")
+            return
+        telemetry = getattr(self.bot, "telemetry", None)
+        if telemetry is None:
+            await ctx.send("⚠️ 資源取樣尚未啟動")
+            return
+
+        rows, resolution = [], telemetry.interval
+        for metric, label in (HOST_METRICS if name == "host" else SERVER_METRICS):
+            resolution, buckets = telemetry.query(name, metric, seconds)
+            if not buckets:
+                continue
+            low = min(b[2] for b in buckets)
+            high = max(b[3] for b in buckets)
+            average = sum(b[1] for b in buckets) / len(buckets)
+            spark = sparkline([b[1] for b in buckets])
+            rows.append(f"{label:<10}{spark}\n{'':<10}min {low:.1f} / avg {average:.1f} / max {high:.1f}")
+
+        if not rows:
+            await ctx.send(f"📭 {name} 最近 {range_text} 沒有資源取樣資料（伺服器可能未執行）")
+            return
+        title = f"📈 {name} 最近 {range_text} 資源用量（解析度 {format_resolution(resolution)}）"
+        await ctx.send(f"{title}\n```\n" + "\n".join(rows) + "\n```")
+
+
+async def setup(bot):
+    await bot.add_cog(Perf(bot))
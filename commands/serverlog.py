@@ -0,0 +1,91 @@
+import time
+from datetime import datetime
+from discord.ext import commands
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SERVER_COGS = {
+    "mc": "MinecraftServerControl", "minecraft": "MinecraftServerControl",
+    "7d": "SevenDayServerControl", "7dtd": "SevenDayServerControl",
+}
+DEFAULT_LINES = 20
+MAX_LINES = 200
+MESSAGE_LIMIT = 1800  # Discord 單則訊息 2000 字，預留 code block 與標題
+DEFAULT_EVENT_MINUTES = 60
+EVENT_LABELS = {
+    "join": "👋 加入", "leave": "🚪 離開", "death": "💀 死亡", "lag": "🐢 延遲",
+    "oom": "🧠 OOM", "crash": "💥 崩潰", "started": "✅ 啟動完成",
+}
+
+
+def fit_message(lines):
+    """從最新的一行往回取，直到塞滿一則訊息。"""
+    kept, size = [], 0
+    for line in reversed(lines):
+        line = line[:MESSAGE_LIMIT]
+        if size + len(line) + 1 > MESSAGE_LIMIT:
+            break
+        kept.append(line)
+        size += len(line) + 1
+    return list(reversed(kept))
+
+
+class ServerLog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command(name="serverlog")
+    async def server_log(self, ctx, server: str, query: str = str(DEFAULT_LINES)):
+        """📜 顯示伺服器最近的輸出：!serverlog <mc|7d> [行數|關鍵字]"""
+        cog = self.bot.get_cog(SERVER_COGS.get(server.lower(), ""))
+        if cog is None:
+            await ctx.send(f"❌ 找不到伺服器：`{server}`（可用：mc / 7d）")
+            return
+
+        log = cog.server.log
+        if query.isdigit():
+            lines = log.tail(min(int(query), MAX_LINES))
+            title = f"📜 {log.name} 最近 {len(lines)} 行輸出"
+        else:
+            lines = log.grep(query, MAX_LINES)
+            title = f"🔍 {log.name} 最近 {len(lines)} 筆包含 `{query}` 的輸出"
+
+        if not lines:
+            await ctx.send(f"📭 {log.name} 目前沒有符合的輸出紀錄")
+            return
+        shown = fit_message(lines)
+        if len(shown) < len(lines):
+            title += f"（僅顯示最後 {len(shown)} 行）"
+        text = "\n".join(shown).replace("```", "`​``")
+        await ctx.send(f"{title}\n```\n{text}\n```")
+
+    @commands.command(name="serverevents")
+    async def server_events(self, ctx, server: str, minutes: int = DEFAULT_EVENT_MINUTES):
+        """📊 顯示從伺服器輸出解析出的事件統計：!serverevents <mc|7d> [分鐘]"""
+        cog = self.bot.get_cog(SERVER_COGS.get(server.lower(), ""))
+        monitor = getattr(self.bot, "log_events", None)
+        store = monitor.stores.get(cog.server.name) if cog and monitor else None
+        if store is None:
+            await ctx.send(f"❌ 找不到伺服器：`{server}`（可用：mc / 7d）")
+            return
+
+        minutes = max(1, minutes)
+        summary = store.summary(minutes)
+        counts = "、".join(f"{label} {summary[kind]}" for kind, label in EVENT_LABELS.items() if summary.get(kind))
+        lines = [f"📊 {cog.server.name} 最近 {minutes} 分鐘：{counts or '沒有事件'}"]
+        since = time.time() - minutes * 60
+        for event in store.recent(set(EVENT_LABELS), 10):
+            if event.ts < since:
+                continue
+            detail = event.data.get("player") or event.data.get("detail") or ""
+            if "ticks" in event.data:
+                detail = f"落後 {event.data['ticks']} ticks（{event.data['ms']}ms）"
+            elif "fps" in event.data:
+                detail = f"FPS {event.data['fps']:.1f}"
+            lines.append(f"`{datetime.fromtimestamp(event.ts):%H:%M:%S}` {EVENT_LABELS[event.kind]} {detail}".rstrip())
+        await ctx.send("\n".join(fit_message(lines)))
+
+
+async def setup(bot):
+    await bot.add_cog(ServerLog(bot))
@@ -1,15 +1,16 @@
-import os
-import subprocess
-import psutil
-import asyncio
 from datetime import datetime
-import telnetlib
 from discord.ext import commands
+from core.process_registry import process_registry
+from core.telnet_client import SevenDaysConsole
+from core.server_manager import ServerManager
 from utils.logger import get_logger
 from config import SEVENDAY_DIR, SEVENDAY_EXE, SEVENDAY_KEYWORD, SEVENDAY_TELNET_PORT, SEVENDAY_TELNET_PASSWORD
+from config import SERVER_LOG_BUFFER_LINES
 
 logger = get_logger(__name__)
 
+PROCESS_KEY = "7 Days to Die"
+
 class SevenDayServerControl(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -20,31 +21,61 @@ class SevenDayServerControl(commands.Cog):
         self.telnet_password = SEVENDAY_TELNET_PASSWORD
         self.last_started = None
         self.last_backup = None
+        # 登入一次後保持連線，玩家數 / 面板狀態 / 關閉共用
+        self.server = ServerManager(
+            PROCESS_KEY, self.exe_file, self.base_path, name_keyword=self.keyword or "7DaysToDieServer",
+            log_buffer_lines=SERVER_LOG_BUFFER_LINES
+        )
+        self.console = SevenDaysConsole(
+            "127.0.0.1", self.telnet_port, self.telnet_password, on_line=self._console_line
+        )
+
+    def _console_line(self, line):
+        # 伺服器不是由 bot 啟動（或 bot 重啟過）時讀不到 stdout，改以 telnet 推送的 log 餵給 pipeline
+        if not self.server.log.attached:
+            self.server.log.feed(line)
 
     def is_process_running(self):
-        for proc in psutil.process_iter(['name', 'cmdline']):
-            try:
-                if proc.info['name'] and self.keyword in proc.info['name']:
-                    return True
-            except:
-                continue
-        return False
+        return process_registry.is_running(PROCESS_KEY)
+
+    async def cog_unload(self):
+        await self.console.close()
+
+    async def get_player_count(self):
+        """透過 telnet lp 取得線上玩家數；伺服器未執行回傳 0，執行中但查詢失敗回傳 None。"""
+        if not await process_registry.is_running_async(PROCESS_KEY):
+            return 0
+        try:
+            return (await self.console.list_players())["count"]
+        except Exception as e:
+            logger.debug(f"查詢 7 Days 玩家數失敗：{e}")
+            return None
+
+    async def get_server_stats(self):
+        """面板用：{players, day, hour, minute, fps, heap, max, ...}；伺服器未執行或查詢失敗回傳 None。"""
+        if not await process_registry.is_running_async(PROCESS_KEY):
+            return None
+        try:
+            stats = {"players": (await self.console.list_players())["count"]}
+            stats.update(await self.console.game_time())
+            stats.update(await self.console.memory_stats())
+            return stats
+        except Exception as e:
+            logger.debug(f"查詢 7 Days 狀態失敗：{e}")
+            return None
 
     @commands.command(name="start7d")
     async def start_server(self, ctx):
-        if self.is_process_running():
+        if await process_registry.is_running_async(PROCESS_KEY):
             logger.warning("⚠️ 7 Days 已在執行中")
             return False
         try:
-            subprocess.Popen(
-                os.path.join(self.base_path, self.exe_file),
-                cwd=self.base_path,
-                shell=True
-            )
+            if await self.server.start_server() is None:
+                return None
             self.last_started = datetime.now()
             logger.info("✅ 7 Days 啟動成功")
             if self.bot and hasattr(self.bot, "backup_task"):
-                self.bot.backup_task.start()
+                self.bot.backup_task.wake("7 Days to Die")
             return True
         except Exception as e:
             logger.error(f"❌ 7 Days 啟動失敗：{e}")
@@ -52,29 +83,18 @@ class SevenDayServerControl(commands.Cog):
 
     @commands.command(name="stop7d")
     async def stop_server(self, ctx):
-        if not self.is_process_running():
+        if not await process_registry.is_running_async(PROCESS_KEY):
             logger.warning("⚠️ 7 Days 尚未啟動")
             return False
         try:
-            with telnetlib.Telnet("127.0.0.1", self.telnet_port, timeout=10) as tn:
-                tn.read_until(b"Please enter password:", timeout=5)
-                tn.write(self.telnet_password.encode("utf-8") + b"\n")
-                tn.read_until(b"\n", timeout=5)
-                await asyncio.sleep(3)
-                tn.write(b"shutdown\n")
+            await self.console.shutdown()
             logger.info("🛑 7 Days 關閉成功")
             if self.bot and hasattr(self.bot, "backup_task"):
-                asyncio.create_task(self._stop_backup_after_delay())
+                self.bot.backup_task.wake("7 Days to Die")
             return True
         except Exception as e:
             logger.error(f"❌ 7 Days 關閉失敗：{e}")
             return None
 
-    async def _stop_backup_after_delay(self):
-        await asyncio.sleep(300)
-        if hasattr(self.bot, "backup_task"):
-            self.bot.backup_task.stop()
-            logger.info("📦 自動備份任務已關閉")
-
 async def setup(bot):
     await bot.add_cog(SevenDayServerControl(bot))
@@ -7,6 +7,15 @@ load_dotenv()  # 讀取 .env 檔案
 # Discord Bot
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CONTROL_THREAD_ID = os.getenv("CONTROL_THREAD_ID")
+# 控制面板狀態快取：快照超過 TTL 秒才重新探測，單次探測逾時秒數
+STATUS_CACHE_TTL = int(os.getenv("STATUS_CACHE_TTL", 15))
+STATUS_PROBE_TIMEOUT = float(os.getenv("STATUS_PROBE_TIMEOUT", 3))
+# 控制面板自動更新：面板訊息 ID 存檔位置與更新間隔（秒）；啟動 / 關閉後 TRANSITION_SECONDS 秒內用較短間隔，兩個伺服器都沒在執行時用 IDLE 間隔
+PANEL_STATE_FILE = os.getenv("PANEL_STATE_FILE", "data/panel_state.json")
+PANEL_UPDATE_INTERVAL = int(os.getenv("PANEL_UPDATE_INTERVAL", 60))
+PANEL_IDLE_INTERVAL = int(os.getenv("PANEL_IDLE_INTERVAL", 300))
+PANEL_TRANSITION_INTERVAL = int(os.getenv("PANEL_TRANSITION_INTERVAL", 10))
+PANEL_TRANSITION_SECONDS = int(os.getenv("PANEL_TRANSITION_SECONDS", 180))
 
 # Minecraft Server
 MINECRAFT_JAR_KEYWORD = os.getenv("MINECRAFT_JAR_KEYWORD")
@@ -15,6 +24,12 @@ MINECRAFT_BASE_PATH = os.getenv("MINECRAFT_BASE_PATH")
 MINECRAFT_RCON_PORT = int(os.getenv("MINECRAFT_RCON_PORT"))
 MINECRAFT_RCON_PASSWORD = os.getenv("MINECRAFT_RCON_PASSWORD")
 MINECRAFT_STATUS_THREAD_ID = int(os.getenv("MINECRAFT_STATUS_THREAD_ID"))
+# TPS 監控：每隔幾秒用 RCON 查詢一次；TPS 連續 MINUTES 分鐘低於 THRESHOLD 時通知狀態頻道
+# 查詢指令 auto 會依序嘗試 tick query（原版 1.20.3+）與 tps（Paper 等）
+MINECRAFT_TPS_INTERVAL_SECONDS = int(os.getenv("MINECRAFT_TPS_INTERVAL_SECONDS", 30))
+MINECRAFT_TPS_ALERT_THRESHOLD = float(os.getenv("MINECRAFT_TPS_ALERT_THRESHOLD", 15))
+MINECRAFT_TPS_ALERT_MINUTES = int(os.getenv("MINECRAFT_TPS_ALERT_MINUTES", 3))
+MINECRAFT_TPS_COMMAND = os.getenv("MINECRAFT_TPS_COMMAND", "auto")
 
 
 # 7 Days to Die Server
@@ -25,6 +40,14 @@ SEVENDAY_TELNET_PORT = int(os.getenv("SEVENDAY_TELNET_PORT"))
 SEVENDAY_TELNET_PASSWORD = os.getenv("SEVENDAY_TELNET_PASSWORD")
 SEVENDAY_STATUS_THREAD_ID = int(os.getenv("SEVENDAY_STATUS_THREAD_ID"))
 SEVENDAY_SAVE_PATH = os.getenv("SEVENDAY_SAVE_PATH")
+# 每個伺服器在記憶體保留的最近輸出行數（!serverlog）
+SERVER_LOG_BUFFER_LINES = int(os.getenv("SERVER_LOG_BUFFER_LINES", 5000))
+# 主機與伺服器進程的資源取樣間隔（秒）
+TELEMETRY_INTERVAL_SECONDS = int(os.getenv("TELEMETRY_INTERVAL_SECONDS", 5))
+# log 事件警告：LOG_LAG_ALERT_WINDOW_MINUTES 分鐘內延遲警告達門檻就通知狀態頻道，同類警告間隔至少 cooldown 分鐘
+LOG_LAG_ALERT_THRESHOLD = int(os.getenv("LOG_LAG_ALERT_THRESHOLD", 5))
+LOG_LAG_ALERT_WINDOW_MINUTES = int(os.getenv("LOG_LAG_ALERT_WINDOW_MINUTES", 5))
+LOG_ALERT_COOLDOWN_MINUTES = int(os.getenv("LOG_ALERT_COOLDOWN_MINUTES", 30))
 # 資料轉發配置檔案
 FORWARDER_CONFIG = os.getenv("FORWARDER_CONFIG", "data/forwarder_map.json")
 BDNEWS_DATA_FILE = os.getenv("BDNEWS_DATA_FILE", "data/news_data.json")
@@ -40,6 +63,46 @@ ANIME_SONG_DATA_FILE = os.getenv("ANIME_SONG_DATA_FILE")
 
 # Backup Directory
 BACKUP_ROOT = os.getenv("BACKUP_ROOT")
+# zip：每次完整壓縮；dedup：內容定址 chunk 去重（只寫入新 chunk + manifest）
+# link：每個備份點是一個目錄，未變更檔案 hardlink 到上一個備份點（rsnapshot 式）
+BACKUP_MODE = os.getenv("BACKUP_MODE", "zip")
+# zip 模式的壓縮格式：store / deflate / lzma / zstd（需安裝 zstandard）
+# zstd 需明確指定：產生的 zip 只有本 bot 的還原功能能讀取，一般解壓縮工具與標準 zipfile 都打不開
+MINECRAFT_BACKUP_CODEC = os.getenv("MINECRAFT_BACKUP_CODEC", "deflate")
+SEVENDAY_BACKUP_CODEC = os.getenv("SEVENDAY_BACKUP_CODEC", "deflate")
+BACKUP_WORKERS = int(os.getenv("BACKUP_WORKERS", 0)) or None  # 0 = 使用全部 CPU 核心
+# 增量備份：只打包自上次備份後變更的檔案，每 BACKUP_FULL_EVERY 次做一次完整備份
+BACKUP_INCREMENTAL = os.getenv("BACKUP_INCREMENTAL", "false").lower() == "true"
+BACKUP_FULL_EVERY = int(os.getenv("BACKUP_FULL_EVERY", 24))
+BACKUP_HASH_FILES = os.getenv("BACKUP_HASH_FILES", "false").lower() == "true"
+# Minecraft 快照：RCON save-off / save-all flush 後同步到 staging 再壓縮，避免備份到寫一半的 region
+# 需手動開啟：BACKUP_ROOT/.staging/<伺服器> 會常駐一份完整的世界複本（多佔一份世界大小的磁碟空間）
+MINECRAFT_BACKUP_SNAPSHOT = os.getenv("MINECRAFT_BACKUP_SNAPSHOT", "false").lower() == "true"
+MINECRAFT_REGION_DELTA = os.getenv("MINECRAFT_REGION_DELTA", "false").lower() == "true"
+# 同時進行備份的 handler 數量，以及每個 handler 的磁碟讀 / 寫頻寬上限（MB/s，0 = 不限制）
+BACKUP_MAX_CONCURRENCY = int(os.getenv("BACKUP_MAX_CONCURRENCY", 2))
+BACKUP_READ_LIMIT_MBPS = float(os.getenv("BACKUP_READ_LIMIT_MBPS", 0))
+BACKUP_WRITE_LIMIT_MBPS = float(os.getenv("BACKUP_WRITE_LIMIT_MBPS", 0))
+MINECRAFT_BACKUP_INTERVAL_MINUTES = int(os.getenv("MINECRAFT_BACKUP_INTERVAL_MINUTES", 30))
+SEVENDAY_BACKUP_INTERVAL_MINUTES = int(os.getenv("SEVENDAY_BACKUP_INTERVAL_MINUTES", 30))
+BACKUP_FALLBACK_INTERVAL_MINUTES = int(os.getenv("BACKUP_FALLBACK_INTERVAL_MINUTES", 60))
+BACKUP_POLL_SECONDS = int(os.getenv("BACKUP_POLL_SECONDS", 60))
+BACKUP_VERIFY = os.getenv("BACKUP_VERIFY", "true").lower() == "true"
+BACKUP_VERIFY_READ_LIMIT_MBPS = float(os.getenv("BACKUP_VERIFY_READ_LIMIT_MBPS", 20))
+BACKUP_REPLICA_ENDPOINT = os.getenv("BACKUP_REPLICA_ENDPOINT", "")
+BACKUP_REPLICA_BUCKET = os.getenv("BACKUP_REPLICA_BUCKET", "")
+BACKUP_REPLICA_ACCESS_KEY = os.getenv("BACKUP_REPLICA_ACCESS_KEY", "")
+BACKUP_REPLICA_SECRET_KEY = os.getenv("BACKUP_REPLICA_SECRET_KEY", "")
+BACKUP_REPLICA_REGION = os.getenv("BACKUP_REPLICA_REGION", "us-east-1")
+BACKUP_REPLICA_PREFIX = os.getenv("BACKUP_REPLICA_PREFIX", "")
+BACKUP_REPLICA_PART_MB = int(os.getenv("BACKUP_REPLICA_PART_MB", 16))
+BACKUP_REPLICA_CONCURRENCY = int(os.getenv("BACKUP_REPLICA_CONCURRENCY", 4))
+BACKUP_REPLICA_LIMIT_MBPS = float(os.getenv("BACKUP_REPLICA_LIMIT_MBPS", 0))
+# 各伺服器的 GFS 保留策略（如 "24h,14d,8w"），留空則沿用 36 小時；容量上限 GB，0 = 不限制
+MINECRAFT_RETENTION = os.getenv("MINECRAFT_RETENTION", "")
+MINECRAFT_BACKUP_BUDGET_GB = float(os.getenv("MINECRAFT_BACKUP_BUDGET_GB", 0))
+SEVENDAY_RETENTION = os.getenv("SEVENDAY_RETENTION", "")
+SEVENDAY_BACKUP_BUDGET_GB = float(os.getenv("SEVENDAY_BACKUP_BUDGET_GB", 0))
 
 # Riot Games News
 VALORANT_BASE_URL = "https://playvalorant.com"
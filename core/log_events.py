@@ -0,0 +1,108 @@
+import re
+import time
+from collections import deque, namedtuple, Counter
+
+# kind：join / leave / lag / oom / crash / started / death / perf
+LogEvent = namedtuple("LogEvent", ["ts", "server", "kind", "data"])
+
+LOW_FPS = 15  # 7 Days 沒有「Can't keep up」，以 mem 統計的 FPS 低於此值視為 lag
+
+_MINECRAFT_RULES = [
+    ("join", re.compile(r"\]: (\w{3,16}) joined the game")),
+    ("leave", re.compile(r"\]: (\w{3,16}) left the game")),
+    ("lag", re.compile(r"Can't keep up! Is the server overloaded\? Running (\d+)ms or (\d+) ticks behind")),
+    ("oom", re.compile(r"java\.lang\.OutOfMemoryError(?:: (.+))?")),
+    ("crash", re.compile(r"This crash report has been saved to: (.+)")),
+    ("started", re.compile(r"Done \(([\d.]+)s\)! For help")),
+]
+
+_SEVENDAY_RULES = [
+    ("join", re.compile(r"GMSG: Player '(.+)' joined the game")),
+    ("leave", re.compile(r"GMSG: Player '(.+)' left the game")),
+    ("death", re.compile(r"GMSG: Player '(.+)' died")),
+    ("perf", re.compile(r"Time: ([\d.]+)m FPS: ([\d.]+) Heap: ([\d.]+)MB Max: ([\d.]+)MB")),
+    ("oom", re.compile(r"(OutOfMemoryException|Out of memory)")),
+    ("crash", re.compile(r"Crash!!!|Segmentation fault")),
+    ("started", re.compile(r"GameServer\.LogOn successful|StartGame done")),
+]
+
+
+def _minecraft_data(kind, match):
+    if kind in ("join", "leave"):
+        return {"player": match.group(1)}
+    if kind == "lag":
+        return {"ms": int(match.group(1)), "ticks": int(match.group(2))}
+    if kind == "started":
+        return {"seconds": float(match.group(1))}
+    return {"detail": match.group(1)} if match.groups() and match.group(1) else {}
+
+
+def _sevenday_data(kind, match):
+    if kind in ("join", "leave", "death"):
+        return {"player": match.group(1)}
+    if kind == "perf":
+        minutes, fps, heap, heap_max = map(float, match.groups())
+        return {"uptime_min": minutes, "fps": fps, "heap_mb": heap, "max_mb": heap_max}
+    return {}
+
+
+class LogEventParser:
+    """把伺服器 log 的原始行轉成 LogEvent；不感興趣的行回傳 None。"""
+
+    def __init__(self, server, flavor):
+        self.server = server
+        if flavor == "minecraft":
+            self.rules, self.extract = _MINECRAFT_RULES, _minecraft_data
+        else:
+            self.rules, self.extract = _SEVENDAY_RULES, _sevenday_data
+
+    def parse(self, line, now=None):
+        for kind, pattern in self.rules:
+            match = pattern.search(line)
+            if match:
+                return LogEvent(now or time.time(), self.server, kind, self.extract(kind, match))
+        return None
+
+    def expand(self, event):
+        """由單一事件衍生的事件（7 Days 低 FPS 視為 lag）。"""
+        if event.kind == "perf" and event.data["fps"] < LOW_FPS:
+            return [event, LogEvent(event.ts, event.server, "lag", {"fps": event.data["fps"]})]
+        return [event]
+
+
+class LogEventStore:
+    """最近的事件（固定筆數）與每分鐘各類事件數（固定分鐘數），記憶體用量固定。"""
+
+    def __init__(self, max_events=1000, minutes=24 * 60):
+        self.events = deque(maxlen=max_events)
+        self.minutes = deque(maxlen=minutes)  # [分鐘, Counter]，舊到新
+
+    def record(self, event):
+        self.events.append(event)
+        minute = int(event.ts // 60)
+        if not self.minutes or self.minutes[-1][0] != minute:
+            self.minutes.append([minute, Counter()])
+        self.minutes[-1][1][event.kind] += 1
+
+    def count(self, kind, minutes, now=None):
+        """最近 minutes 分鐘內（含目前這分鐘）kind 事件的數量。"""
+        since = int((now or time.time()) // 60) - minutes + 1
+        total = 0
+        for minute, counts in reversed(self.minutes):
+            if minute < since:
+                break
+            total += counts[kind]
+        return total
+
+    def summary(self, minutes, now=None):
+        since = int((now or time.time()) // 60) - minutes + 1
+        totals = Counter()
+        for minute, counts in reversed(self.minutes):
+            if minute < since:
+                break
+            totals.update(counts)
+        return dict(totals)
+
+    def recent(self, kinds=None, limit=10):
+        matches = [event for event in self.events if kinds is None or event.kind in kinds]
+        return matches[-limit:]
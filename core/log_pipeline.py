@@ -0,0 +1,120 @@
+import os
+import re
+import asyncio
+from collections import deque
+from utils.logger import get_logger
+
+logger = get_logger("ServerLog")
+
+LINE_LIMIT = 1024 * 1024  # StreamReader 單行上限，超過的行會被截斷略過
+FLUSH_INTERVAL = 1.0
+FLUSH_LINES = 500
+MAX_PENDING_LINES = 20000  # 寫檔跟不上時最多暫存的行數，超過就丟棄最舊的，記憶體不會無限成長
+
+
+class ServerLogPipeline:
+    """單一伺服器的輸出管線：非同步逐行讀取，批次寫入 log 檔，並在記憶體保留最近 N 行供查詢。
+
+    listener（callable(line)）會在每一行進來時被呼叫，用於事件解析等即時處理。
+    """
+
+    def __init__(self, name, buffer_lines=5000):
+        self.name = name
+        self.lines = deque(maxlen=buffer_lines)
+        self.listeners = []
+        self.log_path = None
+        self.dropped = 0
+        self._pending = []
+        self._file = None
+        self._flush_lock = asyncio.Lock()
+        self._reading = False
+
+    @property
+    def attached(self):
+        """是否正在讀取伺服器的 stdout。"""
+        return self._reading
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def feed(self, line):
+        self.lines.append(line)
+        if self._file is not None:
+            self._pending.append(line)
+            if len(self._pending) > MAX_PENDING_LINES:
+                overflow = len(self._pending) - MAX_PENDING_LINES
+                del self._pending[:overflow]
+                self.dropped += overflow
+        for callback in self.listeners:
+            try:
+                callback(line)
+            except Exception as e:
+                logger.debug(f"[{self.name}] log listener 失敗：{e}")
+
+    async def consume(self, stream, log_path):
+        """讀取 stream 直到 EOF（伺服器結束），同時每秒或累積一定行數就寫檔一次。"""
+        loop = asyncio.get_running_loop()
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        self._file = await loop.run_in_executor(None, lambda: open(log_path, "a", encoding="utf-8"))
+        self.log_path = log_path
+        self._reading = True
+        flusher = asyncio.create_task(self._flush_loop())
+        logger.info(f"📝 {self.name} 輸出寫入：{log_path}")
+        try:
+            while True:
+                try:
+                    raw = await stream.readline()
+                except ValueError:
+                    # 單行超過 LINE_LIMIT：StreamReader 已丟棄該段資料，繼續讀下一行
+                    continue
+                if not raw:
+                    break
+                line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                if line:
+                    self.feed(line)
+                if len(self._pending) >= FLUSH_LINES:
+                    await self.flush()
+        finally:
+            self._reading = False
+            flusher.cancel()
+            await self.flush()
+            file, self._file = self._file, None
+            await loop.run_in_executor(None, file.close)
+            if self.dropped:
+                logger.warning(f"⚠️ {self.name} 寫檔跟不上，共丟棄 {self.dropped} 行 log")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending or self._file is None:
+                return
+            chunk, self._pending = "\n".join(self._pending) + "\n", []
+            file = self._file
+            await asyncio.get_running_loop().run_in_executor(None, lambda: (file.write(chunk), file.flush()))
+
+    def tail(self, count):
+        count = max(count, 0)
+        return list(self.lines)[-count:] if count else []
+
+    def grep(self, keyword, limit):
+        """最近 limit 筆包含 keyword 的行（不分大小寫）。"""
+        pattern = re.compile(re.escape(keyword), re.IGNORECASE)
+        matches = deque(maxlen=limit)
+        for line in self.lines:
+            if pattern.search(line):
+                matches.append(line)
+        return list(matches)
+
+
+_pipelines = {}
+
+
+def get_log_pipeline(name, buffer_lines=5000):
+    """依伺服器名稱取得共用的 pipeline（ServerManager、指令與事件解析共用同一份）。"""
+    if name not in _pipelines:
+        _pipelines[name] = ServerLogPipeline(name, buffer_lines)
+    return _pipelines[name]
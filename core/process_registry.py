@@ -0,0 +1,161 @@
+import time
+import asyncio
+import threading
+import psutil
+from utils.logger import get_logger
+
+logger = get_logger("ProcessRegistry")
+
+MISS_TTL = 30  # 掃描確認「未執行」後，這段時間內不再重掃整個進程表
+
+_ACCESS_ERRORS = (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, PermissionError)
+
+
+def _identity(pid):
+    """(pid, create_time)；create_time 用來分辨 PID 被系統回收給其他進程的情況。"""
+    try:
+        return pid, psutil.Process(pid).create_time()
+    except _ACCESS_ERRORS:
+        return None
+
+
+def _alive(identity):
+    pid, create_time = identity
+    if not psutil.pid_exists(pid):
+        return None
+    try:
+        proc = psutil.Process(pid)
+        return proc if proc.create_time() == create_time else None
+    except _ACCESS_ERRORS:
+        return None
+
+
+class ProcessRegistry:
+    """記錄各伺服器的進程，狀態查詢只需 pid_exists + create_time 驗證。
+
+    bot 啟動伺服器時以 track() 記錄 Popen 的 PID（通常是 shell / 啟動器），實際伺服器從它的子進程找；
+    快取失效（伺服器重啟、由 bot 以外的方式啟動）時才掃描整個進程表，一次掃描的結果由所有 target 共用。
+    """
+
+    def __init__(self, miss_ttl=MISS_TTL):
+        self.miss_ttl = miss_ttl
+        self._targets = {}    # key -> (name_keyword, cmdline_keyword)
+        self._entries = {}    # key -> 已驗證的伺服器進程 (pid, create_time)
+        self._launchers = {}  # key -> track() 記錄的啟動器 (pid, create_time)
+        self._misses = {}     # key -> 上次掃描確認未執行的時間（monotonic）
+        self._scan_lock = threading.Lock()
+        self.scan_count = 0
+
+    def register(self, key, name_keyword=None, cmdline_keyword=None):
+        """登記要追蹤的伺服器；兩個關鍵字都沒有時只能依 track() 的 PID 判斷。"""
+        self._targets[key] = (name_keyword, cmdline_keyword)
+
+    def track(self, key, pid):
+        identity = _identity(pid)
+        if identity:
+            self._launchers[key] = identity
+        self._entries.pop(key, None)
+        self._misses.pop(key, None)
+
+    def forget(self, key):
+        self._entries.pop(key, None)
+        self._launchers.pop(key, None)
+        self._misses.pop(key, None)
+
+    def _matches(self, key, name, cmdline):
+        name_keyword, cmdline_keyword = self._targets.get(key, (None, None))
+        if name_keyword and name and name_keyword in name:
+            return True
+        return bool(cmdline_keyword and cmdline and any(cmdline_keyword in str(arg) for arg in cmdline))
+
+    def _proc_matches(self, key, proc):
+        try:
+            return self._matches(key, proc.name(), proc.cmdline())
+        except _ACCESS_ERRORS:
+            return False
+
+    def _from_launcher(self, key):
+        identity = self._launchers.get(key)
+        if identity is None:
+            return None
+        launcher = _alive(identity)
+        if launcher is None:
+            self._launchers.pop(key, None)
+            return None
+        if self._targets.get(key, (None, None)) == (None, None) or self._proc_matches(key, launcher):
+            return launcher
+        try:
+            children = launcher.children(recursive=True)
+        except _ACCESS_ERRORS:
+            return None
+        return next((child for child in children if self._proc_matches(key, child)), None)
+
+    def get_process(self, key):
+        """回傳伺服器的 psutil.Process，未執行回傳 None。"""
+        identity = self._entries.get(key)
+        if identity:
+            proc = _alive(identity)
+            if proc:
+                return proc
+            self._entries.pop(key, None)
+
+        proc = self._from_launcher(key)
+        if proc is None:
+            missed_at = self._misses.get(key)
+            if missed_at is not None and time.monotonic() - missed_at < self.miss_ttl:
+                return None
+            proc = self._scan(key)
+        if proc is not None:
+            self._entries[key] = _identity(proc.pid) or (proc.pid, 0)
+        return proc
+
+    def _scan(self, key):
+        started = time.monotonic()
+        with self._scan_lock:
+            # 等鎖期間其他呼叫者可能已經掃描過，直接沿用結果
+            identity = self._entries.get(key)
+            proc = _alive(identity) if identity else None
+            if proc:
+                return proc
+            if self._misses.get(key, 0) >= started:
+                return None
+            if self._targets.get(key, (None, None)) == (None, None):
+                self._misses[key] = time.monotonic()
+                return None
+
+            pending = {k for k in self._targets if k not in self._entries and self._targets[k] != (None, None)}
+            found = {}
+            for proc in psutil.process_iter(["name", "cmdline"]):
+                try:
+                    for k in pending - found.keys():
+                        if self._matches(k, proc.info.get("name"), proc.info.get("cmdline")):
+                            found[k] = proc
+                except _ACCESS_ERRORS:
+                    continue
+                if len(found) == len(pending):
+                    break
+            self.scan_count += 1
+
+            now = time.monotonic()
+            for k in pending:
+                if k in found:
+                    self._entries[k] = _identity(found[k].pid) or (found[k].pid, 0)
+                    self._misses.pop(k, None)
+                else:
+                    self._misses[k] = now
+            logger.debug(f"進程表掃描完成（{(now - started) * 1000:.1f} ms），找到：{', '.join(found) or '無'}")
+            return found.get(key)
+
+    def is_running(self, key):
+        return self.get_process(key) is not None
+
+    async def is_running_async(self, key):
+        """快取有效時直接回傳；需要掃描進程表時改到 executor 執行，不阻塞 event loop。"""
+        identity = self._entries.get(key)
+        if identity and _alive(identity):
+            return True
+        return await asyncio.get_running_loop().run_in_executor(None, self.is_running, key)
+
+
+# 整個 bot 共用一份，cog、ServerManager 與控制面板查到的結果互相沿用
+process_registry = ProcessRegistry()
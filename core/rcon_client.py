@@ -0,0 +1,195 @@
+import struct
+import asyncio
+import itertools
+from utils.logger import get_logger
+
+logger = get_logger("RconClient")
+
+PACKET_HEADER = struct.Struct("<iii")  # length, request id, type
+TYPE_RESPONSE = 0
+TYPE_COMMAND = 2
+TYPE_LOGIN = 3
+TYPE_SENTINEL = 200  # 伺服器不認得的類型會回覆「Unknown request」，用來標記前一個指令的回應已結束
+MAX_PACKET_SIZE = 4096 + 14
+DEFAULT_TIMEOUT = 5.0
+
+
+class RconError(Exception):
+    pass
+
+
+class RconAuthError(RconError):
+    pass
+
+
+class RconClient:
+    """非同步 RCON 連線：登入一次後保持連線，斷線時下一個指令自動重連。
+
+    指令可以連續送出不必等回應（pipeline），以 request id 對應回應；每個指令後面緊跟一個 sentinel 封包，
+    收到 sentinel 的回覆就代表前一個指令分段的回應已全部到齊。
+    """
+
+    def __init__(self, host, port, password, timeout=DEFAULT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._connect_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+        self._pending = {}    # request id -> (future, [回應片段])
+        self._sentinels = {}  # sentinel id -> 對應指令的 request id
+        self._login = None    # (request id, future)
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    def _next_id(self):
+        request_id = next(self._ids)
+        if request_id >= 2 ** 31 - 1:
+            self._ids = itertools.count(1)
+            request_id = next(self._ids)
+        return request_id
+
+    def _send_packet(self, request_id, packet_type, body):
+        payload = body.encode("utf-8") + b"\x00\x00"
+        self._writer.write(PACKET_HEADER.pack(len(payload) + 8, request_id, packet_type) + payload)
+
+    async def connect(self):
+        async with self._connect_lock:
+            if self.connected:
+                return
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                raise RconError(f"無法連線 RCON {self.host}:{self.port}：{e.__class__.__name__} {e}") from e
+            self._read_task = asyncio.create_task(self._read_loop())
+
+            login_id = self._next_id()
+            self._login = (login_id, asyncio.get_running_loop().create_future())
+            try:
+                self._send_packet(login_id, TYPE_LOGIN, self.password)
+                await self._writer.drain()
+                await asyncio.wait_for(self._login[1], self.timeout)
+            except RconError:
+                await self._disconnect()
+                raise
+            except (OSError, asyncio.TimeoutError) as e:
+                await self._disconnect()
+                raise RconError(f"RCON 登入逾時或連線中斷：{e.__class__.__name__}") from e
+            finally:
+                self._login = None
+            logger.info(f"🔌 RCON 已連線：{self.host}:{self.port}")
+
+    async def _read_packet(self):
+        length, request_id, packet_type = PACKET_HEADER.unpack(await self._reader.readexactly(PACKET_HEADER.size))
+        if not 10 <= length <= MAX_PACKET_SIZE:
+            raise RconError(f"RCON 封包長度異常：{length}")
+        body = await self._reader.readexactly(length - 8)
+        return request_id, packet_type, body[:-2].decode("utf-8", errors="replace")
+
+    async def _read_loop(self):
+        error = RconError("RCON 連線已中斷")
+        try:
+            while True:
+                request_id, packet_type, body = await self._read_packet()
+                if self._login:
+                    login_id, future = self._login
+                    if future.done():
+                        continue
+                    if request_id == -1:
+                        future.set_exception(RconAuthError("RCON 密碼錯誤"))
+                    elif request_id == login_id and packet_type == TYPE_COMMAND:
+                        future.set_result(True)
+                    continue
+                if request_id in self._pending:
+                    self._pending[request_id][1].append(body)
+                elif request_id in self._sentinels:
+                    command_id = self._sentinels.pop(request_id)
+                    future, parts = self._pending.pop(command_id, (None, None))
+                    if future and not future.done():
+                        future.set_result("".join(parts))
+        except asyncio.CancelledError:
+            raise
+        except (asyncio.IncompleteReadError, OSError) as e:
+            error = RconError(f"RCON 連線已中斷：{e.__class__.__name__}")
+        except RconError as e:
+            error = e
+        finally:
+            self._fail_pending(error)
+            if self._writer:
+                self._writer.close()
+            self._writer = None
+
+    def _fail_pending(self, error):
+        futures = [future for future, parts in self._pending.values()]
+        if self._login:
+            futures.append(self._login[1])
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        self._sentinels.clear()
+
+    async def _disconnect(self):
+        if self._read_task:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._read_task = None
+        self._fail_pending(RconError("RCON 連線已關閉"))
+        if self._writer:
+            self._writer.close()
+        self._writer = None
+
+    async def _submit(self, command):
+        if not self.connected:
+            await self.connect()
+        if not self.connected:
+            raise RconError("RCON 連線已中斷")
+        request_id, sentinel_id = self._next_id(), self._next_id()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = (future, [])
+        self._sentinels[sentinel_id] = request_id
+        self._send_packet(request_id, TYPE_COMMAND, command)
+        self._send_packet(sentinel_id, TYPE_SENTINEL, "")
+        return future
+
+    async def _flush(self):
+        writer = self._writer
+        if writer is None:
+            raise RconError("RCON 連線已中斷")
+        try:
+            await writer.drain()
+        except OSError as e:
+            raise RconError(f"RCON 連線已中斷：{e.__class__.__name__}") from e
+
+    async def _wait(self, futures, timeout):
+        try:
+            return await asyncio.wait_for(asyncio.gather(*futures), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            # 伺服器卡住時丟棄整條連線，下一個指令重新連線，避免之後的回應錯位
+            await self._disconnect()
+            raise RconError("RCON 指令逾時")
+
+    async def command(self, command, timeout=None):
+        """送出單一指令並回傳伺服器回應。"""
+        future = await self._submit(command)
+        await self._flush()
+        return (await self._wait([future], timeout))[0]
+
+    async def pipeline(self, commands, timeout=None):
+        """一次送出多個指令再一起等回應，回傳與 commands 對應的回應清單。"""
+        futures = [await self._submit(command) for command in commands]
+        await self._flush()
+        return await self._wait(futures, timeout)
+
+    async def close(self):
+        await self._disconnect()
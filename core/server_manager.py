@@ -1,78 +1,69 @@
+import asyncio
 import subprocess
 import psutil
 import os
-import threading
+from core.process_registry import process_registry
+from core.log_pipeline import get_log_pipeline, LINE_LIMIT
 from utils.logger import get_logger
 from datetime import datetime
 
 logger = get_logger("ServerManager")
 
 class ServerManager:
-    def __init__(self, name: str, jar_path: str, working_dir: str, keyword: str):
+    def __init__(self, name: str, jar_path: str, working_dir: str, keyword: str = None,
+                 name_keyword: str = None, creationflags: int = 0, log_buffer_lines: int = 5000):
         self.name = name
         self.jar_path = jar_path  # 實際上這裡為 .bat 檔案名稱
         self.working_dir = working_dir
         self.keyword = keyword
+        self.creationflags = creationflags
         self.process = None
+        self.log = get_log_pipeline(name, log_buffer_lines)
+        self.log_task = None
+        # keyword 比對命令列、name_keyword 比對進程名稱
+        process_registry.register(self.name, name_keyword=name_keyword, cmdline_keyword=self.keyword)
 
     def is_running(self) -> bool:
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-            try:
-                cmdline = proc.info.get('cmdline') or []
-                if cmdline and any(self.keyword in str(arg) for arg in cmdline):
-                    return True
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, PermissionError) as e:
-                logger.debug(f"[DEBUG] 無法讀取進程：{e}")
-                continue
-        return False
-
-    def start_server(self):
-        if self.is_running():
-            logger.info(f"{self.name} 已在執行中。")
-            return
+        return process_registry.is_running(self.name)
 
+    async def start_server(self):
+        """啟動伺服器並開始收集輸出，回傳 asyncio 的 Process；找不到啟動檔回傳 None。"""
         bat_file_path = os.path.join(self.working_dir, self.jar_path)
         if not os.path.isfile(bat_file_path):
             logger.warning(f"找不到啟動檔：{bat_file_path}")
-            return
-
-        log_path = os.path.join("logs", f"{self.name.lower()}_{datetime.now():%Y%m%d_%H%M%S}.log")
-        os.makedirs("logs", exist_ok=True)
+            return None
 
-        logger.info(f"啟動 {self.name}，log 將同步輸出至 terminal 並寫入：{log_path}")
-
-        self.process = subprocess.Popen(
-            bat_file_path,
+        self.process = await asyncio.create_subprocess_shell(
+            subprocess.list2cmdline([bat_file_path]),
             cwd=self.working_dir,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding="utf-8"
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            limit=LINE_LIMIT,
+            creationflags=self.creationflags
         )
+        process_registry.track(self.name, self.process.pid)
+        logger.info(f"啟動 {self.name}，PID: {self.process.pid}")
+        self.log_task = asyncio.create_task(self.stream_log())
+        return self.process
 
-        # ✅ 使用 background thread 處理 log 輸出與寫入檔案，避免阻塞
-        def stream_log():
-            with open(log_path, "w", encoding="utf-8") as logfile:
-                for line in self.process.stdout:
-                    if not line:
-                        break
-                    line = line.strip()
-                    print(f"[{self.name}] {line}")
-                    logfile.write(f"{line}\n")
-
-        threading.Thread(target=stream_log, daemon=True).start()
+    async def stream_log(self):
+        """把伺服器輸出交給 log pipeline（批次寫檔 + 記憶體 ring buffer），直到伺服器結束。"""
+        log_path = os.path.join("logs", f"{self.name.lower().replace(' ', '_')}_{datetime.now():%Y%m%d_%H%M%S}.log")
+        try:
+            await self.log.consume(self.process.stdout, log_path)
+        except Exception as e:
+            logger.error(f"❌ 讀取 {self.name} 輸出失敗：{e.__class__.__name__} - {e}")
 
     def stop_server(self):
         logger.info(f"準備關閉 {self.name}...")
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-            try:
-                cmdline = proc.info.get('cmdline')
-                if cmdline and any(self.keyword in str(arg) for arg in cmdline):
-                    proc.terminate()
-                    proc.wait(timeout=10)
-                    logger.info(f"{self.name} 已關閉。")
-                    return
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired):
-                logger.warning(f"無法正常終止 {self.name} 的進程。")
-        logger.info(f"{self.name} 未在執行中。")
+        proc = process_registry.get_process(self.name)
+        if proc is None:
+            logger.info(f"{self.name} 未在執行中。")
+            return
+        try:
+            proc.terminate()
+            proc.wait(timeout=10)
+            process_registry.forget(self.name)
+            logger.info(f"{self.name} 已關閉。")
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired):
+            logger.warning(f"無法正常終止 {self.name} 的進程。")
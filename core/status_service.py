@@ -0,0 +1,88 @@
+import time
+import asyncio
+from mcstatus import JavaServer
+from core.process_registry import process_registry
+from utils.logger import get_logger
+
+logger = get_logger("StatusService")
+
+
+class StatusService:
+    """控制面板用的伺服器狀態快取（stale-while-revalidate）。
+
+    快照在 ttl 秒內直接回傳；過期時先回傳舊快照並在背景更新。同一時間只會有一次探測，
+    所有呼叫者共用結果，探測負載不隨呼叫次數增加。
+    """
+
+    def __init__(self, bot, ttl=15, probe_timeout=3):
+        self.bot = bot
+        self.ttl = ttl
+        self.probe_timeout = probe_timeout
+        self.minecraft = JavaServer("127.0.0.1", 25565, timeout=probe_timeout)
+        # 7 Days 狀態要送三個 telnet 指令（lp / gt / mem），等待上限是單次逾時的三倍
+        self.stats_timeout = probe_timeout * 3
+        self.snapshot = None
+        self._stale = False
+        self._probe = None
+        self._stats_task = None
+        self._last_stats = None
+
+    async def get(self, fresh=False):
+        """回傳 {minecraft, sevenday, taken_at}；fresh=True 或還沒有快照時等待探測完成。"""
+        if self.snapshot is None or fresh:
+            return await asyncio.shield(self.refresh())
+        if self._stale or time.time() - self.snapshot["taken_at"] > self.ttl:
+            self.refresh()
+        return self.snapshot
+
+    def refresh(self):
+        """開始一次探測（已在進行中就沿用），回傳該探測的 task。"""
+        if self._probe is None or self._probe.done():
+            self._probe = asyncio.create_task(self._run_probe())
+        return self._probe
+
+    def invalidate(self):
+        """伺服器啟動 / 關閉後呼叫：下一次 get 會觸發更新。"""
+        self._stale = True
+
+    async def _run_probe(self):
+        started = time.perf_counter()
+        self._stale = False
+        minecraft, sevenday = await asyncio.gather(self._probe_minecraft(), self._probe_sevenday())
+        self.snapshot = {"minecraft": minecraft, "sevenday": sevenday, "taken_at": time.time()}
+        logger.debug(f"狀態探測完成，耗時 {time.perf_counter() - started:.2f}s")
+        return self.snapshot
+
+    async def _probe_minecraft(self):
+        """在線回傳 {players, max, motd}，未執行或無法連線回傳 None。"""
+        try:
+            status = await asyncio.wait_for(self.minecraft.async_status(), self.probe_timeout)
+            return {"players": status.players.online, "max": status.players.max, "motd": status.description}
+        except Exception as e:
+            logger.debug(f"Minecraft 狀態探測失敗：{e.__class__.__name__} {e}")
+            return None
+
+    async def _probe_sevenday(self):
+        """回傳 {running, stats}；stats 為 telnet 查詢結果，查詢失敗為 None，查詢過久時為上一次的結果。"""
+        try:
+            running = await asyncio.wait_for(process_registry.is_running_async("7 Days to Die"), self.probe_timeout)
+        except Exception as e:
+            return {"running": False, "stats": None, "error": f"{e.__class__.__name__} {e}"}
+        cog = self.bot.get_cog("SevenDayServerControl")
+        if not running or cog is None:
+            self._last_stats = None
+            return {"running": running, "stats": None}
+        # 不取消查詢：取消會讓 telnet 主控台斷線重登，下次探測又從頭來過。
+        # 超過等待上限就先沿用上一次的結果，查詢在背景跑完後留給下一次探測
+        if self._stats_task is None or self._stats_task.done():
+            self._stats_task = asyncio.create_task(cog.get_server_stats())
+            self._stats_task.add_done_callback(self._keep_stats)
+        done, _ = await asyncio.wait({self._stats_task}, timeout=self.stats_timeout)
+        if not done:
+            logger.debug("7 Days 狀態查詢尚未完成，沿用上一次的結果")
+        return {"running": running, "stats": self._last_stats}
+
+    def _keep_stats(self, task):
+        if not task.cancelled() and task.exception() is None:
+            self._last_stats = task.result()
+
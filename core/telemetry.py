@@ -0,0 +1,69 @@
+import time
+from array import array
+
+# (解析度秒數, 保留桶數)：1 分鐘保留 1 天、15 分鐘保留 7 天、1 小時保留 30 天；原始取樣保留 1 小時
+DOWNSAMPLE_TIERS = ((60, 24 * 60), (15 * 60, 7 * 24 * 4), (60 * 60, 30 * 24))
+RAW_SECONDS = 60 * 60
+
+
+class _Tier:
+    """固定容量的環狀緩衝，每個桶記錄 (起始時間, 筆數, 總和, 最小, 最大)。"""
+
+    def __init__(self, resolution, capacity):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.start = array("d", bytes(8 * capacity))
+        self.count = array("d", bytes(8 * capacity))
+        self.total = array("d", bytes(8 * capacity))
+        self.low = array("d", bytes(8 * capacity))
+        self.high = array("d", bytes(8 * capacity))
+        self.head = -1
+        self.size = 0
+
+    @property
+    def span(self):
+        return self.resolution * self.capacity
+
+    def add(self, ts, value):
+        bucket = ts - ts % self.resolution
+        i = self.head
+        if self.size and self.start[i] == bucket:
+            self.count[i] += 1
+            self.total[i] += value
+            self.low[i] = min(self.low[i], value)
+            self.high[i] = max(self.high[i], value)
+            return
+        i = self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.start[i], self.count[i], self.total[i], self.low[i], self.high[i] = bucket, 1, value, value, value
+
+    def since(self, ts):
+        """由舊到新回傳起始時間 >= ts 的桶：[(起始時間, 平均, 最小, 最大)]。"""
+        buckets = []
+        for n in range(self.size):
+            i = (self.head - n) % self.capacity
+            if self.start[i] < ts:
+                break
+            buckets.append((self.start[i], self.total[i] / self.count[i], self.low[i], self.high[i]))
+        buckets.reverse()
+        return buckets
+
+
+class TimeSeries:
+    """單一指標的時間序列：原始取樣加上 1 分鐘 / 15 分鐘 / 1 小時的降採樣，記憶體用量固定。"""
+
+    def __init__(self, interval):
+        self.tiers = [_Tier(interval, max(1, RAW_SECONDS // interval))]
+        self.tiers += [_Tier(resolution, capacity) for resolution, capacity in DOWNSAMPLE_TIERS]
+        self.last = None  # (ts, value)
+
+    def add(self, value, ts=None):
+        ts = ts or time.time()
+        for tier in self.tiers:
+            tier.add(ts, value)
+        self.last = (ts, value)
+
+    def query(self, seconds, now=None):
+        """最近 seconds 秒的資料，使用能涵蓋該範圍的最細解析度；回傳 (解析度, 桶列表)。"""
+        tier = next((t for t in self.tiers if t.span >= seconds), self.tiers[-1])
+        return tier.resolution, tier.since((now or time.time()) - seconds)
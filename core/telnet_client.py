@@ -0,0 +1,179 @@
+import re
+import asyncio
+from utils.logger import get_logger
+
+logger = get_logger("SevenDaysConsole")
+
+DEFAULT_TIMEOUT = 10.0
+LINE_LIMIT = 1024 * 1024  # 登入時的伺服器資訊與 log 可能有很長的單行
+
+PASSWORD_PROMPT = b"Please enter password:"
+LOGIN_OK = b"Logon successful"
+LOGIN_READY = b"Press 'help' to get a list"  # 本機未設密碼時不會有密碼提示
+LOGIN_FAILED = b"Password incorrect"
+
+PLAYER_LINE_PATTERN = re.compile(r"^\d+\. id=(\d+), ([^,]+),")
+PLAYER_COUNT_PATTERN = re.compile(r"Total of (\d+) in the game")
+GAME_TIME_PATTERN = re.compile(r"Day (\d+), (\d+):(\d+)")
+MEM_PATTERN = re.compile(r"Time: [\d.]+m FPS: [\d.]+")
+MEM_FIELD_PATTERN = re.compile(r"(\w+): ([\d.]+)")
+
+_IAC_PATTERN = re.compile(rb"\xff[\xfb-\xfe].|\xff[\xf0-\xfa]")
+
+
+class TelnetError(Exception):
+    pass
+
+
+class TelnetAuthError(TelnetError):
+    pass
+
+
+class SevenDaysConsole:
+    """7 Days to Die 的 telnet 管理主控台：登入一次後保持連線，斷線時下一個指令自動重連。
+
+    telnet 會持續推送伺服器 log，回應沒有明確的結尾，所以每個指令以「回應最後一行」的樣式判斷是否結束；
+    同一時間只會有一個指令在等回應。
+    """
+
+    def __init__(self, host, port, password, timeout=DEFAULT_TIMEOUT, on_line=None):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.on_line = on_line  # callable(line)：收到的每一行（含伺服器 log）
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._connect_lock = asyncio.Lock()
+        self._command_lock = asyncio.Lock()
+        self._waiting = None  # (結尾樣式, 收到的行, future)
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        async with self._connect_lock:
+            if self.connected:
+                return
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, limit=LINE_LIMIT), self.timeout
+                )
+                await asyncio.wait_for(self._login(), self.timeout)
+            except TelnetError:
+                self._close_writer()
+                raise
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                self._close_writer()
+                raise TelnetError(f"無法連線 7 Days telnet {self.host}:{self.port}：{e.__class__.__name__} {e}") from e
+            self._read_task = asyncio.create_task(self._read_loop())
+            logger.info(f"🔌 7 Days telnet 已連線：{self.host}:{self.port}")
+
+    async def _login(self):
+        buffer = b""
+        sent_password = False
+        while True:
+            data = await self._reader.read(4096)
+            if not data:
+                raise TelnetError("登入時連線被關閉")
+            buffer = (buffer + _IAC_PATTERN.sub(b"", data))[-8192:]
+            if LOGIN_FAILED in buffer:
+                raise TelnetAuthError("7 Days telnet 密碼錯誤")
+            if PASSWORD_PROMPT in buffer and not sent_password:
+                self._writer.write(self.password.encode("utf-8") + b"\r\n")
+                await self._writer.drain()
+                sent_password = True
+                buffer = b""
+            elif LOGIN_OK in buffer or (LOGIN_READY in buffer and not sent_password):
+                return
+
+    async def _read_loop(self):
+        error = TelnetError("7 Days telnet 連線已中斷")
+        try:
+            while True:
+                raw = await self._reader.readline()
+                if not raw:
+                    break
+                line = _IAC_PATTERN.sub(b"", raw).decode("utf-8", errors="replace").strip()
+                if line and self.on_line:
+                    self.on_line(line)
+                if not line or self._waiting is None:
+                    continue
+                pattern, lines, future = self._waiting
+                lines.append(line)
+                if pattern is not None and pattern.search(line) and not future.done():
+                    future.set_result(lines)
+        except asyncio.CancelledError:
+            raise
+        except (OSError, ValueError) as e:
+            error = TelnetError(f"7 Days telnet 連線已中斷：{e.__class__.__name__}")
+        finally:
+            if self._waiting and not self._waiting[2].done():
+                self._waiting[2].set_exception(error)
+            self._close_writer()
+
+    def _close_writer(self):
+        if self._writer:
+            self._writer.close()
+        self._writer = None
+
+    async def close(self):
+        if self._read_task:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._read_task = None
+        self._close_writer()
+
+    async def command(self, command, until=None, timeout=None):
+        """送出指令並收集回應，直到某一行符合 until（regex）；until 為 None 時送出即回傳。"""
+        async with self._command_lock:
+            if not self.connected:
+                await self.connect()
+            future = asyncio.get_running_loop().create_future()
+            self._waiting = (until, [], future)
+            try:
+                self._writer.write(command.encode("utf-8") + b"\r\n")
+                await self._writer.drain()
+                if until is None:
+                    return []
+                return await asyncio.wait_for(future, timeout or self.timeout)
+            except asyncio.TimeoutError:
+                # 遲到的回應會干擾下一個指令的判斷，直接丟棄這條連線
+                await self.close()
+                raise TelnetError(f"7 Days telnet 指令逾時：{command}")
+            except asyncio.CancelledError:
+                # 呼叫端放棄等待（例如外層逾時）時同理，不能留下還在路上的回應
+                self._close_writer()
+                raise
+            except OSError as e:
+                await self.close()
+                raise TelnetError(f"7 Days telnet 連線已中斷：{e.__class__.__name__}") from e
+            finally:
+                self._waiting = None
+
+    async def list_players(self):
+        """lp：回傳 {count, players: [名稱]}。"""
+        lines = await self.command("lp", until=PLAYER_COUNT_PATTERN)
+        players = [m.group(2).strip() for m in map(PLAYER_LINE_PATTERN.match, lines) if m]
+        count = int(PLAYER_COUNT_PATTERN.search(lines[-1]).group(1))
+        return {"count": count, "players": players}
+
+    async def game_time(self):
+        """gt：回傳 {day, hour, minute}。"""
+        lines = await self.command("gt", until=GAME_TIME_PATTERN)
+        day, hour, minute = map(int, GAME_TIME_PATTERN.search(lines[-1]).groups())
+        return {"day": day, "hour": hour, "minute": minute}
+
+    async def memory_stats(self):
+        """mem：回傳 {time, fps, heap, max, rss, ply, zom, ...}（MB / 分鐘為單位的數值）。"""
+        lines = await self.command("mem", until=MEM_PATTERN)
+        return {key.lower(): float(value) for key, value in MEM_FIELD_PATTERN.findall(lines[-1])}
+
+    async def shutdown(self):
+        """送出 shutdown；伺服器隨即關閉連線，不等待回應。"""
+        await self.command("shutdown")
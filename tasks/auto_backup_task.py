@@ -1,66 +1,136 @@
 import os
+import time
 import asyncio
-import tempfile
-import shutil
-from datetime import datetime, timedelta
+from backups.retention import RetentionPolicy
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-class AutoBackupTask:
-    def __init__(self, bot, interval_minutes=60, retention_hours=36):
-        self.bot = bot
+class BackupSchedule:
+    """單一 handler 的備份排程：有玩家時依 interval 備份，最後一位玩家離開後補一次備份再休眠。"""
+
+    def __init__(self, handler, probe=None, interval_minutes=30, fallback_minutes=60, poll_seconds=60):
+        self.handler = handler
+        self.probe = probe  # async callable() -> 玩家數；0 = 無人 / 未啟動，None = 無法判斷
         self.interval = interval_minutes * 60
-        self.retention = timedelta(hours=retention_hours)
+        self.fallback_interval = fallback_minutes * 60
+        self.poll_seconds = poll_seconds
+        self.state = "dormant"  # dormant / active / fallback
+        self.players = None
+        self.last_backup = None
+        self.wake_event = asyncio.Event()
         self.task = None
-        self.active = False
 
-    def start(self):
-        if not self.task:
-            self.active = True
-            self.task = asyncio.create_task(self._run())
-            logger.info("🌀 自動備份任務已啟動")
+    def due(self, interval):
+        return self.last_backup is None or time.monotonic() - self.last_backup >= interval
 
-    def stop(self):
-        self.active = False
-        logger.info("🛑 自動備份任務標記為停止，將於下一輪備份後結束")
+    async def next_action(self):
+        """依玩家數更新狀態，回傳這一輪要不要備份（以及原因）。"""
+        try:
+            self.players = await self.probe() if self.probe else None
+        except Exception as e:
+            logger.debug(f"[{self.handler.name}] 查詢玩家數失敗：{e}")
+            self.players = None
 
-    async def _run(self):
-        await asyncio.sleep(10)  # 延遲啟動，避免與 server 啟動衝突
-        while self.active:
-            results = []
+        if self.players:
+            if self.state != "active":
+                logger.info(f"👥 [{self.handler.name}] 偵測到 {self.players} 位玩家，進入活躍備份排程")
+                self.state = "active"
+            return "定期備份" if self.due(self.interval) else None
 
-            for handler in self.bot.backup_manager.handlers:
-                try:
-                    temp_dir = tempfile.mkdtemp()
-                    temp_zip_path = await handler.perform_backup(temp_dir)
+        if self.players == 0:
+            if self.state == "dormant":
+                return None
+            # 之前有玩家（或狀態未知）：補一次最後備份後休眠，直到玩家回來
+            self.state = "dormant"
+            logger.info(f"💤 [{self.handler.name}] 已無玩家在線，進行最後一次備份後暫停排程")
+            return "最後備份"
 
-                    # 強化處理 SevenDays 特例路徑格式與安全性
-                    if not hasattr(handler, 'get_final_path'):
-                        raise AttributeError(f"Handler {handler.name} 缺少 get_final_path 方法")
+        # 伺服器在跑但查不到玩家數，退回固定間隔
+        if self.state != "fallback":
+            logger.info(f"⚠️ [{self.handler.name}] 無法取得玩家數，改用固定間隔備份")
+            self.state = "fallback"
+        return "固定間隔備份" if self.due(self.fallback_interval) else None
 
-                    final_path = shutil.move(temp_zip_path, handler.get_final_path(temp_zip_path))
-                    results.append((handler.name, f"✅ 備份成功：{os.path.basename(final_path)}"))
-                    self._cleanup_old_backups(handler)
-                except Exception as e:
-                    results.append((handler.name, f"❌ 備份失敗：{e.__class__.__name__} - {e}"))
+    async def sleep(self):
+        try:
+            await asyncio.wait_for(self.wake_event.wait(), timeout=self.poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+        self.wake_event.clear()
 
-            for name, result in results:
-                logger.info(f"[備份結果] {name}: {result}")
 
-            await asyncio.sleep(self.interval)
-        self.task = None  # 停止後清除任務參考
+class AutoBackupTask:
+    def __init__(self, bot, retention_hours=36):
+        self.bot = bot
+        # handler 沒有設定 retention_policy 時沿用舊的單一時限
+        self.default_policy = RetentionPolicy(hourly_hours=retention_hours, daily_days=0, weekly_weeks=0)
+        self.schedules = {}
+
+    def add_schedule(self, handler, probe=None, interval_minutes=30, fallback_minutes=60, poll_seconds=60):
+        self.schedules[handler.name] = BackupSchedule(
+            handler, probe, interval_minutes, fallback_minutes, poll_seconds
+        )
+
+    def start(self):
+        for schedule in self.schedules.values():
+            if not schedule.task:
+                schedule.task = asyncio.create_task(self._run(schedule))
+        logger.info(f"🌀 自動備份排程已啟動：{', '.join(self.schedules)}")
+
+    def stop(self):
+        for schedule in self.schedules.values():
+            if schedule.task:
+                schedule.task.cancel()
+                schedule.task = None
+        logger.info("🛑 自動備份排程已停止")
+
+    def wake(self, handler_name):
+        """伺服器啟動 / 關閉時呼叫，讓該排程立即重新檢查玩家數。"""
+        schedule = self.schedules.get(handler_name)
+        if schedule:
+            schedule.wake_event.set()
+
+    def describe(self):
+        return {
+            name: {"state": schedule.state, "players": schedule.players}
+            for name, schedule in self.schedules.items()
+        }
+
+    async def _run(self, schedule):
+        await asyncio.sleep(10)  # 延遲啟動，避免與 server 啟動衝突
+        while True:
+            reason = await schedule.next_action()
+            if reason:
+                schedule.last_backup = time.monotonic()
+                status, message, final_path = await self.bot.backup_manager.backup_handler(schedule.handler)
+                logger.info(f"[備份結果] {schedule.handler.name}（{reason}）: {message}")
+                if status == "success":
+                    await self._after_backup(schedule.handler, final_path)
+            await schedule.sleep()
+
+    async def _after_backup(self, handler, final_path):
+        loop = asyncio.get_running_loop()
+        # 刪除舊備份（link 模式是整棵快照目錄）在備份執行緒池執行，不阻塞 event loop；
+        # 持有 handler 鎖，不會刪掉正在被備份參照或還原中的備份
+        async with self.bot.backup_manager.handler_locks[handler.name]:
+            await loop.run_in_executor(handler.executor, self._cleanup_old_backups, handler)
+            if handler.chunk_store:
+                await loop.run_in_executor(handler.executor, handler.chunk_store.collect_garbage)
+        verifier = getattr(self.bot, "backup_verifier", None)
+        if verifier:
+            verifier.submit(handler, os.path.basename(final_path))
+        replicator = getattr(self.bot, "backup_replicator", None)
+        if replicator:
+            replicator.submit(handler, os.path.basename(final_path), handler.progress.finished_at)
 
     def _cleanup_old_backups(self, handler):
-        now = datetime.now()
+        policy = handler.retention_policy or self.default_policy
         try:
-            folder = handler.backup_dir
-            for f in os.listdir(folder):
-                if f.endswith(".zip"):
-                    fpath = os.path.join(folder, f)
-                    mtime = datetime.fromtimestamp(os.path.getmtime(fpath))
-                    if now - mtime > self.retention:
-                        os.remove(fpath)
-                        logger.info(f"🧹 已移除過期備份：{fpath}")
+            # 一次查詢索引取得所有備份（新到舊），整個保留判斷在記憶體中一次完成
+            entries = handler.list_backup_entries()
+            for name in policy.select(entries):
+                handler.remove_backup(name)
+                logger.info(f"🧹 已移除過期備份：{os.path.join(handler.backup_dir, name)}")
         except Exception as e:
             logger.warning(f"⚠️ 清除備份失敗（{handler.name}）：{e}")
@@ -0,0 +1,72 @@
+import time
+import asyncio
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+RETRY_DELAYS = (60, 300, 900)
+
+class BackupReplicationTask:
+    """備份完成後依序上傳到異地物件儲存；待上傳清單寫在狀態檔，bot 重啟後會接續未完成的上傳。"""
+
+    def __init__(self, bot, replicator):
+        self.bot = bot
+        self.replicator = replicator
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+        logger.info("☁️ 異地備份任務已啟動")
+
+    def submit(self, handler, name, finished_at=None):
+        item = [handler.name, name, finished_at or time.time()]
+        pending = self.replicator.state["pending"]
+        if item[:2] not in [p[:2] for p in pending]:
+            pending.append(item)
+            self.replicator.save_state()
+        self.queue.put_nowait((handler, name, item[2], 0))
+
+    def resume_pending(self):
+        """把上次未完成的上傳重新排入佇列。"""
+        handlers = {handler.name: handler for handler in self.bot.backup_manager.handlers}
+        for handler_name, name, finished_at in self.replicator.state["pending"]:
+            if handler_name in handlers:
+                self.queue.put_nowait((handlers[handler_name], name, finished_at, 0))
+
+    def _done(self, handler, name):
+        self.replicator.state["pending"] = [
+            p for p in self.replicator.state["pending"] if p[:2] != [handler.name, name]
+        ]
+        self.replicator.save_state()
+
+    async def _run(self):
+        while True:
+            handler, name, finished_at, attempt = await self.queue.get()
+            if [handler.name, name] not in [p[:2] for p in self.replicator.state["pending"]]:
+                continue  # 重複排入且已完成
+            try:
+                stats = await self.replicator.replicate(handler, name)
+            except FileNotFoundError:
+                logger.info(f"[備份結果] {handler.name}（異地備份）: ⏭️ 備份已被移除，略過 {name}")
+                self._done(handler, name)
+                continue
+            except Exception as e:
+                if attempt < len(RETRY_DELAYS):
+                    delay = RETRY_DELAYS[attempt]
+                    logger.warning(
+                        f"[備份結果] {handler.name}（異地備份）: ⚠️ 上傳 {name} 失敗，{delay} 秒後重試："
+                        f"{e.__class__.__name__} - {e}"
+                    )
+                    asyncio.get_running_loop().call_later(
+                        delay, self.queue.put_nowait, (handler, name, finished_at, attempt + 1)
+                    )
+                else:
+                    logger.error(f"[備份結果] {handler.name}（異地備份）: ❌ 上傳 {name} 失敗：{e}")
+                continue
+
+            self._done(handler, name)
+            lag = time.time() - finished_at
+            throughput = stats["uploaded"] / stats["elapsed"] / 1048576 if stats["elapsed"] else 0
+            logger.info(
+                f"[備份結果] {handler.name}（異地備份）: ☁️ 已上傳 {name}（{stats['files']} 個檔案，"
+                f"實際傳輸 {stats['uploaded'] / 1048576:.1f} / {stats['bytes'] / 1048576:.1f} MiB，"
+                f"{throughput:.1f} MiB/s），複寫延遲 {lag:.0f}s"
+            )
@@ -0,0 +1,84 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from backups.io_control import TokenBucket, lower_thread_priority
+from backups.verifier import verify_backup
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class BackupVerifyTask:
+    """背景驗證新備份：單一低優先權執行緒依序串流校驗，並把結果寫入備份索引。"""
+
+    def __init__(self, bot, read_bps=None):
+        self.bot = bot
+        self.queue = asyncio.Queue()
+        self.pending = set()
+        # 獨立的單執行緒池，執行緒啟動時降為背景 CPU / I/O 優先權，不與遊戲伺服器搶資源
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="backup-verify", initializer=lower_thread_priority
+        )
+        self.limiter = TokenBucket(read_bps) if read_bps else None
+        # handler 名稱 -> 最近一次驗證 / 最近一次通過的紀錄；控制面板直接讀這裡，不必每次更新都查 SQLite
+        self.latest = {}
+        self.latest_ok = {}
+        self.task = asyncio.create_task(self._run())
+        logger.info("🛡️ 備份驗證任務已啟動")
+
+    def submit(self, handler, name):
+        key = (handler.name, name)
+        if key in self.pending:
+            return
+        self.pending.add(key)
+        self.queue.put_nowait((handler, name))
+
+    def submit_unverified(self, limit=5):
+        """把索引中尚未驗證的備份（每個 handler 最新 limit 份）排入佇列。"""
+        manager = self.bot.backup_manager
+        for handler in manager.handlers:
+            for name in manager.catalog.unverified(handler.name, limit=limit):
+                self.submit(handler, name)
+
+    def last_results(self, handler_name):
+        """回傳 (最近一次通過的驗證, 最近一次驗證)，沒有紀錄為 None。"""
+        return self.latest_ok.get(handler_name), self.latest.get(handler_name)
+
+    def _load_latest(self):
+        manager = self.bot.backup_manager
+        for handler in manager.handlers:
+            self.latest[handler.name] = manager.catalog.last_verification(handler.name)
+            self.latest_ok[handler.name] = manager.catalog.last_verification(handler.name, status="ok")
+
+    def _record(self, record):
+        catalog = self.bot.backup_manager.catalog
+        if catalog.get(record["handler"], record["name"]) is None:
+            return False  # 驗證期間已被保留策略刪除
+        catalog.record_verification(**record)
+        return True
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._load_latest)
+        while True:
+            handler, name = await self.queue.get()
+            try:
+                record = await loop.run_in_executor(self.executor, verify_backup, handler, name, self.limiter)
+            except FileNotFoundError:
+                logger.info(f"🛡️ 備份已被移除，略過驗證：{name}")
+                continue
+            except Exception as e:
+                logger.warning(f"⚠️ 備份驗證失敗（{name}）：{e}")
+                continue
+            finally:
+                self.pending.discard((handler.name, name))
+
+            if not await loop.run_in_executor(self.executor, self._record, record):
+                continue
+            self.latest[handler.name] = record
+            if record["status"] == "ok":
+                self.latest_ok[handler.name] = record
+                logger.info(
+                    f"🛡️ 備份驗證通過：{name}（{record['entries']} 個項目，"
+                    f"{record['bytes'] / 1048576:.1f} MiB，{record['duration']:.1f}s）"
+                )
+            else:
+                logger.error(f"❌ 備份驗證失敗：{name} - {record['error']}")
@@ -0,0 +1,72 @@
+import time
+import asyncio
+from core.log_pipeline import get_log_pipeline
+from core.log_events import LogEventParser, LogEventStore
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ALERT_KINDS = ("oom", "crash")
+
+
+class LogEventMonitor:
+    """把事件解析掛到各伺服器的 log pipeline；lag 警告在短時間內暴增、或出現 OOM / crash 時發 Discord 通知。"""
+
+    def __init__(self, bot, lag_threshold=5, window_minutes=5, cooldown_minutes=30):
+        self.bot = bot
+        self.lag_threshold = lag_threshold
+        self.window_minutes = window_minutes
+        self.cooldown = cooldown_minutes * 60
+        self.parsers = {}
+        self.stores = {}
+        self.thread_ids = {}
+        self.last_alert = {}  # (server, kind) -> time.time()
+
+    def watch(self, server, flavor, thread_id):
+        """server 為 pipeline 名稱（Minecraft / 7 Days to Die），flavor 為 minecraft / 7dtd。"""
+        self.parsers[server] = LogEventParser(server, flavor)
+        self.stores[server] = LogEventStore()
+        self.thread_ids[server] = thread_id
+        get_log_pipeline(server).add_listener(lambda line: self.on_line(server, line))
+
+    def on_line(self, server, line):
+        parser = self.parsers[server]
+        event = parser.parse(line)
+        if event is None:
+            return
+        for event in parser.expand(event):
+            self.stores[server].record(event)
+            self._check(event)
+
+    def _check(self, event):
+        store = self.stores[event.server]
+        if event.kind == "lag":
+            count = store.count("lag", self.window_minutes, now=event.ts)
+            if count < self.lag_threshold:
+                return
+            lags = [e for e in store.recent({"lag"}, count) if e.ts >= event.ts - self.window_minutes * 60]
+            worst = max((e.data.get("ticks", 0) for e in lags), default=0)
+            detail = f"，最多落後 {worst} ticks" if worst else ""
+            lowest_fps = min((e.data["fps"] for e in lags if "fps" in e.data), default=None)
+            if lowest_fps is not None:
+                detail += f"，最低 FPS {lowest_fps:.1f}"
+            self._alert(event, f"🐢 {event.server} 最近 {self.window_minutes} 分鐘出現 {count} 次延遲警告{detail}")
+        elif event.kind in ALERT_KINDS:
+            label = "記憶體不足（OOM）" if event.kind == "oom" else "崩潰"
+            detail = event.data.get("detail")
+            self._alert(event, f"🚨 {event.server} 偵測到{label}" + (f"：`{detail}`" if detail else ""))
+
+    def _alert(self, event, message):
+        key = (event.server, event.kind)
+        if time.time() - self.last_alert.get(key, 0) < self.cooldown:
+            return
+        self.last_alert[key] = time.time()
+        logger.warning(message)
+        asyncio.create_task(self._send(self.thread_ids[event.server], message))
+
+    async def _send(self, thread_id, message):
+        try:
+            channel = self.bot.get_channel(thread_id) or await self.bot.fetch_channel(thread_id)
+            await channel.send(message)
+        except Exception as e:
+            logger.error(f"❌ 發送 log 警告失敗：{e}")
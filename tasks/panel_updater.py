@@ -1,36 +1,110 @@
-# tasks/status_updater.py
+# tasks/panel_updater.py
 
-from discord.ext import tasks
-from config import CONTROL_THREAD_ID
+import os
+import json
+import time
+import asyncio
+import hashlib
+import discord
+from config import CONTROL_THREAD_ID, PANEL_STATE_FILE
+from config import PANEL_UPDATE_INTERVAL, PANEL_IDLE_INTERVAL, PANEL_TRANSITION_INTERVAL, PANEL_TRANSITION_SECONDS
 from commands.commandspanel import get_combined_status_embed
+from utils.logger import get_logger
 
-# 任務變數定義在全域，避免重複定義
-_panel_update_task = None
+logger = get_logger(__name__)
 
-def setup_panel_auto_updater(bot):
-    global _panel_update_task
 
-    # 若任務已經存在，就不重複建立
-    if _panel_update_task is not None:
-        return
+def embed_digest(embed):
+    """embed 內容的雜湊，不含 footer（最後更新時間），內容沒變就不必重新編輯訊息。"""
+    data = embed.to_dict()
+    data.pop("footer", None)
+    data.pop("timestamp", None)
+    return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
 
-    @tasks.loop(seconds=60)
-    async def update_panel_embed():
+
+class PanelUpdater:
+    """定期更新控制面板 embed。
+
+    面板訊息 ID 存在 PANEL_STATE_FILE，以 PartialMessage 直接編輯，不用每次撈頻道歷史；
+    embed 內容沒變就不編輯。伺服器啟動 / 關閉後的一段時間更新得比較頻繁，兩邊都沒在執行時放慢。
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.channel = bot.get_partial_messageable(int(CONTROL_THREAD_ID))
+        self.message_id = self.load_message_id()
+        self.last_digest = None
+        self.fast_until = 0
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def load_message_id(self):
+        if not os.path.exists(PANEL_STATE_FILE):
+            return None
         try:
-            channel = await bot.fetch_channel(CONTROL_THREAD_ID)
-            messages = [msg async for msg in channel.history(limit=10)]
+            with open(PANEL_STATE_FILE, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if str(state.get("channel_id")) != str(CONTROL_THREAD_ID):
+            return None
+        return state.get("message_id")
 
-            for msg in messages:
-                if msg.author == bot.user and msg.embeds and msg.components:
-                    embed = await get_combined_status_embed(bot)
-                    await msg.edit(embed=embed)
-                    print("✅ 控制面板 Embed 已自動更新")
-                    return
+    def track(self, message_id, embed=None):
+        """改為更新這則面板訊息（!panel 或啟動時發送 / 沿用面板後呼叫），embed 為訊息目前的內容。"""
+        self.message_id = message_id
+        self.last_digest = embed_digest(embed) if embed else None
+        os.makedirs(os.path.dirname(PANEL_STATE_FILE) or ".", exist_ok=True)
+        with open(PANEL_STATE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"channel_id": str(CONTROL_THREAD_ID), "message_id": message_id}, f, indent=4)
+
+    def boost(self):
+        """伺服器啟動 / 關閉中：接下來 PANEL_TRANSITION_SECONDS 秒改用較短的更新間隔。"""
+        self.fast_until = time.time() + PANEL_TRANSITION_SECONDS
+        self._wake.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def update(self, force=False):
+        """內容有變（或 force）才編輯面板；回傳是否有編輯。"""
+        if self.message_id is None:
+            return False
+        embed = await get_combined_status_embed(self.bot)
+        digest = embed_digest(embed)
+        if digest == self.last_digest and not force:
+            return False
+        try:
+            await self.channel.get_partial_message(self.message_id).edit(embed=embed)
+        except discord.NotFound:
+            logger.warning("⚠️ 控制面板訊息已不存在，請使用 !panel 重新發送控制面板")
+            self.message_id = None
+            return False
+        self.last_digest = digest
+        logger.debug("✅ 控制面板 Embed 已更新")
+        return True
 
-            print("⚠️ 找不到控制面板訊息，請先使用 !panel 發送控制面板")
+    def next_interval(self):
+        if time.time() < self.fast_until:
+            return PANEL_TRANSITION_INTERVAL
+        snapshot = getattr(self.bot, "status_service", None) and self.bot.status_service.snapshot
+        if snapshot and not snapshot["minecraft"] and not snapshot["sevenday"]["running"]:
+            return PANEL_IDLE_INTERVAL
+        return PANEL_UPDATE_INTERVAL
 
-        except Exception as e:
-            print(f"❌ 自動更新控制面板失敗：{e}")
+    async def _loop(self):
+        await self.bot.wait_until_ready()
+        if self.message_id is None:
+            logger.warning("⚠️ 找不到控制面板訊息，請先使用 !panel 發送控制面板")
+        while not self.bot.is_closed():
+            try:
+                await self.update()
+            except Exception as e:
+                logger.error(f"❌ 自動更新控制面板失敗：{e}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.next_interval())
+            except asyncio.TimeoutError:
+                pass
 
-    _panel_update_task = update_panel_embed
-    _panel_update_task.start()
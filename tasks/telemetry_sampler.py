@@ -0,0 +1,116 @@
+import time
+import asyncio
+import psutil
+from core.process_registry import process_registry
+from core.telemetry import TimeSeries
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+HOST = "host"
+SERVERS = ("Minecraft", "7 Days to Die")
+MB = 1024 * 1024
+
+_ACCESS_ERRORS = (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, PermissionError)
+
+
+class TelemetrySampler:
+    """每隔 interval 秒記錄主機與各伺服器進程的資源用量。
+
+    指標：cpu（%，100 = 整台主機）、rss / mem（MB / %）、threads、disk_read / disk_write（MB/s）。
+    psutil 的呼叫在 executor 執行，結果寫回 event loop 裡的 TimeSeries。
+    """
+
+    def __init__(self, interval=5):
+        self.interval = interval
+        self.series = {}      # (target, metric) -> TimeSeries
+        self._procs = {}      # target -> psutil.Process（cpu_percent 需要同一個物件才能算差值）
+        self._io = {}         # target -> (時間, read_bytes, write_bytes)
+        self._cpu_count = psutil.cpu_count() or 1
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            psutil.cpu_percent(None)
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                samples = await loop.run_in_executor(None, self.sample)
+                for (target, metric), value in samples.items():
+                    self.record(target, metric, value)
+            except Exception as e:
+                logger.error(f"❌ 資源取樣失敗：{e.__class__.__name__} {e}")
+            await asyncio.sleep(self.interval)
+
+    def record(self, target, metric, value, ts=None):
+        key = (target, metric)
+        if key not in self.series:
+            self.series[key] = TimeSeries(self.interval)
+        self.series[key].add(value, ts)
+
+    def sample(self):
+        now = time.monotonic()
+        samples = {(HOST, "cpu"): psutil.cpu_percent(None), (HOST, "mem"): psutil.virtual_memory().percent}
+        disk = psutil.disk_io_counters()
+        if disk:
+            samples.update(self._io_rates(HOST, now, disk.read_bytes, disk.write_bytes))
+        for name in SERVERS:
+            proc = self._process(name)
+            if proc is None:
+                continue
+            try:
+                with proc.oneshot():
+                    cpu = proc.cpu_percent(None)
+                    rss = proc.memory_info().rss
+                    threads = proc.num_threads()
+                    io = proc.io_counters() if hasattr(proc, "io_counters") else None
+            except _ACCESS_ERRORS:
+                self._procs.pop(name, None)
+                continue
+            samples[(name, "cpu")] = cpu / self._cpu_count
+            samples[(name, "rss")] = rss / MB
+            samples[(name, "threads")] = threads
+            if io:
+                samples.update(self._io_rates(name, now, io.read_bytes, io.write_bytes))
+        return samples
+
+    def _process(self, name):
+        proc = process_registry.get_process(name)
+        if proc is None:
+            self._procs.pop(name, None)
+            self._io.pop(name, None)
+            return None
+        cached = self._procs.get(name)
+        if cached is not None and cached.pid == proc.pid:
+            return cached
+        # 新進程第一次的 cpu_percent 沒有比較基準，固定回 0，先丟掉
+        try:
+            proc.cpu_percent(None)
+        except _ACCESS_ERRORS:
+            return None
+        self._procs[name] = proc
+        self._io.pop(name, None)
+        return None
+
+    def _io_rates(self, target, now, read_bytes, write_bytes):
+        previous = self._io.get(target)
+        self._io[target] = (now, read_bytes, write_bytes)
+        if previous is None or now <= previous[0]:
+            return {}
+        elapsed = now - previous[0]
+        return {
+            (target, "disk_read"): max(read_bytes - previous[1], 0) / MB / elapsed,
+            (target, "disk_write"): max(write_bytes - previous[2], 0) / MB / elapsed,
+        }
+
+    def average(self, target, metric, seconds=60):
+        """最近 seconds 秒的平均值；這段時間沒有取樣（伺服器未執行）回傳 None。"""
+        _, buckets = self.query(target, metric, seconds)
+        return sum(b[1] for b in buckets) / len(buckets) if buckets else None
+
+    def query(self, target, metric, seconds):
+        series = self.series.get((target, metric))
+        return series.query(seconds) if series else (self.interval, [])
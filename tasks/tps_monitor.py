@@ -0,0 +1,139 @@
+import re
+import time
+import asyncio
+from collections import deque
+from core.process_registry import process_registry
+from core.rcon_client import RconError
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+TICK_COMMANDS = ("tick query", "tps")  # 原版 1.20.3+ / Paper、Spigot 等外掛伺服器
+QUERY_TIMEOUT = 5
+
+FORMAT_CODE_PATTERN = re.compile(r"§.")
+MSPT_PATTERN = re.compile(r"Average time per tick: ([\d.]+)\s*ms")
+TARGET_RATE_PATTERN = re.compile(r"Target tick rate: ([\d.]+)")
+TPS_PATTERN = re.compile(r"TPS from last 1m, 5m, 15m: \*?([\d.]+)")
+
+
+def parse_tick_stats(text):
+    """解析 tick query / tps 的回應，回傳 {tps, mspt}（tps 指令沒有 mspt，為 None）；看不懂回傳 None。"""
+    text = FORMAT_CODE_PATTERN.sub("", text or "")
+    match = MSPT_PATTERN.search(text)
+    if match:
+        mspt = float(match.group(1))
+        rate = TARGET_RATE_PATTERN.search(text)
+        target = float(rate.group(1)) if rate else 20.0
+        return {"tps": min(target, 1000 / mspt) if mspt > 0 else target, "mspt": mspt}
+    match = TPS_PATTERN.search(text)
+    if match:
+        return {"tps": float(match.group(1)), "mspt": None}
+    return None
+
+
+class TpsMonitor:
+    """定期透過 RCON 查詢 Minecraft 的 TPS / MSPT。
+
+    歷史資料寫進 bot.telemetry（!perf mc 可看走勢）；TPS 連續 sustain_minutes 分鐘低於門檻時
+    發警告到狀態頻道，恢復時再通知一次。
+    """
+
+    def __init__(self, bot, thread_id, interval=30, threshold=15.0, sustain_minutes=3, command="auto"):
+        self.bot = bot
+        self.thread_id = thread_id
+        self.interval = interval
+        self.threshold = threshold
+        self.sustain = sustain_minutes * 60
+        # auto：依序嘗試，第一個看得懂的指令之後就固定使用
+        self.commands = list(TICK_COMMANDS) if command == "auto" else [command]
+        self.recent = deque()  # (時間, tps)，只保留判斷警告需要的時間範圍
+        self.latest = None     # (時間, {tps, mspt})
+        self.alerting = False
+        self._unsupported_logged = False
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"❌ 查詢 Minecraft TPS 失敗：{e.__class__.__name__} {e}")
+            await asyncio.sleep(self.interval)
+
+    async def poll(self):
+        cog = self.bot.get_cog("MinecraftServerControl")
+        if cog is None or not await process_registry.is_running_async("Minecraft"):
+            self.recent.clear()
+            self.latest = None
+            return
+        stats = await self.query(cog)
+        if stats is None:
+            return
+        now = time.time()
+        self.latest = (now, stats)
+        self.recent.append((now, stats["tps"]))
+        while self.recent and self.recent[0][0] < now - self.sustain - self.interval:
+            self.recent.popleft()
+        telemetry = getattr(self.bot, "telemetry", None)
+        if telemetry:
+            telemetry.record("Minecraft", "tps", stats["tps"])
+            if stats["mspt"] is not None:
+                telemetry.record("Minecraft", "mspt", stats["mspt"])
+        self._check(now, stats)
+
+    async def query(self, cog):
+        for command in self.commands:
+            try:
+                text = await cog.rcon_command(command, timeout=QUERY_TIMEOUT)
+            except RconError as e:
+                logger.debug(f"RCON 查詢 TPS 失敗：{e}")
+                return None
+            stats = parse_tick_stats(text)
+            if stats:
+                if len(self.commands) > 1:
+                    logger.info(f"📏 使用 `{command}` 查詢 Minecraft TPS")
+                    self.commands = [command]
+                return stats
+        if not self._unsupported_logged:
+            logger.warning(f"⚠️ 無法從 {' / '.join(self.commands)} 的回應取得 TPS，伺服器版本可能不支援")
+            self._unsupported_logged = True
+        return None
+
+    def _check(self, now, stats):
+        window = [tps for ts, tps in self.recent if ts >= now - self.sustain]
+        # 有資料涵蓋整個判斷區間才算「持續」偏低，剛開始取樣或中途斷過都不算
+        covered = self.recent and self.recent[0][0] <= now - self.sustain + self.interval
+        if not self.alerting and covered and max(window) < self.threshold:
+            self.alerting = True
+            average = sum(window) / len(window)
+            mspt = f"，MSPT {stats['mspt']:.1f} ms" if stats["mspt"] is not None else ""
+            self._alert(
+                f"🐢 Minecraft TPS 已連續 {self.sustain // 60} 分鐘低於 {self.threshold:g}"
+                f"（目前 {stats['tps']:.1f}，平均 {average:.1f}{mspt}）"
+            )
+        elif self.alerting and stats["tps"] >= self.threshold:
+            self.alerting = False
+            self._alert(f"✅ Minecraft TPS 已恢復：{stats['tps']:.1f}")
+
+    def _alert(self, message):
+        logger.warning(message)
+        asyncio.create_task(self._send(message))
+
+    async def _send(self, message):
+        try:
+            channel = self.bot.get_channel(self.thread_id) or await self.bot.fetch_channel(self.thread_id)
+            await channel.send(message)
+        except Exception as e:
+            logger.error(f"❌ 發送 TPS 警告失敗：{e}")
+
+    def current(self):
+        """最近一次的 {tps, mspt}；超過 3 個查詢週期沒有新資料回傳 None。"""
+        if self.latest is None or time.time() - self.latest[0] > self.interval * 3:
+            return None
+        return self.latest[1]
@@ -0,0 +1,42 @@
+import os
+import asyncio
+from backups.catalog import BackupCatalog
+from backups.link_snapshot import is_snapshot_point
+from backups.minecraft_backup import MinecraftBackupHandler
+
+
+def make_world(root):
+    world = os.path.join(root, "server", "world")
+    os.makedirs(os.path.join(world, "region"))
+    with open(os.path.join(world, "level.dat"), "wb") as f:
+        f.write(b"level")
+    with open(os.path.join(world, "region", "r.0.0.mca"), "wb") as f:
+        f.write(os.urandom(8192))
+    return world
+
+
+def test_point_name_formats(tmp_path):
+    for name in ("server_world_20261018_183355", "server_world_20261018_1833"):
+        os.mkdir(tmp_path / name)
+        assert is_snapshot_point(str(tmp_path), name)
+    os.mkdir(tmp_path / "server_world_20261018_183355.partial")
+    assert not is_snapshot_point(str(tmp_path), "server_world_20261018_183355.partial")
+
+
+def test_link_mode_list_and_rebuild(tmp_path):
+    world = make_world(str(tmp_path))
+    backup_root = str(tmp_path / "backups")
+    handler = MinecraftBackupHandler(world_path=world, backup_root=backup_root, mode="link")
+
+    final_path = asyncio.run(handler.perform_backup())
+    name = os.path.basename(final_path)
+    # 舊版（沒有秒數）的快照點也要列得出來
+    legacy = "server_world_20200101_0000"
+    os.mkdir(os.path.join(handler.backup_dir, legacy))
+
+    assert handler.list_backup_files() == [name, legacy]
+
+    catalog = BackupCatalog(os.path.join(backup_root, "catalog.sqlite3"))
+    assert catalog.rebuild(handler) == 2
+    assert {entry["name"] for entry in catalog.list(handler.name)} == {name, legacy}
+    assert catalog.get(handler.name, name)["kind"] == "link"
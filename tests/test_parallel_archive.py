@@ -0,0 +1,55 @@
+import os
+import zipfile
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+import backups.parallel_archive as parallel_archive
+from backups.parallel_archive import ParallelArchiveWriter
+from backups.restore import ZipBackupReader
+
+FILES = {
+    "level.dat": b"level " * 100,
+    "tiny": b"x",
+    "empty": b"",
+    "region/r.0.0.mca": os.urandom(96 * 1024),
+    "logs/latest.log": b"".join(b"[12:00:00] line %d\n" % i for i in range(8000)),
+}
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    # 把門檻調小，讓 region 與 log 走分段壓縮的路徑
+    monkeypatch.setattr(parallel_archive, "STREAM_THRESHOLD", 64 * 1024)
+    monkeypatch.setattr(parallel_archive, "STREAM_CHUNK", 16 * 1024)
+    root = tmp_path / "world"
+    for name, data in FILES.items():
+        path = root.joinpath(*name.split("/"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return str(root)
+
+
+@pytest.mark.parametrize("codec", ["store", "deflate", "lzma"])
+def test_round_trip(tmp_path, source, codec):
+    zip_path = str(tmp_path / "backup.zip")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        stats = ParallelArchiveWriter(zip_path, codec=codec, workers=2, executor=pool).write_files(
+            source, list(FILES), {"meta.json": b"{}"}
+        )
+
+    assert stats["files"] == len(FILES)
+    assert not os.path.exists(zip_path + ".partial")
+    with zipfile.ZipFile(zip_path) as zipf:
+        assert zipf.testzip() is None
+        assert {name: zipf.read(name) for name in FILES} == FILES
+        assert zipf.read("meta.json") == b"{}"
+    with ZipBackupReader(zip_path) as reader:
+        assert all(reader.read(name) == data for name, data in FILES.items())
+
+
+def test_missing_file_is_skipped(tmp_path, source):
+    zip_path = str(tmp_path / "backup.zip")
+    stats = ParallelArchiveWriter(zip_path, workers=2).write_files(source, list(FILES) + ["gone.dat"])
+
+    assert stats["skipped"] == 1
+    with zipfile.ZipFile(zip_path) as zipf:
+        assert sorted(zipf.namelist()) == sorted(FILES)
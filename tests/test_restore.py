@@ -0,0 +1,26 @@
+import os
+import asyncio
+from backups.minecraft_backup import MinecraftBackupHandler
+from backups.restore import ChainBackupReader, extract_files, open_backup
+from test_link_backup import make_world
+
+
+def test_chain_reader_closes_every_handle(tmp_path):
+    world = make_world(str(tmp_path))
+    handler = MinecraftBackupHandler(
+        world_path=world, backup_root=str(tmp_path / "backups"), incremental=True, workers=2
+    )
+    asyncio.run(handler.perform_backup())
+    with open(os.path.join(world, "level.dat"), "wb") as f:
+        f.write(b"level v2")
+    latest = os.path.basename(asyncio.run(handler.perform_backup()))
+
+    with open_backup(handler, latest) as reader:
+        assert isinstance(reader, ChainBackupReader)
+        stats = extract_files(reader, list(reader.list_files()), str(tmp_path / "out"), workers=4)
+        handles = [zipf for layer in reader.layers for zipf in layer._handles]
+    assert stats["files"] == 2
+    assert handles and all(zipf.fp is None for zipf in handles)
+    assert all(not layer._handles for layer in reader.layers)
+    with open(tmp_path / "out" / "level.dat", "rb") as f:
+        assert f.read() == b"level v2"
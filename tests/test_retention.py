@@ -0,0 +1,82 @@
+import pytest
+from datetime import datetime, timedelta
+from backups.retention import RetentionPolicy
+
+# 2026-10-18 是星期日，ISO 週為 10/12 ~ 10/18
+NOW = datetime(2026, 10, 18, 23, 0)
+HOURS = (20, 14, 8, 2)  # 每天四份，b<天>_0 是當天最新的一份
+
+
+def daily_entries(days):
+    """新到舊：b<幾天前>_<當天第幾新>。"""
+    entries = []
+    for day in range(days):
+        date = NOW - timedelta(days=day)
+        for index, hour in enumerate(HOURS):
+            created = date.replace(hour=hour, minute=0).timestamp()
+            entries.append({"name": f"b{day}_{index}", "created_at": created, "parent": None, "size": 1})
+    return entries
+
+
+def kept(policy, entries):
+    deleted = set(policy.select(entries, now=NOW.timestamp()))
+    return [entry["name"] for entry in entries if entry["name"] not in deleted]
+
+
+@pytest.mark.parametrize("spec, expected", [
+    # 今天全留；之後 10/17 ~ 10/12 每天最新一份；10/11、10/4 各是所在週的最新一份
+    ("24h,7d,4w", ["b0_0", "b0_1", "b0_2", "b0_3", "b1_0", "b2_0", "b3_0", "b4_0", "b5_0", "b6_0", "b7_0", "b14_0"]),
+    # 只有週層：每個 ISO 週留最新一份
+    ("0h,0d,4w", ["b0_0", "b7_0", "b14_0"]),
+    # 只有日層：每天最新一份，超過 3 天全刪
+    ("0h,3d,0w", ["b0_0", "b1_0", "b2_0"]),
+    # 小時層內的備份佔掉當天與當週，日 / 週層不會在同一天再多留
+    ("12h,1d,1w", ["b0_0", "b0_1"]),
+    ("0h,0d,0w", []),
+])
+def test_select_buckets(spec, expected):
+    assert kept(RetentionPolicy.parse(spec), daily_entries(20)) == expected
+
+
+@pytest.mark.parametrize("keep, parents, expected", [
+    # 保留的增量備份整條鏈都要留
+    ({"b0_0"}, {"b0_0": "b1_1", "b1_1": "b1_2"}, {"b0_0", "b1_1", "b1_2"}),
+    # 鏈上已保留的節點之後不用再往上追
+    ({"b0_0", "b1_0"}, {"b0_0": "b1_0", "b1_0": "b1_1"}, {"b0_0", "b1_0", "b1_1"}),
+    # 沒被保留的增量備份不會把 parent 拉回來
+    ({"b0_0", "b1_0"}, {"b1_1": "b1_2"}, {"b0_0", "b1_0"}),
+    # parent 已不在清單內（被手動刪除）就停下
+    ({"b0_0"}, {"b0_0": "gone"}, {"b0_0"}),
+])
+def test_keep_parent_chains(keep, parents, expected):
+    entries = [{"name": name, "parent": parents.get(name)} for name in ("b0_0", "b1_0", "b1_1", "b1_2")]
+    RetentionPolicy._keep_parent_chains(entries, keep, {e["name"]: e["parent"] for e in entries})
+    assert keep == expected
+
+
+@pytest.mark.parametrize("max_bytes, parents, expected", [
+    # 從最舊的開始刪到不超過上限
+    (30, {}, {"n0", "n1", "n2"}),
+    (100, {}, {"n0", "n1", "n2", "n3", "n4"}),
+    # 最新一份永遠保留，即使本身就超過上限
+    (5, {}, {"n0"}),
+    # 被增量備份依賴的 parent 不能先刪，要等 child 被刪掉之後
+    (30, {"n3": "n4"}, {"n0", "n1", "n2"}),
+    (30, {"n1": "n4"}, {"n0", "n1", "n4"}),
+    # 整條鏈都被最新一份依賴時刪不動，停在超過上限的狀態
+    (10, {"n0": "n1", "n1": "n2"}, {"n0", "n1", "n2"}),
+])
+def test_apply_budget(max_bytes, parents, expected):
+    names = ["n0", "n1", "n2", "n3", "n4"]  # 新到舊，每份 10 bytes
+    entries = [{"name": name, "size": 10, "parent": parents.get(name)} for name in names]
+    keep = set(names)
+    RetentionPolicy(max_bytes=max_bytes)._apply_budget(entries, keep, {e["name"]: e["parent"] for e in entries})
+    assert keep == expected
+
+
+def test_select_keeps_chain_before_budget():
+    entries = daily_entries(2)
+    # b0_0 是以 b1_3 為基準的增量備份：b1_3 本來不在保留範圍，被鏈拉回來
+    entries[0]["parent"] = "b1_3"
+    policy = RetentionPolicy.parse("0h,1d,0w")
+    assert kept(policy, entries) == ["b0_0", "b1_3"]